@@ -0,0 +1,242 @@
+"""
+분석 API 입장 제어 (admission control)
+
+분석 엔드포인트(/api/...)는 동시에 ADMISSION_MAX_ACTIVE개까지만 처리하고,
+나머지는 최대 ADMISSION_MAX_QUEUE개까지 ADMISSION_MAX_WAIT초 동안 대기열에서 기다립니다.
+대기열이 가득 찼거나 대기 시간이 지나면 업스트림을 호출하지 않고 503 + Retry-After로 응답합니다.
+
+/, /health, /stats 등 /api/ 밖의 경로는 입장 제어를 거치지 않는 별도 경로로 처리되므로
+분석 요청이 밀려 있어도 바로 응답합니다.
+
+모든 요청은 여기서 interactive/batch로 분류되어(priority.classify_request) 컨텍스트 변수로 전달되고,
+대기열에서는 interactive가 먼저 입장하되 batch에도 최소 몫을 보장합니다.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from metrics import Gauge
+from priority import (
+    PriorityWaitQueue,
+    classify_request,
+    current_traffic_class,
+    traffic_class,
+)
+
+logger = logging.getLogger(__name__)
+
+# ADMISSION_ENABLED=false 로 입장 제어를 끌 수 있음
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+# 동시에 처리하는 분석 요청 수
+ADMISSION_MAX_ACTIVE = int(os.getenv("ADMISSION_MAX_ACTIVE", "16"))
+# 대기열 최대 길이 (가득 차면 즉시 503)
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+# 대기열 최대 대기 시간(초)
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", "15"))
+# 입장 제어를 적용하는 경로 접두사
+ADMISSION_PATH_PREFIXES: Tuple[str, ...] = tuple(
+    prefix.strip()
+    for prefix in os.getenv("ADMISSION_PATH_PREFIXES", "/api/").split(",")
+    if prefix.strip()
+)
+
+
+class AdmissionRejected(Exception):
+    """대기열이 가득 찼거나 대기 시간이 지나 요청을 받지 않은 경우"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """동시 처리 수 + 트래픽 클래스별 우선순위 대기열 (전체 길이 제한)"""
+
+    def __init__(self, max_active: int, max_queue: int, max_wait: float):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self._queue = PriorityWaitQueue()
+        self._waits: Deque[float] = deque(maxlen=500)
+        self._service_times: Deque[float] = deque(maxlen=100)
+        self._counters = {
+            "admitted": 0,
+            "rejected_queue_full": 0,
+            "rejected_timeout": 0,
+            "max_queue_depth": 0,
+        }
+
+    @property
+    def queued(self) -> int:
+        return self._queue.depth()
+
+    def retry_after(self) -> float:
+        """지금 대기열이 빠지는 데 걸릴 예상 시간 (초, 최소 1초)"""
+        if not self._service_times:
+            return 1.0
+        avg_service = sum(self._service_times) / len(self._service_times)
+        return max(1.0, avg_service * (self.queued + 1) / max(1, self.max_active))
+
+    async def acquire(self) -> float:
+        """
+        처리 슬롯을 얻을 때까지 기다립니다.
+
+        Returns:
+            대기한 시간(초)
+
+        Raises:
+            AdmissionRejected: 대기열이 가득 찼거나 ADMISSION_MAX_WAIT초 안에 슬롯을 얻지 못한 경우
+        """
+        name = current_traffic_class()
+        if self.active < self.max_active and not self.queued:
+            self.active += 1
+            self._queue.record_immediate(name)
+            return self._admitted(0.0)
+
+        if self.queued >= self.max_queue:
+            self._counters["rejected_queue_full"] += 1
+            raise AdmissionRejected("queue_full", self.retry_after())
+
+        waiter = self._queue.push(name)
+        self._counters["max_queue_depth"] = max(
+            self._counters["max_queue_depth"], self.queued
+        )
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            if not (waiter.done() and not waiter.cancelled()):
+                self._counters["rejected_timeout"] += 1
+                self._waits.append(time.monotonic() - started)
+                raise AdmissionRejected("queue_timeout", self.retry_after())
+        except asyncio.CancelledError:
+            # 슬롯을 넘겨받은 직후 취소되었으면 다음 대기자에게 넘김
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if not (waiter.done() and not waiter.cancelled()):
+                self._queue.discard(waiter)
+        return self._admitted(time.monotonic() - started)
+
+    def _admitted(self, waited: float) -> float:
+        self._counters["admitted"] += 1
+        self._waits.append(waited)
+        return waited
+
+    def release(self, service_time: Optional[float] = None) -> None:
+        """슬롯을 반납합니다. 대기자가 있으면 슬롯을 바로 넘깁니다."""
+        if service_time is not None:
+            self._service_times.append(service_time)
+        if not self._queue.grant_next():
+            self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        return {
+            "enabled": ADMISSION_ENABLED,
+            "active": self.active,
+            "queued": self.queued,
+            "max_active": self.max_active,
+            "max_queue": self.max_queue,
+            **self._counters,
+            "wait_p50": round(waits[len(waits) // 2], 3) if waits else 0.0,
+            "wait_p95": (
+                round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3)
+                if waits
+                else 0.0
+            ),
+            "classes": self._queue.stats(),
+        }
+
+
+admission = AdmissionController(
+    ADMISSION_MAX_ACTIVE, ADMISSION_MAX_QUEUE, ADMISSION_MAX_WAIT
+)
+Gauge(
+    "staypost_admission_active", "Analysis requests admitted and being processed"
+).set_function(lambda: admission.active)
+Gauge(
+    "staypost_admission_queued", "Analysis requests waiting in the admission queue"
+).set_function(lambda: admission.queued)
+
+
+class AdmissionMiddleware:
+    """
+    ASGI 미들웨어: ADMISSION_PATH_PREFIXES 경로의 요청만 입장 제어를 거칩니다.
+    스트리밍 응답은 본문 전송이 끝날 때까지 슬롯을 유지합니다.
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            headers = {
+                key.decode("latin-1"): value.decode("latin-1")
+                for key, value in scope["headers"]
+            }
+            traffic_class.set(classify_request(scope["path"], headers))
+        if (
+            not ADMISSION_ENABLED
+            or scope["type"] != "http"
+            or not scope["path"].startswith(ADMISSION_PATH_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire()
+        except AdmissionRejected as e:
+            retry_after = math.ceil(e.retry_after)
+            logger.warning(
+                f"분석 요청 거절 ({e.reason}, {current_traffic_class()}): {scope['path']}, Retry-After {retry_after}s"
+            )
+            await _send_json(
+                send,
+                503,
+                {
+                    "error": "overloaded",
+                    "reason": e.reason,
+                    "message": "요청이 많아 지금은 처리할 수 없습니다. 잠시 후 다시 시도해주세요.",
+                    "retry_after": retry_after,
+                },
+                [(b"retry-after", str(retry_after).encode())],
+            )
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(time.monotonic() - started)
+
+
+async def _send_json(send, status: int, body: Dict[str, Any], headers) -> None:
+    payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(payload)).encode()),
+                *headers,
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": payload})
+
+
+def get_admission_stats() -> Dict[str, Any]:
+    """동시 처리 수, 대기열 깊이, 대기 시간 백분위수, 거절 수를 반환합니다."""
+    return admission.stats()
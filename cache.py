@@ -0,0 +1,251 @@
+"""
+펜션 분석 결과 캐시
+
+메모리 LRU(TTL 포함) + 디스크 2단계 캐시입니다.
+동일한 이미지 세트/프롬프트/모델 설정으로 들어온 분석 요청을
+GPT-4o 재호출 없이 즉시 반환하기 위해 사용합니다.
+3단계 분석의 단계별 결과 저장소도 같은 구조를 사용합니다.
+비동기 경로에서는 get_async()/set_async()를 사용해 디스크 I/O가 이벤트 루프를 막지 않게 합니다.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_image_urls(image_urls: Iterable[str]) -> list:
+    """
+    이미지 URL 목록을 순서/중복에 무관한 정규화된 목록으로 변환합니다.
+
+    스킴과 호스트는 소문자로, 앞뒤 공백은 제거하며 경로/쿼리는 그대로 둡니다.
+    """
+    normalized = set()
+    for url in image_urls:
+        url = url.strip()
+        parts = urlsplit(url)
+        if parts.scheme in ("http", "https"):
+            url = urlunsplit(
+                (
+                    parts.scheme.lower(),
+                    parts.netloc.lower(),
+                    parts.path,
+                    parts.query,
+                    parts.fragment,
+                )
+            )
+        normalized.add(url)
+    return sorted(normalized)
+
+
+def hash_text(text: str) -> str:
+    """텍스트의 SHA-256 해시(hex)를 반환합니다."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_cache_key(
+    image_urls: Iterable[str], prompt_text: str, settings: Dict[str, Any]
+) -> str:
+    """
+    이미지 세트 + 프롬프트 해시 + 모델 설정으로 콘텐츠 주소 키를 생성합니다.
+
+    프롬프트나 모델 설정이 바뀌면 키가 달라지므로 이전 항목은 자동으로 무효화됩니다.
+    """
+    payload = {
+        "image_urls": normalize_image_urls(image_urls),
+        "prompt": hash_text(prompt_text),
+        "settings": settings,
+    }
+    return hash_text(json.dumps(payload, sort_keys=True, ensure_ascii=False))
+
+
+class TwoTierCache:
+    """
+    메모리 LRU + 디스크 2단계 캐시
+
+    - 메모리 계층: OrderedDict 기반 LRU, 항목별 TTL
+    - 디스크 계층: 키별 JSON 파일, 재시작 후에도 유지되며 동일 TTL 적용
+    값은 JSON 직렬화 가능한 데이터여야 합니다.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str],
+        max_entries: int = 256,
+        ttl_seconds: float = 86400,
+    ):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "disk_errors": 0,
+        }
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        self._counters[name] += amount
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _remember(self, key: str, value: Any, expires_at: float) -> None:
+        """메모리 계층에 저장하고 용량 초과 시 가장 오래된 항목을 제거합니다."""
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._count("evictions")
+
+    def _get_memory(self, key: str, now: float) -> Tuple[bool, Any]:
+        """메모리 계층 조회 결과 (적중 여부, 값)"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._count("memory_hits")
+                    return True, value
+                del self._memory[key]
+                self._count("expirations")
+        return False, None
+
+    def _load_disk(self, key: str, now: float) -> Optional[Any]:
+        """디스크 계층에서 읽고, 있으면 메모리 계층에도 올립니다."""
+        value = self._read_disk(key, now)
+        with self._lock:
+            if value is None:
+                self._count("misses")
+                return None
+            self._count("disk_hits")
+            self._remember(key, value, now + self.ttl_seconds)
+        return value
+
+    def _set_memory(self, key: str, value: Any) -> float:
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._count("sets")
+        return expires_at
+
+    def get(self, key: str) -> Optional[Any]:
+        """캐시된 값을 반환합니다. 없거나 만료되었으면 None."""
+        now = time.time()
+        hit, value = self._get_memory(key, now)
+        if hit:
+            return value
+        return self._load_disk(key, now)
+
+    async def get_async(self, key: str) -> Optional[Any]:
+        """get()의 비동기 버전. 메모리 계층에 없을 때만 디스크 읽기를 스레드에서 실행합니다."""
+        now = time.time()
+        hit, value = self._get_memory(key, now)
+        if hit or not self.directory:
+            return value if hit else self._load_disk(key, now)
+        return await asyncio.to_thread(self._load_disk, key, now)
+
+    def set(self, key: str, value: Any) -> None:
+        """값을 메모리와 디스크 계층에 모두 저장합니다."""
+        expires_at = self._set_memory(key, value)
+        self._write_disk(key, value, expires_at)
+
+    async def set_async(self, key: str, value: Any) -> None:
+        """set()의 비동기 버전. 메모리 계층은 바로 갱신하고 디스크 쓰기는 스레드에서 실행합니다."""
+        expires_at = self._set_memory(key, value)
+        if self.directory:
+            await asyncio.to_thread(self._write_disk, key, value, expires_at)
+
+    def _read_disk(self, key: str, now: float) -> Optional[Any]:
+        if not self.directory:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"디스크 캐시 읽기 실패 ({key[:12]}): {str(e)}")
+            with self._lock:
+                self._count("disk_errors")
+            return None
+
+        if entry.get("expires_at", 0) <= now:
+            with self._lock:
+                self._count("expirations")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return entry.get("value")
+
+    def _write_disk(self, key: str, value: Any, expires_at: float) -> None:
+        if not self.directory:
+            return
+        try:
+            # 임시 파일에 쓴 뒤 교체하여 부분 기록된 파일이 읽히지 않도록 함
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"expires_at": expires_at, "value": value}, f, ensure_ascii=False
+                )
+            os.replace(tmp_path, self._disk_path(key))
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"디스크 캐시 쓰기 실패 ({key[:12]}): {str(e)}")
+            with self._lock:
+                self._count("disk_errors")
+
+    def clear(self) -> None:
+        """메모리 계층을 비웁니다. (디스크 계층은 TTL로 만료)"""
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """적중/실패/제거 카운터와 현재 크기를 반환합니다."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (
+            round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4)
+            if lookups
+            else 0.0
+        )
+        stats["max_entries"] = self.max_entries
+        stats["ttl_seconds"] = self.ttl_seconds
+        return stats
+
+
+def cache_from_env(prefix: str, default_dir: str) -> TwoTierCache:
+    """환경 변수(<prefix>_DIR, _MAX_ENTRIES, _TTL)로 캐시를 생성합니다. DIR을 빈 값으로 두면 디스크 계층 비활성화."""
+    return TwoTierCache(
+        directory=os.getenv(f"{prefix}_DIR", default_dir) or None,
+        max_entries=int(os.getenv(f"{prefix}_MAX_ENTRIES", "256")),
+        ttl_seconds=float(os.getenv(f"{prefix}_TTL", "86400")),
+    )
+
+
+# 프로세스 전역 분석 결과 캐시
+analysis_cache = cache_from_env("ANALYSIS_CACHE", os.path.join(".cache", "analysis"))
+
+# 3단계 분석의 단계별 결과 저장소 (재시도 시 마지막 성공 단계부터 재개)
+step_result_store = cache_from_env("STEP_RESULT_STORE", os.path.join(".cache", "steps"))
@@ -1,126 +1,197 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.output_parsers import PydanticOutputParser
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableLambda
 from prompts import PENSION_ANALYSIS_PROMPT
 from schemas import PensionAnalysis
+from cache import analysis_cache, make_cache_key
+from json_stream import JSONFieldStreamer, extract_first_json_object
+from clients import get_async_openai, get_chat_model, get_output_parser, get_registered
+from images import build_image_parts, preprocess_settings
+from hedging import hedged
+from upstream import UpstreamUnavailable, call_upstream, gateway
+from deadline import (
+    DeadlineExceeded,
+    can_start_call,
+    check_budget,
+    record_skipped_call,
+    within_deadline,
+)
+from metrics import Counter, Gauge, stage_timer
 import os
-import json
+import asyncio
 import logging
-import re
+import time
 
 logger = logging.getLogger(__name__)
 
+# 펜션 분석 체인의 모델 설정 (캐시 키에도 포함되어 설정 변경 시 캐시가 무효화됨)
+PENSION_MODEL_SETTINGS = {
+    "model": "gpt-4o",
+    "temperature": 0.3,  # 일관된 분석을 위해 낮은 temperature 설정
+    "max_tokens": 2000,
+}
+
+# 모델 캐스케이드: 작은 모델로 먼저 분석하고, 신뢰도가 낮거나 검증에 실패하면 PENSION_MODEL_SETTINGS 모델로 다시 분석
+# ANALYSIS_CASCADE_ENABLED=true 로 켬
+CASCADE_ENABLED = os.getenv("ANALYSIS_CASCADE_ENABLED", "false").lower() == "true"
+CASCADE_MODEL = os.getenv("CASCADE_MODEL", "gpt-4o-mini")
+# 작은 모델 결과의 confidence_score가 이 값 미만이면 상위 모델로 승격
+CASCADE_MIN_CONFIDENCE = float(os.getenv("CASCADE_MIN_CONFIDENCE", "0.7"))
+CASCADE_MODEL_SETTINGS = {**PENSION_MODEL_SETTINGS, "model": CASCADE_MODEL}
+
+# 출력 모드
+# - prompt: 프롬프트로 JSON 형식을 지시하고 PydanticOutputParser + 복구 단계로 파싱
+# - structured: PensionAnalysis JSON 스키마를 strict structured output으로 강제
+OUTPUT_MODES = ("prompt", "structured")
+DEFAULT_OUTPUT_MODE = os.getenv("ANALYSIS_OUTPUT_MODE", "prompt")
+
+# ANALYSIS_CACHE_ENABLED=false 로 결과 캐시를 끌 수 있음
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true"
+
+
+def resolve_output_mode(output_mode=None):
+    """요청별 출력 모드를 확정합니다. 지정하지 않으면 ANALYSIS_OUTPUT_MODE 기본값을 사용합니다."""
+    mode = output_mode or DEFAULT_OUTPUT_MODE
+    if mode not in OUTPUT_MODES:
+        raise ValueError(f"지원하지 않는 출력 모드입니다: {mode}")
+    return mode
+
+
+def strict_json_schema(model_cls):
+    """
+    Pydantic 모델의 JSON 스키마를 OpenAI strict structured output 규칙에 맞게 변환합니다.
+
+    모든 객체에 additionalProperties=false를 지정하고 모든 속성을 required로 만듭니다.
+    """
+
+    def tighten(node):
+        if isinstance(node, dict):
+            if node.get("type") == "object" and "properties" in node:
+                node["additionalProperties"] = False
+                node["required"] = list(node["properties"].keys())
+            for value in node.values():
+                tighten(value)
+        elif isinstance(node, list):
+            for value in node:
+                tighten(value)
+        return node
+
+    return tighten(model_cls.model_json_schema())
+
+
+def json_schema_response_format(model_cls):
+    """Chat Completions API의 response_format(json_schema, strict) 파라미터를 생성합니다."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model_cls.__name__,
+            "schema": strict_json_schema(model_cls),
+            "strict": True,
+        },
+    }
+
+
+# 출력 모드별 지연 시간 / 재시도 / 토큰 사용량 집계 ("경로:모드" 단위)
+_mode_stats = {}
+
+
+def record_mode_call(path, mode, latency, usage=None, retries=0, success=True):
+    """
+    출력 모드 비교를 위한 호출 통계를 기록합니다.
+
+    Args:
+        path (str): 호출 경로 ("chain" 또는 "steps")
+        mode (str): 출력 모드
+        latency (float): 전체 소요 시간(초)
+        usage (dict): {"input_tokens", "output_tokens"} 토큰 사용량
+        retries (int): 재시도 횟수
+        success (bool): 모델 출력이 바로 파싱/검증되었는지 여부
+    """
+    stats = _mode_stats.setdefault(
+        f"{path}:{mode}",
+        {
+            "calls": 0,
+            "retries": 0,
+            "parse_failures": 0,
+            "total_latency": 0.0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+        },
+    )
+    stats["calls"] += 1
+    stats["retries"] += retries
+    stats["total_latency"] += latency
+    if not success:
+        stats["parse_failures"] += 1
+    if usage:
+        stats["input_tokens"] += usage.get("input_tokens", 0) or 0
+        stats["output_tokens"] += usage.get("output_tokens", 0) or 0
+
+
+def get_output_mode_stats():
+    """출력 모드별 평균 지연 시간, 재시도율, 평균 토큰 사용량을 반환합니다."""
+    result = {}
+    for key, stats in _mode_stats.items():
+        calls = stats["calls"] or 1
+        result[key] = {
+            **stats,
+            "avg_latency": round(stats["total_latency"] / calls, 3),
+            "retry_rate": round(stats["retries"] / calls, 4),
+            "avg_input_tokens": round(stats["input_tokens"] / calls, 1),
+            "avg_output_tokens": round(stats["output_tokens"] / calls, 1),
+        }
+    return result
+
+
+def _add_usage(total, usage):
+    """AIMessage.usage_metadata 형식의 토큰 사용량을 누적합니다."""
+    if usage:
+        total["input_tokens"] += usage.get("input_tokens", 0) or 0
+        total["output_tokens"] += usage.get("output_tokens", 0) or 0
+
 
 def extract_json_from_text(text):
     """
     텍스트에서 JSON 블록을 추출하는 헬퍼 함수
-    
+
+    중괄호 깊이와 문자열 상태를 추적하는 단일 패스 스캐너(json_stream)로
+    최상위 JSON 객체 후보를 찾고, 파싱 가능한 첫 번째 객체를 반환합니다.
+    마크다운 코드 블록이나 앞뒤 설명 텍스트가 있어도 동작합니다.
+
     Args:
         text (str): JSON이 포함된 텍스트
-        
+
     Returns:
         dict: 파싱된 JSON 데이터 또는 None
     """
     if not text:
         return None
-    
-    logger.info(f"JSON 추출 시작. 텍스트 길이: {len(text)}")
-    logger.info(f"텍스트 내용: {text}")
-    
-    # 여러 가지 JSON 추출 방법 시도
-    patterns = [
-        # 1. 백틱으로 감싸진 JSON (가장 정확)
-        r'```(?:json)?\s*(\{.*?\})\s*```',
-        # 2. 일반적인 JSON 블록 (중첩된 객체 고려)
-        r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}',
-        # 3. 단순한 중괄호 쌍 (마지막 수단)
-        r'\{.*?\}',
-    ]
-    
-    for i, pattern in enumerate(patterns):
-        matches = re.findall(pattern, text, re.DOTALL)
-        logger.info(f"패턴 {i+1} ({pattern}) 매치 수: {len(matches)}")
-        
-        for j, match in enumerate(matches):
-            try:
-                # 백틱 패턴의 경우 그룹 1을 사용
-                json_str = match if isinstance(match, str) else match[0]
-                # 불필요한 공백 제거
-                json_str = json_str.strip()
-                logger.info(f"패턴 {i+1}, 매치 {j+1} 시도: {json_str[:100]}...")
-                
-                # JSON 파싱 시도
-                parsed = json.loads(json_str)
-                logger.info(f"JSON 추출 성공 (패턴 {i+1}, 매치 {j+1})")
-                return parsed
-            except (json.JSONDecodeError, IndexError, AttributeError) as e:
-                logger.warning(f"패턴 {i+1}, 매치 {j+1} 파싱 실패: {str(e)}")
-                continue
-    
-    # 마지막 시도: 첫 번째 {와 마지막 } 사이의 모든 내용
-    try:
-        start = text.find('{')
-        end = text.rfind('}')
-        if start != -1 and end > start:
-            json_str = text[start:end+1]
-            logger.info(f"시작/끝 인덱스 시도: {json_str[:100]}...")
-            parsed = json.loads(json_str)
-            logger.info("JSON 추출 성공 (시작/끝 인덱스)")
-            return parsed
-    except json.JSONDecodeError as e:
-        logger.warning(f"시작/끝 인덱스 파싱 실패: {str(e)}")
-    
-    # 추가 시도: JSON 수정 시도
-    try:
-        # 일반적인 JSON 오류 수정 시도
-        modified_text = text.strip()
-        
-        # 불필요한 텍스트 제거 시도
-        if '```' in modified_text:
-            # 마크다운 블록 제거
-            start = modified_text.find('```')
-            end = modified_text.rfind('```')
-            if start != -1 and end > start:
-                modified_text = modified_text[start+3:end].strip()
-                if modified_text.startswith('json'):
-                    modified_text = modified_text[4:].strip()
-        
-        # JSON 블록 찾기
-        start = modified_text.find('{')
-        end = modified_text.rfind('}')
-        if start != -1 and end > start:
-            json_str = modified_text[start:end+1]
-            
-            # 일반적인 JSON 오류 수정
-            json_str = json_str.replace('\n', ' ').replace('\r', ' ')
-            json_str = re.sub(r'\s+', ' ', json_str)  # 여러 공백을 하나로
-            
-            logger.info(f"수정 후 시도: {json_str[:100]}...")
-            parsed = json.loads(json_str)
-            logger.info("JSON 추출 성공 (수정 후)")
-            return parsed
-    except json.JSONDecodeError as e:
-        logger.warning(f"수정 후 파싱 실패: {str(e)}")
-    
+
+    logger.debug(f"JSON 추출 시작. 텍스트 길이: {len(text)}")
+
+    parsed = extract_first_json_object(text)
+    if parsed is not None:
+        logger.debug("JSON 추출 성공")
+        return parsed
+
     # AI가 JSON 형식이 아닌 다른 형태로 응답한 경우를 대비한 처리
-    logger.warning("JSON 추출 실패. AI 응답이 JSON 형식이 아닐 수 있습니다.")
-    logger.warning(f"전체 응답 내용: {text}")
-    
+    logger.warning(
+        f"JSON 추출 실패. AI 응답이 JSON 형식이 아닐 수 있습니다. (길이: {len(text)})"
+    )
     return None
 
 
 def extract_info_from_text(text):
     """
     AI 응답이 JSON 형식이 아닐 경우, 텍스트에서 정보를 추출하여 JSON으로 변환
-    
+
     Args:
         text (str): AI 응답 텍스트
-        
+
     Returns:
         dict: 추출된 정보를 담은 딕셔너리
     """
     logger.info("텍스트에서 정보 추출 시도")
-    
+
     # 기본 구조
     extracted_data = {
         "core_style": [],
@@ -129,26 +200,33 @@ def extract_info_from_text(text):
         "recommended_activities": [],
         "unsuitable_persona": [],
         "confidence_score": 0.5,
-        "pablo_memo": "이미지 분석 결과를 추출했습니다."
+        "pablo_memo": "이미지 분석 결과를 추출했습니다.",
     }
-    
+
     try:
         # 텍스트를 줄 단위로 분리
-        lines = text.split('\n')
-        
+        lines = text.split("\n")
+
         for line in lines:
             line = line.strip()
             if not line:
                 continue
-                
+
             # 핵심 스타일 추출
-            if any(keyword in line.lower() for keyword in ['스타일', 'style', '디자인', 'design']):
-                if ':' in line or '：' in line:
-                    content = line.split(':', 1)[1] if ':' in line else line.split('：', 1)[1]
-                    items = [item.strip() for item in content.split(',') if item.strip()]
+            if any(
+                keyword in line.lower()
+                for keyword in ["스타일", "style", "디자인", "design"]
+            ):
+                if ":" in line or "：" in line:
+                    content = (
+                        line.split(":", 1)[1] if ":" in line else line.split("：", 1)[1]
+                    )
+                    items = [
+                        item.strip() for item in content.split(",") if item.strip()
+                    ]
                     if items:
                         extracted_data["core_style"].extend(items[:3])  # 최대 3개
-        
+
         # 기본값 설정
         if not extracted_data["core_style"]:
             extracted_data["core_style"] = ["기본 스타일"]
@@ -160,16 +238,18 @@ def extract_info_from_text(text):
             extracted_data["recommended_activities"] = ["기본 활동"]
         if not extracted_data["unsuitable_persona"]:
             extracted_data["unsuitable_persona"] = ["부적합 고객"]
-            
+
         # 메모 업데이트
         if len(text) > 50:
-            extracted_data["pablo_memo"] = text[:200] + "..." if len(text) > 200 else text
+            extracted_data["pablo_memo"] = (
+                text[:200] + "..." if len(text) > 200 else text
+            )
         else:
             extracted_data["pablo_memo"] = "이미지 분석을 완료했습니다."
-            
-        logger.info(f"텍스트에서 추출된 데이터: {extracted_data}")
+
+        logger.debug(f"텍스트에서 추출된 데이터: {extracted_data}")
         return extracted_data
-        
+
     except Exception as e:
         logger.error(f"텍스트 정보 추출 실패: {str(e)}")
         return extracted_data
@@ -178,7 +258,7 @@ def extract_info_from_text(text):
 def create_fallback_response():
     """
     기본 응답을 생성하는 헬퍼 함수
-    
+
     Returns:
         PensionAnalysis: 기본 응답 객체
     """
@@ -189,266 +269,847 @@ def create_fallback_response():
         recommended_activities=["기본 활동"],
         unsuitable_persona=["부적합 고객"],
         confidence_score=0.1,
-        pablo_memo="이미지 분석에 실패했습니다. 다시 시도해주시거나 다른 이미지를 업로드해주세요."
+        pablo_memo="이미지 분석에 실패했습니다. 다시 시도해주시거나 다른 이미지를 업로드해주세요.",
     )
 
 
-def create_pension_analysis_chain():
+def build_analysis_input(inputs):
+    """
+    체인 입력을 모델 입력으로 변환합니다.
+
+    문자열(이미지 URL 목록 텍스트)이면 프롬프트 텍스트만 전달하고,
+    {"image_urls", "images"} 딕셔너리이면 전처리된 이미지 파트를 함께 첨부합니다.
+    """
+    if isinstance(inputs, str):
+        inputs = {"image_urls": inputs}
+    with stage_timer("prompt_render"):
+        prompt_text = PENSION_ANALYSIS_PROMPT.format(image_urls=inputs["image_urls"])
+    images = inputs.get("images")
+    if not images:
+        return prompt_text
+    return [HumanMessage(content=[{"type": "text", "text": prompt_text}, *images])]
+
+
+def create_pension_analysis_chain(model_settings=None):
     """
     펜션 스타일 분석을 위한 LangChain 체인을 생성합니다.
-    
+
+    모델과 파서는 클라이언트 레지스트리에서 공유 인스턴스를 가져옵니다.
+    요청 경로에서는 get_pension_analysis_chain()을 사용하세요.
+
+    Args:
+        model_settings (dict): ChatOpenAI 설정 (기본값: PENSION_MODEL_SETTINGS)
+
     Returns:
-        LangChain Runnable: 펜션 분석 체인
+        LangChain Runnable: 펜션 분석 체인. 출력은 {"raw", "parsed", "parsing_error"} 딕셔너리이며
+        파싱에 실패해도 원본 응답 텍스트(raw)를 그대로 담고 있어 재호출 없이 복구할 수 있습니다.
     """
-    # OpenAI 모델 초기화
-    model = ChatOpenAI(
-        model="gpt-4o",
-        temperature=0.3,  # 일관된 분석을 위해 낮은 temperature 설정
-        max_tokens=2000
-    )
-    
-    # Pydantic 출력 파서 초기화
-    parser = PydanticOutputParser(pydantic_object=PensionAnalysis)
-    
+    # OpenAI 모델 (공유 커넥션 풀 사용)
+    model = get_chat_model(**(model_settings or PENSION_MODEL_SETTINGS))
+
+    # Pydantic 출력 파서
+    parser = get_output_parser(PensionAnalysis)
+
+    def parse_with_raw(message):
+        """파싱 결과와 원본 응답 텍스트를 함께 반환 (파싱 실패 시에도 원본 텍스트 보존)"""
+        try:
+            with stage_timer("output_parser"):
+                parsed, error = parser.invoke(message), None
+        except Exception as e:
+            parsed, error = None, e
+        return {
+            "raw": message.content,
+            "parsed": parsed,
+            "parsing_error": error,
+            "usage": message.usage_metadata,
+        }
+
     # LCEL 체인 구성
     chain = (
-        {"image_urls": RunnablePassthrough()} 
-        | PENSION_ANALYSIS_PROMPT 
-        | model 
-        | parser
+        RunnableLambda(build_analysis_input) | model | RunnableLambda(parse_with_raw)
     )
-    
+
     return chain
 
 
-def analyze_pension_style_with_retry(image_urls, max_retries=1):
+def create_structured_analysis_chain(model_settings=None):
+    """
+    PensionAnalysis JSON 스키마를 strict structured output으로 강제하는 분석 체인을 생성합니다.
+
+    출력 형식은 create_pension_analysis_chain()과 동일한 {"raw", "parsed", "parsing_error"} 딕셔너리입니다.
+    모델이 스키마에 맞는 JSON만 생성하므로 파싱은 단일 검증 단계로 끝납니다.
+
+    Args:
+        model_settings (dict): ChatOpenAI 설정 (기본값: PENSION_MODEL_SETTINGS)
+
+    Returns:
+        LangChain Runnable: 구조화 출력 분석 체인
+    """
+    model = get_chat_model(**(model_settings or PENSION_MODEL_SETTINGS))
+    structured_model = model.with_structured_output(
+        PensionAnalysis, method="json_schema", strict=True, include_raw=True
+    )
+
+    def normalize(output):
+        raw_message = output["raw"]
+        return {
+            "raw": raw_message.content,
+            "parsed": output["parsed"],
+            "parsing_error": output["parsing_error"],
+            "usage": getattr(raw_message, "usage_metadata", None),
+        }
+
+    return (
+        RunnableLambda(build_analysis_input)
+        | structured_model
+        | RunnableLambda(normalize)
+    )
+
+
+def get_pension_analysis_chain(output_mode="prompt", model_settings=None):
+    """프로세스 전역에서 출력 모드(+ 모델 설정)별로 한 번만 생성되는 펜션 분석 체인을 반환합니다."""
+    suffix = ""
+    if model_settings and model_settings != PENSION_MODEL_SETTINGS:
+        suffix = ":" + model_settings["model"]
+    if output_mode == "structured":
+        return get_registered(
+            "pension_analysis_chain:structured" + suffix,
+            lambda: create_structured_analysis_chain(model_settings),
+        )
+    return get_registered(
+        "pension_analysis_chain" + suffix,
+        lambda: create_pension_analysis_chain(model_settings),
+    )
+
+
+def analysis_cache_key(image_urls, output_mode="prompt"):
+    """
+    분석 결과 캐시 키를 생성합니다.
+
+    이미지 URL 세트(순서 무관) + PENSION_ANALYSIS_PROMPT 해시 + 모델 설정(출력 모드 포함)으로 구성됩니다.
+    이미지 전처리나 모델 캐스케이드가 켜져 있으면 그 설정도 포함됩니다.
+    """
+    settings = {**PENSION_MODEL_SETTINGS, "output_mode": output_mode}
+    if preprocess_settings():
+        settings["image_preprocess"] = preprocess_settings()
+    if CASCADE_ENABLED:
+        settings["cascade"] = {
+            "model": CASCADE_MODEL,
+            "min_confidence": CASCADE_MIN_CONFIDENCE,
+        }
+    return make_cache_key(image_urls, PENSION_ANALYSIS_PROMPT.template, settings)
+
+
+async def get_cached_analysis(image_urls, output_mode="prompt"):
+    """
+    캐시된 분석 결과를 반환합니다.
+
+    Returns:
+        PensionAnalysis: 캐시 적중 시 분석 결과, 없으면 None
+    """
+    if not ANALYSIS_CACHE_ENABLED:
+        return None
+    cached = await analysis_cache.get_async(analysis_cache_key(image_urls, output_mode))
+    if cached is None:
+        return None
+    try:
+        return PensionAnalysis(**cached)
+    except Exception as e:
+        logger.warning(f"캐시된 분석 결과 검증 실패, 무시합니다: {str(e)}")
+        return None
+
+
+async def store_cached_analysis(image_urls, result, output_mode="prompt"):
+    """정상 파싱된 분석 결과를 캐시에 저장합니다. (fallback 응답은 저장하지 않음)"""
+    if ANALYSIS_CACHE_ENABLED and result is not None:
+        await analysis_cache.set_async(
+            analysis_cache_key(image_urls, output_mode), result.model_dump()
+        )
+
+
+# 분석 결과를 만들어낸 복구 단계 (사용 빈도 집계용)
+RECOVERY_TIERS = (
+    "parser",
+    "json_extract",
+    "defaults_merge",
+    "text_extract",
+    "fallback",
+    "upstream_error",
+)
+_recovery_counts = {tier: 0 for tier in RECOVERY_TIERS}
+_recovery_tier_total = Counter(
+    "staypost_analysis_recovery_tier_total",
+    "Analysis results by the recovery tier that produced them",
+    ("tier",),
+)
+_fallback_total = Counter(
+    "staypost_analysis_fallback_responses_total",
+    "Default (fallback) analysis responses by cause",
+    ("reason",),
+)
+
+# 캐시에 저장해도 되는 (모델이 실제로 온전한 분석을 반환한) 단계
+CACHEABLE_TIERS = ("parser", "json_extract")
+
+
+def _record_tier(tier):
+    _recovery_counts[tier] += 1
+    _recovery_tier_total.inc(tier=tier)
+
+
+def get_recovery_stats():
+    """복구 단계별 사용 횟수를 반환합니다."""
+    return dict(_recovery_counts)
+
+
+def _fallback_result(original_content, tier="fallback"):
+    """최종 fallback: 기본 응답을 생성합니다."""
+    logger.warning("최종 fallback: 기본 응답 생성")
+    _record_tier(tier)
+    _fallback_total.inc(reason=tier)
+    try:
+        fallback_result = create_fallback_response()
+        logger.info("최종 fallback 성공")
+        return fallback_result, original_content
+    except Exception as final_error:
+        logger.error(f"최종 fallback도 실패: {str(final_error)}")
+        return None, original_content
+
+
+def _recover(original_content, lenient=True):
+    """
+    원본 텍스트에서 분석 결과를 복구하고 사용된 단계를 함께 반환합니다.
+
+    Args:
+        original_content (str): AI 모델의 원본 응답 텍스트
+        lenient (bool): False이면 JSON 추출 + 검증까지만 시도 (재시도 전 단계)
+
+    Returns:
+        tuple: (PensionAnalysis 또는 None, 복구 단계 이름 또는 None)
+    """
+    with stage_timer("recover"):
+        return _recover_tiers(original_content, lenient)
+
+
+def _recover_tiers(original_content, lenient):
+    """_recover의 본체: JSON 추출 → 검증 → 기본값 병합 → 텍스트 정보 추출 순으로 시도합니다."""
+    logger.info(f"원본 응답 길이: {len(original_content)}")
+
+    # 개선된 JSON 추출 시도
+    with stage_timer("json_extract"):
+        parsed_data = extract_json_from_text(original_content)
+
+    if parsed_data:
+        try:
+            # Pydantic 모델로 변환
+            with stage_timer("validation"):
+                result = PensionAnalysis(**parsed_data)
+            logger.info("수동 파싱 성공")
+            return result, "json_extract"
+        except Exception as validation_error:
+            logger.error(f"Pydantic 검증 실패: {str(validation_error)}")
+
+        if not lenient:
+            return None, None
+
+        # 검증 실패 시 기본값으로 수정 시도
+        try:
+            logger.info("검증 실패한 데이터를 기본값으로 수정 시도")
+            # 필수 필드가 없는 경우 기본값 추가
+            required_fields = {
+                "core_style": ["기본 스타일"],
+                "key_elements": ["기본 요소"],
+                "target_persona": ["일반 고객"],
+                "recommended_activities": ["기본 활동"],
+                "unsuitable_persona": ["부적합 고객"],
+                "confidence_score": 0.1,
+                "pablo_memo": "이미지 분석에 실패했습니다.",
+            }
+
+            # 기존 데이터와 기본값 병합
+            for field, default_value in required_fields.items():
+                if field not in parsed_data:
+                    parsed_data[field] = default_value
+                elif field == "confidence_score":
+                    # confidence_score 범위 검증
+                    try:
+                        score = float(parsed_data[field])
+                        if not 0.0 <= score <= 1.0:
+                            parsed_data[field] = 0.1
+                    except (ValueError, TypeError):
+                        parsed_data[field] = 0.1
+
+            result = PensionAnalysis(**parsed_data)
+            logger.info("기본값으로 수정 후 파싱 성공")
+            return result, "defaults_merge"
+        except Exception as fix_error:
+            logger.error(f"기본값 수정도 실패: {str(fix_error)}")
+            return None, None
+
+    if not lenient:
+        return None, None
+
+    logger.warning("JSON 추출 실패. 텍스트에서 정보 추출 시도")
+    # JSON 추출이 실패한 경우, 텍스트에서 정보를 추출해보기
+    extracted_data = extract_info_from_text(original_content)
+
+    if extracted_data:
+        try:
+            result = PensionAnalysis(**extracted_data)
+            logger.info("텍스트 정보 추출 후 파싱 성공")
+            return result, "text_extract"
+        except Exception as text_extract_error:
+            logger.error(f"텍스트 정보 추출 후 파싱 실패: {str(text_extract_error)}")
+
+    return None, None
+
+
+def recover_analysis_from_text(original_content):
+    """
+    파서가 실패한 원본 응답 텍스트에서 분석 결과를 복구합니다.
+
+    JSON 추출 → 기본값 병합 → 텍스트 정보 추출 → 기본 응답 순으로 시도합니다.
+
+    Args:
+        original_content (str): AI 모델의 원본 응답 텍스트
+
+    Returns:
+        tuple: (PensionAnalysis, str) - 복구된 분석 결과와 원본 텍스트
+    """
+    result, tier = _recover(original_content)
+    if result is None:
+        return _fallback_result(original_content)
+    _record_tier(tier)
+    return result, original_content
+
+
+def _fallback_for_error(error):
+    """업스트림 호출 자체가 실패해 원본 텍스트가 없는 경우의 기본 응답을 생성합니다."""
+    # traceback 포맷팅은 로깅 파이프라인의 출력 스레드에서 수행
+    logger.error(f"AI 모델 호출 실패: {str(error)}", exc_info=error)
+    return _fallback_result(
+        f"Error generating content: {str(error)}", tier="upstream_error"
+    )
+
+
+def _format_image_urls(image_urls):
+    """이미지 URL들을 프롬프트에 넣을 문자열로 변환합니다."""
+    return "\n".join([f"- {url}" for url in image_urls])
+
+
+async def _handle_chain_output(
+    output, image_urls, use_cache, final, output_mode="prompt", meta=None
+):
+    """
+    체인 출력({"raw", "parsed", "parsing_error"})을 분석 결과로 변환합니다.
+
+    파서가 실패하면 이미 받은 원본 텍스트로 복구를 시도하므로 모델을 다시 호출하지 않습니다.
+    마지막 시도가 아니면 JSON 추출 단계까지만 시도하고, 실패 시 None을 반환해 재시도하게 합니다.
+
+    Returns:
+        tuple 또는 None: (PensionAnalysis, str) - 분석 결과와 원본 텍스트
+    """
+    raw = output["raw"]
+    if output["parsed"] is not None:
+        logger.info("펜션 분석 성공")
+        _record_tier("parser")
+        if meta is not None:
+            meta["recovery_tier"] = "parser"
+        if use_cache:
+            await store_cached_analysis(image_urls, output["parsed"], output_mode)
+        return output["parsed"], raw
+
+    logger.warning(
+        f"파서 실패, 원본 텍스트로 복구 시도: {type(output['parsing_error']).__name__}"
+    )
+    result, tier = _recover(raw, lenient=final)
+    if result is not None:
+        _record_tier(tier)
+        if meta is not None:
+            meta["recovery_tier"] = tier
+        if use_cache and tier in CACHEABLE_TIERS:
+            await store_cached_analysis(image_urls, result, output_mode)
+        return result, raw
+    if final:
+        return _fallback_result(raw)
+    return None
+
+
+# 캐스케이드 단계별 호출 수 / 지연 시간, 승격 사유별 횟수
+_cascade_stats = {
+    "small": {"calls": 0, "total_latency": 0.0},
+    "large": {"calls": 0, "total_latency": 0.0},
+    "escalations": {"low_confidence": 0, "validation_failed": 0, "error": 0},
+}
+
+
+def _record_cascade(tier, latency, escalation=None):
+    _cascade_stats[tier]["calls"] += 1
+    _cascade_stats[tier]["total_latency"] += latency
+    if escalation:
+        _cascade_stats["escalations"][escalation] += 1
+
+
+def get_cascade_stats():
+    """캐스케이드 승격률과 단계별 평균 지연 시간을 반환합니다."""
+    small_calls = _cascade_stats["small"]["calls"]
+    escalated = sum(_cascade_stats["escalations"].values())
+    tiers = {}
+    for tier in ("small", "large"):
+        stats = _cascade_stats[tier]
+        tiers[tier] = {
+            **stats,
+            "avg_latency": round(stats["total_latency"] / (stats["calls"] or 1), 3),
+        }
+    return {
+        "enabled": CASCADE_ENABLED,
+        "model": CASCADE_MODEL,
+        "min_confidence": CASCADE_MIN_CONFIDENCE,
+        **tiers,
+        "escalations": dict(_cascade_stats["escalations"]),
+        "escalation_rate": round(escalated / small_calls, 4) if small_calls else 0.0,
+    }
+
+
+async def _run_cascade_small(
+    image_urls, chain_input, use_cache, output_mode, meta=None
+):
+    """
+    캐스케이드 1단계: CASCADE_MODEL로 한 번 분석합니다.
+
+    결과가 검증을 통과하고 confidence_score가 CASCADE_MIN_CONFIDENCE 이상이면 그대로 채택하고,
+    그렇지 않으면 None을 반환해 상위 모델로 승격합니다 (작은 모델에서는 재시도하지 않음).
+
+    Returns:
+        tuple 또는 None: (PensionAnalysis, str) - 채택된 분석 결과와 원본 텍스트
+    """
+    chain = get_pension_analysis_chain(output_mode, CASCADE_MODEL_SETTINGS)
+    started = time.monotonic()
+    usage = {"input_tokens": 0, "output_tokens": 0}
+    result, tier, raw, reason = None, None, None, None
+    try:
+        output = await hedged(
+            f"cascade:{output_mode}",
+            lambda: call_upstream(lambda: chain.ainvoke(chain_input)),
+            _chain_output_parsed,
+        )
+    except (UpstreamUnavailable, DeadlineExceeded):
+        raise
+    except Exception as e:
+        logger.warning(
+            f"캐스케이드 {CASCADE_MODEL} 호출 실패, 상위 모델로 승격: {str(e)}"
+        )
+        reason = "error"
+    else:
+        _add_usage(usage, output.get("usage"))
+        raw = output["raw"]
+        result, tier = output["parsed"], "parser"
+        if result is None:
+            result, tier = _recover(raw, lenient=False)
+        if result is None:
+            reason = "validation_failed"
+        elif result.confidence_score < CASCADE_MIN_CONFIDENCE:
+            reason = "low_confidence"
+
+    latency = time.monotonic() - started
+    record_mode_call(
+        f"cascade:{CASCADE_MODEL}", output_mode, latency, usage, success=reason is None
+    )
+    _record_cascade("small", latency, reason)
+    if meta is not None:
+        meta["cascade"] = {
+            "model": CASCADE_MODEL,
+            "escalated": reason is not None,
+            "reason": reason,
+            "small_confidence": result.confidence_score if result is not None else None,
+        }
+    if reason is not None:
+        logger.info(
+            f"캐스케이드 승격 ({reason}): {CASCADE_MODEL} → {PENSION_MODEL_SETTINGS['model']}"
+        )
+        return None
+
+    _record_tier(tier)
+    if meta is not None:
+        meta["recovery_tier"] = tier
+    if use_cache:
+        await store_cached_analysis(image_urls, result, output_mode)
+    return result, raw
+
+
+# 비동기 분석 동시 실행 상한 (워커당 동시에 진행되는 업스트림 분석 수)
+ANALYSIS_MAX_CONCURRENCY = int(os.getenv("ANALYSIS_MAX_CONCURRENCY", "8"))
+_analysis_semaphore = asyncio.Semaphore(ANALYSIS_MAX_CONCURRENCY)
+_async_analysis_state = {"in_flight": 0, "waiting": 0, "completed": 0}
+Gauge(
+    "staypost_analysis_in_flight", "Pension analyses currently holding an analysis slot"
+).set_function(lambda: _async_analysis_state["in_flight"])
+Gauge(
+    "staypost_analysis_waiting", "Pension analyses waiting for an analysis slot"
+).set_function(lambda: _async_analysis_state["waiting"])
+
+
+def get_async_analysis_stats():
+    """비동기 분석 경로의 동시 실행 상태를 반환합니다."""
+    return {**_async_analysis_state, "max_concurrency": ANALYSIS_MAX_CONCURRENCY}
+
+
+async def analyze_pension_style_with_retry_async(
+    image_urls, max_retries=1, use_cache=True, output_mode=None, meta=None
+):
     """
     펜션 스타일 분석을 수행하며, 파싱 실패 시 재시도를 지원합니다.
-    
+
+    ainvoke 기반으로 이벤트 루프를 막지 않으며, 동시 업스트림 호출 수는
+    ANALYSIS_MAX_CONCURRENCY 세마포어로 제한됩니다.
+
     Args:
         image_urls (List[str]): 분석할 펜션 이미지 URL 목록
         max_retries (int): 최대 재시도 횟수 (기본값: 1)
-    
+        use_cache (bool): 결과 캐시 사용 여부 (기본값: True)
+        output_mode (str): "prompt" 또는 "structured" (기본값: ANALYSIS_OUTPUT_MODE)
+        meta (dict): 이미지 전처리 보고서 등 처리 정보를 채워 넣을 딕셔너리 (선택)
+
     Returns:
         tuple: (PensionAnalysis, str) - 분석 결과와 원본 텍스트
+
+    Raises:
+        UpstreamUnavailable: 서킷 브레이커가 열려 업스트림을 호출하지 않은 경우
+        DeadlineExceeded: 요청 마감 안에 분석을 시작하거나 끝낼 수 없는 경우
     """
-    chain = create_pension_analysis_chain()
-    
-    # 이미지 URL들을 문자열로 변환
-    image_urls_text = "\n".join([f"- {url}" for url in image_urls])
-    
+    output_mode = resolve_output_mode(output_mode)
+    if use_cache:
+        cached = await get_cached_analysis(image_urls, output_mode)
+        if cached is not None:
+            logger.info("펜션 분석 캐시 적중")
+            if meta is not None:
+                meta["analysis_path"] = "cache"
+            return cached, None
+
+    # 이미지 전처리/패킹 (캐시 적중 시에는 이미지를 내려받지 않음)
+    images, report = await build_image_parts(image_urls)
+    if report is not None and meta is not None:
+        meta["image_preprocess"] = report
+
+    _async_analysis_state["waiting"] += 1
+    try:
+        await within_deadline(_analysis_semaphore.acquire(), "analysis_queue")
+    finally:
+        _async_analysis_state["waiting"] -= 1
+
+    _async_analysis_state["in_flight"] += 1
+    try:
+        return await _run_analysis_async(
+            image_urls, max_retries, use_cache, output_mode, images, meta
+        )
+    finally:
+        _async_analysis_state["in_flight"] -= 1
+        _async_analysis_state["completed"] += 1
+        _analysis_semaphore.release()
+
+
+async def _run_analysis_async(
+    image_urls, max_retries, use_cache, output_mode, images=None, meta=None
+):
+    """세마포어 획득 후 실제 체인 호출과 재시도/복구를 수행합니다."""
+    image_urls_text = _format_image_urls(image_urls)
+    chain_input = (
+        {"image_urls": image_urls_text, "images": images} if images else image_urls_text
+    )
+    if not CASCADE_ENABLED:
+        return await _run_chain_attempts(
+            image_urls, chain_input, max_retries, use_cache, output_mode, meta
+        )
+
+    accepted = await _run_cascade_small(
+        image_urls, chain_input, use_cache, output_mode, meta
+    )
+    if accepted is not None:
+        return accepted
+    started = time.monotonic()
+    try:
+        return await _run_chain_attempts(
+            image_urls, chain_input, max_retries, use_cache, output_mode, meta
+        )
+    finally:
+        _record_cascade("large", time.monotonic() - started)
+
+
+def _chain_output_parsed(output):
+    """헤지 요청 중 파싱까지 성공한 체인 출력을 우선 채택"""
+    return output["parsed"] is not None
+
+
+async def _run_chain_attempts(
+    image_urls, chain_input, max_retries, use_cache, output_mode, meta=None
+):
+    """PENSION_MODEL_SETTINGS 모델로 체인을 호출하고, 파싱에 실패하면 재시도합니다."""
+    chain = get_pension_analysis_chain(output_mode)
+    started = time.monotonic()
+    usage = {"input_tokens": 0, "output_tokens": 0}
+
     for attempt in range(max_retries + 1):
+        final = attempt == max_retries
         try:
-            # 체인 실행
-            result = chain.invoke(image_urls_text)
-            logger.info("펜션 분석 성공")
-            return result, None
+            # 업스트림 게이트웨이(동시성 한도/백오프 재시도/서킷 브레이커)를 거쳐 호출하고,
+            # 느린 응답은 HEDGE_ENABLED일 때 헤지 요청으로 한 번 더 보내 먼저 파싱된 응답을 사용
+            output = await hedged(
+                f"chain:{output_mode}",
+                lambda: call_upstream(lambda: chain.ainvoke(chain_input)),
+                _chain_output_parsed,
+            )
+        except (UpstreamUnavailable, DeadlineExceeded):
+            record_mode_call(
+                "chain",
+                output_mode,
+                time.monotonic() - started,
+                usage,
+                attempt,
+                success=False,
+            )
+            raise
         except Exception as e:
-            logger.warning(f"파싱 실패 (시도 {attempt + 1}/{max_retries + 1}): {str(e)}")
-            
-            if attempt < max_retries:
-                logger.info(f"재시도 중... (시도 {attempt + 1}/{max_retries + 1})")
-                continue
-            else:
-                # 마지막 시도에서도 실패한 경우, 원본 텍스트를 가져와서 수동 파싱 시도
-                try:
-                    print("=== 원본 텍스트 생성 시작 ===")
-                    logger.info("원본 텍스트 생성 시작")
-                    # 원본 텍스트만 가져오기
-                    model = ChatOpenAI(model="gpt-4o", temperature=0.3)
-                    print("=== ChatOpenAI 모델 생성 완료 ===")
-                    logger.info("ChatOpenAI 모델 생성 완료")
-                    
-                    prompt_response = PENSION_ANALYSIS_PROMPT.invoke({"image_urls": image_urls_text})
-                    print("=== 프롬프트 생성 완료 ===")
-                    logger.info("프롬프트 생성 완료")
-                    
-                    print("=== AI 모델 호출 시작 ===")
-                    logger.info("AI 모델 호출 시작")
-                    original_content = model.invoke(prompt_response).content
-                    print("=== AI 모델 호출 완료 ===")
-                    logger.info("AI 모델 호출 완료")
-                    
-                    print(f"=== 원본 응답 길이: {len(original_content)} ===")
-                    print(f"=== 원본 응답 내용 (전체): {original_content} ===")
-                    logger.info(f"원본 응답 길이: {len(original_content)}")
-                    logger.info(f"원본 응답 내용 (전체): {original_content}")
-                    
-                    # 개선된 JSON 추출 시도
-                    parsed_data = extract_json_from_text(original_content)
-                    
-                    if parsed_data:
-                        logger.info(f"추출된 JSON 데이터: {parsed_data}")
-                        try:
-                            # Pydantic 모델로 변환
-                            result = PensionAnalysis(**parsed_data)
-                            logger.info("수동 파싱 성공")
-                            return result, original_content
-                        except Exception as validation_error:
-                            logger.error(f"Pydantic 검증 실패: {str(validation_error)}")
-                            logger.error(f"검증 실패한 데이터: {parsed_data}")
-                            
-                            # 검증 실패 시 기본값으로 수정 시도
-                            try:
-                                logger.info("검증 실패한 데이터를 기본값으로 수정 시도")
-                                # 필수 필드가 없는 경우 기본값 추가
-                                required_fields = {
-                                    'core_style': ['기본 스타일'],
-                                    'key_elements': ['기본 요소'],
-                                    'target_persona': ['일반 고객'],
-                                    'recommended_activities': ['기본 활동'],
-                                    'unsuitable_persona': ['부적합 고객'],
-                                    'confidence_score': 0.1,
-                                    'pablo_memo': '이미지 분석에 실패했습니다.'
-                                }
-                                
-                                # 기존 데이터와 기본값 병합
-                                for field, default_value in required_fields.items():
-                                    if field not in parsed_data:
-                                        parsed_data[field] = default_value
-                                    elif field == 'confidence_score':
-                                        # confidence_score 범위 검증
-                                        try:
-                                            score = float(parsed_data[field])
-                                            if not 0.0 <= score <= 1.0:
-                                                parsed_data[field] = 0.1
-                                        except (ValueError, TypeError):
-                                            parsed_data[field] = 0.1
-                                
-                                result = PensionAnalysis(**parsed_data)
-                                logger.info("기본값으로 수정 후 파싱 성공")
-                                return result, original_content
-                                
-                            except Exception as fix_error:
-                                logger.error(f"기본값 수정도 실패: {str(fix_error)}")
-                                # 최종 fallback: 기본 응답 생성
-                                logger.warning("최종 fallback: 기본 응답 생성")
-                                try:
-                                    fallback_result = create_fallback_response()
-                                    logger.info("최종 fallback 성공")
-                                    return fallback_result, original_content
-                                except Exception as final_error:
-                                    logger.error(f"최종 fallback도 실패: {str(final_error)}")
-                                    return None, original_content
-                    else:
-                        logger.warning("JSON 추출 실패. 텍스트에서 정보 추출 시도")
-                        # JSON 추출이 실패한 경우, 텍스트에서 정보를 추출해보기
-                        extracted_data = extract_info_from_text(original_content)
-                        
-                        if extracted_data:
-                            try:
-                                result = PensionAnalysis(**extracted_data)
-                                logger.info("텍스트 정보 추출 후 파싱 성공")
-                                return result, original_content
-                            except Exception as text_extract_error:
-                                logger.error(f"텍스트 정보 추출 후 파싱 실패: {str(text_extract_error)}")
-                                # 최종 fallback: 기본 응답 생성
-                                logger.warning("최종 fallback: 기본 응답 생성")
-                                try:
-                                    fallback_result = create_fallback_response()
-                                    logger.info("최종 fallback 성공")
-                                    return fallback_result, original_content
-                                except Exception as final_error:
-                                    logger.error(f"최종 fallback도 실패: {str(final_error)}")
-                                    return None, original_content
-                        else:
-                            logger.error("텍스트 정보 추출도 실패")
-                            logger.error(f"추출 실패한 원본 내용: {original_content}")
-                            # 최종 fallback: 기본 응답 생성
-                            logger.warning("최종 fallback: 기본 응답 생성")
-                            try:
-                                fallback_result = create_fallback_response()
-                                logger.info("최종 fallback 성공")
-                                return fallback_result, original_content
-                            except Exception as final_error:
-                                logger.error(f"최종 fallback도 실패: {str(final_error)}")
-                                return None, original_content
-                        
-                except Exception as inner_e:
-                    logger.error(f"원본 텍스트 생성 실패: {str(inner_e)}")
-                    logger.error(f"inner_e 타입: {type(inner_e)}")
-                    import traceback
-                    logger.error(f"inner_e 상세: {traceback.format_exc()}")
-                    # 최종 fallback: 기본 응답 생성
-                    logger.warning("원본 텍스트 생성 실패 시 최종 fallback: 기본 응답 생성")
-                    try:
-                        fallback_result = create_fallback_response()
-                        logger.info("최종 fallback 성공")
-                        return fallback_result, f"Error generating content: {str(inner_e)}"
-                    except Exception as final_error:
-                        logger.error(f"최종 fallback도 실패: {str(final_error)}")
-                        return None, f"Error generating content: {str(inner_e)}"
-    
-    # 모든 시도가 실패한 경우, 기본 응답 생성
+            # 일시적 오류는 게이트웨이가 이미 백오프하며 재시도했으므로 여기서 바로 다시 호출하지 않음
+            logger.warning(
+                f"AI 모델 호출 실패 (시도 {attempt + 1}/{max_retries + 1}): {str(e)}"
+            )
+            record_mode_call(
+                "chain",
+                output_mode,
+                time.monotonic() - started,
+                usage,
+                attempt,
+                success=False,
+            )
+            return _fallback_for_error(e)
+
+        _add_usage(usage, output.get("usage"))
+        # 요청 마감 안에 한 번 더 호출할 시간이 없으면 이번 응답으로 복구 단계까지 진행
+        out_of_time = not final and not can_start_call()
+        handled = await _handle_chain_output(
+            output, image_urls, use_cache, final or out_of_time, output_mode, meta
+        )
+        if handled is not None:
+            if out_of_time and output["parsed"] is None:
+                record_skipped_call("chain_retry")
+            record_mode_call(
+                "chain",
+                output_mode,
+                time.monotonic() - started,
+                usage,
+                attempt,
+                success=output["parsed"] is not None,
+            )
+            return handled
+        logger.info(f"재시도 중... (시도 {attempt + 1}/{max_retries + 1})")
+
     logger.warning("모든 파싱 시도 실패, 기본 응답 생성")
+    return _fallback_result("Fallback response generated due to parsing failure")
+
+
+def _parse_stream_output(raw):
+    """
+    스트림 전체 텍스트를 체인과 같은 출력 파서로 먼저 검증하고, 실패하면 복구 단계로 넘깁니다.
+
+    Returns:
+        tuple: (PensionAnalysis 또는 None, 복구 단계 이름 또는 None)
+    """
     try:
-        logger.info("기본 응답 생성 시작")
-        fallback_result = create_fallback_response()
-        logger.info(f"기본 응답 생성 성공: {fallback_result}")
-        return fallback_result, "Fallback response generated due to parsing failure"
-    except Exception as fallback_error:
-        logger.error(f"기본 응답 생성도 실패: {str(fallback_error)}")
-        logger.error(f"fallback_error 타입: {type(fallback_error)}")
-        import traceback
-        logger.error(f"fallback_error 상세: {traceback.format_exc()}")
-        return None, "Complete failure - unable to generate any response"
+        with stage_timer("output_parser"):
+            result = get_output_parser(PensionAnalysis).parse(raw)
+    except Exception as e:
+        logger.warning(f"스트림 응답 파서 실패, 복구 시도: {type(e).__name__}")
+        return _recover(raw)
+    logger.info("펜션 분석 성공 (스트리밍)")
+    return result, "parser"
+
+
+async def stream_pension_analysis(
+    image_urls, use_cache=True, output_mode=None, meta=None
+):
+    """
+    펜션 분석을 모델 토큰 스트림으로 실행하며, PensionAnalysis 필드가 완성되는 즉시 내보냅니다.
 
+    스트림이 끝나면 전체 텍스트를 출력 파서로 검증하고, 실패하면 복구 단계(_recover)를 거쳐 최종 결과를 내보냅니다.
+    필드 이벤트는 미리보기이며, 검증 결과와 다를 수 있으므로 최종 결과가 기준입니다.
 
-async def call_openai_api(prompt: str, image_urls: list) -> str:
+    Yields:
+        tuple: ("field", (필드 이름, 값)) 또는 ("result", (PensionAnalysis, 원본 텍스트))
+    """
+    output_mode = resolve_output_mode(output_mode)
+    if use_cache:
+        cached = await get_cached_analysis(image_urls, output_mode)
+        if cached is not None:
+            logger.info("펜션 분석 캐시 적중 (스트리밍)")
+            if meta is not None:
+                meta["analysis_path"] = "cache"
+            for name, value in cached.model_dump().items():
+                yield "field", (name, value)
+            yield "result", (cached, None)
+            return
+
+    images, report = await build_image_parts(image_urls)
+    if report is not None and meta is not None:
+        meta["image_preprocess"] = report
+    chain_input = {"image_urls": _format_image_urls(image_urls), "images": images}
+
+    stream_kwargs = {"stream_usage": True}
+    if output_mode == "structured":
+        stream_kwargs["response_format"] = json_schema_response_format(PensionAnalysis)
+
+    model = get_chat_model(**PENSION_MODEL_SETTINGS)
+    streamer = JSONFieldStreamer()
+    chunks = []
+    usage = {"input_tokens": 0, "output_tokens": 0}
+    started = time.monotonic()
+
+    check_budget("stream")
+    _async_analysis_state["waiting"] += 1
+    try:
+        await within_deadline(_analysis_semaphore.acquire(), "analysis_queue")
+    finally:
+        _async_analysis_state["waiting"] -= 1
+
+    _async_analysis_state["in_flight"] += 1
+    try:
+        # 스트림은 첫 토큰 이후 재시도할 수 없으므로 게이트웨이 슬롯만 사용 (재시도 없음)
+        async with gateway.slot():
+            async for chunk in model.astream(
+                build_analysis_input(chain_input), **stream_kwargs
+            ):
+                _add_usage(usage, chunk.usage_metadata)
+                if not isinstance(chunk.content, str) or not chunk.content:
+                    continue
+                chunks.append(chunk.content)
+                for name, value in streamer.feed(chunk.content):
+                    if name in PensionAnalysis.model_fields:
+                        yield "field", (name, value)
+    except (UpstreamUnavailable, DeadlineExceeded):
+        raise
+    except Exception as e:
+        record_mode_call(
+            "stream", output_mode, time.monotonic() - started, usage, success=False
+        )
+        yield "result", _fallback_for_error(e)
+        return
+    finally:
+        _async_analysis_state["in_flight"] -= 1
+        _async_analysis_state["completed"] += 1
+        _analysis_semaphore.release()
+
+    raw = "".join(chunks)
+    result, tier = _parse_stream_output(raw)
+    record_mode_call(
+        "stream",
+        output_mode,
+        time.monotonic() - started,
+        usage,
+        success=tier in CACHEABLE_TIERS,
+    )
+    if result is None:
+        yield "result", _fallback_result(raw)
+        return
+    _record_tier(tier)
+    if meta is not None:
+        meta["recovery_tier"] = tier
+    if use_cache and tier in CACHEABLE_TIERS:
+        await store_cached_analysis(image_urls, result, output_mode)
+    yield "result", (result, raw)
+
+
+async def call_openai_api(
+    prompt: str, image_urls: list, response_format: dict = None
+) -> str:
     """
     OpenAI API를 호출하여 이미지 분석을 수행하는 함수
-    
+
     Args:
         prompt (str): 분석 프롬프트
         image_urls (list): 분석할 이미지 URL 리스트
-        
+        response_format (dict): structured output 형식 (json_schema_response_format 결과, 선택)
+
     Returns:
         str: AI 응답 텍스트 또는 None
+
+    Raises:
+        UpstreamUnavailable: 서킷 브레이커가 열려 업스트림을 호출하지 않은 경우
+        DeadlineExceeded: 요청 마감 안에 호출을 시작하거나 끝낼 수 없는 경우
     """
+    output_mode = "structured" if response_format else "prompt"
+    started = time.monotonic()
     try:
-        from openai import AsyncOpenAI
-        
-        # OpenAI 클라이언트 초기화
-        client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
-        # 이미지 URL들을 OpenAI 형식으로 변환
-        image_contents = []
-        for url in image_urls:
-            image_contents.append({
-                "type": "image_url",
-                "image_url": {"url": url}
-            })
-        
+        # 공유 커넥션 풀을 사용하는 OpenAI 클라이언트
+        client = get_async_openai()
+
+        # 이미지 URL들을 OpenAI 형식으로 변환 (전처리/패킹이 켜져 있으면 축소된 data URL 또는 모자이크 사용)
+        image_contents, _ = (
+            await build_image_parts(image_urls) if image_urls else ([], None)
+        )
+        if image_contents is None:
+            image_contents = []
+            for url in image_urls:
+                image_contents.append({"type": "image_url", "image_url": {"url": url}})
+
         # 메시지 구성
         messages = [
             {
                 "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    *image_contents
-                ]
+                "content": [{"type": "text", "text": prompt}, *image_contents],
             }
         ]
-        
-        logger.info(f"OpenAI API 호출 시작: {len(image_urls)}개 이미지")
-        
-        # OpenAI API 호출
-        response = await client.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            max_tokens=4000,
-            temperature=0.7
+
+        logger.info(f"OpenAI API 호출 시작: {len(image_urls)}개 이미지 ({output_mode})")
+
+        request_kwargs = {}
+        if response_format:
+            request_kwargs["response_format"] = response_format
+
+        # OpenAI API 호출 (업스트림 게이트웨이 경유, HEDGE_ENABLED일 때 느린 응답은 헤지 요청으로 한 번 더 보냄)
+        response = await hedged(
+            f"steps:{output_mode}",
+            lambda: call_upstream(
+                lambda: client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=messages,
+                    max_tokens=4000,
+                    temperature=0.7,
+                    **request_kwargs,
+                )
+            ),
+            lambda r: bool(r.choices and r.choices[0].message.content),
         )
-        
+
+        usage = None
+        if response.usage:
+            usage = {
+                "input_tokens": response.usage.prompt_tokens,
+                "output_tokens": response.usage.completion_tokens,
+            }
+
         # 응답 추출
         if response.choices and len(response.choices) > 0:
             content = response.choices[0].message.content
+            record_mode_call(
+                "steps",
+                output_mode,
+                time.monotonic() - started,
+                usage,
+                success=bool(content),
+            )
+            if not content:
+                logger.error("OpenAI API 응답 내용이 비어있습니다 (refusal 가능)")
+                return None
             logger.info(f"OpenAI API 응답 성공: {len(content)} 문자")
             return content
         else:
+            record_mode_call(
+                "steps", output_mode, time.monotonic() - started, usage, success=False
+            )
             logger.error("OpenAI API 응답이 비어있습니다")
             return None
-            
+
+    except (UpstreamUnavailable, DeadlineExceeded):
+        raise
     except Exception as e:
         logger.error(f"OpenAI API 호출 중 오류: {str(e)}")
         return None
@@ -0,0 +1,213 @@
+"""
+OpenAI / LangChain 클라이언트 레지스트리
+
+프로세스 전역에서 HTTP 커넥션 풀(keep-alive, HTTP/2 지원 시 사용)을 공유하는
+httpx 클라이언트와, 그 위에 만들어지는 ChatOpenAI / AsyncOpenAI / 출력 파서 /
+LCEL 체인을 한 번만 생성하여 재사용합니다.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# 커넥션 풀 설정
+POOL_MAX_CONNECTIONS = int(os.getenv("OPENAI_POOL_MAX_CONNECTIONS", "20"))
+POOL_MAX_KEEPALIVE = int(os.getenv("OPENAI_POOL_MAX_KEEPALIVE", "10"))
+POOL_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_POOL_KEEPALIVE_EXPIRY", "60"))
+HTTP_TIMEOUT = float(os.getenv("OPENAI_HTTP_TIMEOUT", "120"))
+# SDK 자체 재시도 횟수. 일시적 오류 재시도는 업스트림 게이트웨이(upstream.py)가 백오프/예산과 함께 담당하므로 기본 0
+SDK_MAX_RETRIES = int(os.getenv("OPENAI_SDK_MAX_RETRIES", "0"))
+
+
+def _http2_available() -> bool:
+    """h2 패키지가 설치되어 있고 OPENAI_HTTP2가 꺼져 있지 않으면 HTTP/2를 사용합니다."""
+    if os.getenv("OPENAI_HTTP2", "auto").lower() in ("false", "0", "off"):
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+HTTP2_ENABLED = _http2_available()
+
+_lock = threading.RLock()
+_registry: Dict[str, Any] = {}
+_pool_counters = {"requests": 0, "responses": 0, "error_responses": 0}
+
+
+def _count(name: str) -> None:
+    _pool_counters[name] += 1
+
+
+def _on_request(request: httpx.Request) -> None:
+    _count("requests")
+
+
+def _on_response(response: httpx.Response) -> None:
+    _count("responses")
+    if response.status_code >= 400:
+        _count("error_responses")
+
+
+async def _on_request_async(request: httpx.Request) -> None:
+    _on_request(request)
+
+
+async def _on_response_async(response: httpx.Response) -> None:
+    _on_response(response)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=POOL_MAX_KEEPALIVE,
+        keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+    )
+
+
+def get_registered(name: str, factory: Callable[[], Any]) -> Any:
+    """
+    이름으로 등록된 객체를 반환하고, 없으면 factory로 한 번만 생성합니다.
+
+    Args:
+        name: 레지스트리 키
+        factory: 객체 생성 함수
+
+    Returns:
+        등록된 (또는 새로 생성된) 객체
+    """
+    obj = _registry.get(name)
+    if obj is not None:
+        return obj
+    with _lock:
+        obj = _registry.get(name)
+        if obj is None:
+            obj = factory()
+            _registry[name] = obj
+            logger.info(f"클라이언트 레지스트리 등록: {name}")
+    return obj
+
+
+def get_http_client() -> httpx.Client:
+    """공유 동기 httpx 클라이언트 (ChatOpenAI.invoke 경로용)"""
+    return get_registered(
+        "http_client",
+        lambda: httpx.Client(
+            limits=_limits(),
+            http2=HTTP2_ENABLED,
+            timeout=HTTP_TIMEOUT,
+            event_hooks={"request": [_on_request], "response": [_on_response]},
+        ),
+    )
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """공유 비동기 httpx 클라이언트 (ainvoke / AsyncOpenAI 경로용)"""
+    return get_registered(
+        "async_http_client",
+        lambda: httpx.AsyncClient(
+            limits=_limits(),
+            http2=HTTP2_ENABLED,
+            timeout=HTTP_TIMEOUT,
+            event_hooks={
+                "request": [_on_request_async],
+                "response": [_on_response_async],
+            },
+        ),
+    )
+
+
+def get_chat_model(**settings):
+    """
+    설정별로 하나의 ChatOpenAI 인스턴스를 반환합니다.
+
+    Args:
+        **settings: ChatOpenAI 생성 인자 (model, temperature, max_tokens 등)
+    """
+    from langchain_openai import ChatOpenAI
+
+    key = "chat_model:" + json.dumps(settings, sort_keys=True)
+    return get_registered(
+        key,
+        lambda: ChatOpenAI(
+            **settings,
+            max_retries=SDK_MAX_RETRIES,
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
+        ),
+    )
+
+
+def get_output_parser(pydantic_object):
+    """Pydantic 모델별 PydanticOutputParser를 한 번만 생성합니다."""
+    from langchain_core.output_parsers import PydanticOutputParser
+
+    key = f"output_parser:{pydantic_object.__module__}.{pydantic_object.__name__}"
+    return get_registered(
+        key, lambda: PydanticOutputParser(pydantic_object=pydantic_object)
+    )
+
+
+def get_async_openai():
+    """공유 커넥션 풀을 사용하는 AsyncOpenAI 클라이언트"""
+    from openai import AsyncOpenAI
+
+    return get_registered(
+        "async_openai",
+        lambda: AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=SDK_MAX_RETRIES,
+            http_client=get_async_http_client(),
+        ),
+    )
+
+
+def _connection_stats(client) -> Dict[str, int]:
+    """httpcore 커넥션 풀의 현재 연결 수를 조회합니다. (내부 API이므로 실패 시 빈 값)"""
+    try:
+        connections = client._transport._pool.connections
+    except AttributeError:
+        return {}
+    idle = sum(1 for conn in connections if conn.is_idle())
+    return {"open": len(connections), "idle": idle, "active": len(connections) - idle}
+
+
+def pool_stats() -> Dict[str, Any]:
+    """커넥션 풀 설정과 요청/응답 카운터, 현재 연결 상태를 반환합니다."""
+    stats: Dict[str, Any] = {
+        "http2": HTTP2_ENABLED,
+        "max_connections": POOL_MAX_CONNECTIONS,
+        "max_keepalive_connections": POOL_MAX_KEEPALIVE,
+        "keepalive_expiry": POOL_KEEPALIVE_EXPIRY,
+        **_pool_counters,
+        "registered": sorted(_registry.keys()),
+    }
+    if "http_client" in _registry:
+        stats["sync_connections"] = _connection_stats(_registry["http_client"])
+    if "async_http_client" in _registry:
+        stats["async_connections"] = _connection_stats(_registry["async_http_client"])
+    return stats
+
+
+async def close_clients() -> None:
+    """공유 HTTP 클라이언트를 닫습니다. (애플리케이션 종료 시 호출)"""
+    with _lock:
+        sync_client = _registry.pop("http_client", None)
+        async_clients = [
+            _registry.pop(name, None)
+            for name in ("async_http_client", "image_http_client")
+        ]
+        _registry.clear()
+    if sync_client is not None:
+        sync_client.close()
+    for async_client in async_clients:
+        if async_client is not None:
+            await async_client.aclose()
@@ -0,0 +1,373 @@
+"""
+요청 마감 시간(deadline) 전파와 클라이언트 연결 끊김 시 업스트림 취소
+
+DeadlineMiddleware가 분석 요청(/api/...)마다 마감 시각을 정하고(X-Request-Deadline 헤더의 초 단위 예산,
+없으면 서버 기본값) 컨텍스트 변수로 요청 처리 전체에 전달합니다.
+응답을 오래 스트리밍하는 SSE 경로(업스트림을 세 번 차례로 호출하는 3단계 파이프라인, 스트리밍 분석)는 더 긴 기본 예산을 사용합니다.
+
+- 업스트림 게이트웨이는 남은 시간이 DEADLINE_MIN_CALL_SECONDS보다 적으면 새 호출/재시도를 시작하지 않고,
+  진행 중인 호출은 마감 시각에 취소합니다 (DeadlineExceeded, API에서는 504).
+- 클라이언트 연결이 끊기면 요청 처리 Task를 취소해 진행 중인 업스트림 호출(HTTP 연결)도 함께 끊습니다.
+- 마감 후 DEADLINE_GRACE초가 지나도 응답이 끝나지 않으면(스트리밍 등) 미들웨어가 요청 처리를 취소합니다.
+- 취소/생략된 업스트림 호출 수와 잘라낸 호출 시간을 절감 지표로 집계합니다.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Tuple
+
+from priority import classify_request
+
+logger = logging.getLogger(__name__)
+
+# 헤더가 없을 때의 기본 예산(초): interactive 요청 / batch 요청 (0이면 마감 없음)
+REQUEST_DEADLINE_DEFAULT = float(os.getenv("REQUEST_DEADLINE_DEFAULT", "60"))
+REQUEST_DEADLINE_BATCH_DEFAULT = float(os.getenv("REQUEST_DEADLINE_BATCH_DEFAULT", "0"))
+# SSE 경로의 기본 예산(초): 3단계 파이프라인은 업스트림을 세 번 차례로 호출하므로 interactive 기본값의 3배
+REQUEST_DEADLINE_STREAM_DEFAULT = float(
+    os.getenv("REQUEST_DEADLINE_STREAM_DEFAULT", "180")
+)
+DEADLINE_STREAM_PATHS: Tuple[str, ...] = tuple(
+    path.strip()
+    for path in os.getenv(
+        "DEADLINE_STREAM_PATHS",
+        "/api/analyze-pension-style-pipeline,/api/analyze-pension-style-stream",
+    ).split(",")
+    if path.strip()
+)
+# 헤더로 요청할 수 있는 최대 예산(초)
+REQUEST_DEADLINE_MAX = float(os.getenv("REQUEST_DEADLINE_MAX", "600"))
+# 남은 시간이 이보다 적으면 새 업스트림 호출/재시도를 시작하지 않음
+DEADLINE_MIN_CALL_SECONDS = float(os.getenv("DEADLINE_MIN_CALL_SECONDS", "3"))
+# 마감 후 응답이 끝나지 않은 요청을 강제로 취소하기까지의 유예 시간(초)
+DEADLINE_GRACE = float(os.getenv("DEADLINE_GRACE", "2"))
+# 마감/연결 끊김 감시를 적용하는 경로 접두사
+DEADLINE_PATH_PREFIXES: Tuple[str, ...] = tuple(
+    prefix.strip()
+    for prefix in os.getenv("DEADLINE_PATH_PREFIXES", "/api/").split(",")
+    if prefix.strip()
+)
+
+
+class DeadlineExceeded(Exception):
+    """요청 예산 안에 업스트림 호출을 시작하거나 끝낼 수 없는 경우 (API에서는 504)"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"요청 처리 시간 예산을 초과했습니다 ({stage}).")
+        self.stage = stage
+
+
+class RequestDeadline:
+    """요청 하나의 마감 시각과, 요청 처리가 취소된 이유 ("deadline", "client_disconnect")"""
+
+    def __init__(self, expires_at: Optional[float]):
+        self.expires_at = expires_at
+        self.cancel_reason: Optional[str] = None
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    def extend_to(self, other: Optional["RequestDeadline"]) -> None:
+        """공유 호출에 합류한 요청의 마감이 더 늦으면 그만큼 늘립니다 (마감 없는 요청이면 마감 해제)."""
+        if self.expires_at is None:
+            return
+        if other is None or other.expires_at is None:
+            self.expires_at = None
+        else:
+            self.expires_at = max(self.expires_at, other.expires_at)
+
+
+_current: contextvars.ContextVar[Optional[RequestDeadline]] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+_stats: Dict[str, Any] = {
+    "requests": 0,
+    "deadline_exceeded": {},
+    "client_disconnects": 0,
+    "forced_cancels": 0,
+    "cancelled_calls": {},
+    "cancelled_call_seconds": 0.0,
+    "skipped_calls": {},
+}
+
+
+def _count(name: str, key: str) -> None:
+    _stats[name][key] = _stats[name].get(key, 0) + 1
+
+
+def current_deadline() -> Optional[RequestDeadline]:
+    """현재 요청의 마감 정보 (마감이 없는 작업이면 None)"""
+    return _current.get()
+
+
+def remaining() -> Optional[float]:
+    """현재 요청의 남은 시간(초), 마감이 없으면 None"""
+    deadline = _current.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+def can_start_call(extra_delay: float = 0.0) -> bool:
+    """extra_delay초 후에 새 업스트림 호출을 시작해도 끝낼 시간이 남는지 확인합니다."""
+    left = remaining()
+    return left is None or left - extra_delay >= DEADLINE_MIN_CALL_SECONDS
+
+
+def record_skipped_call(stage: str) -> None:
+    """남은 시간이 부족해 시작하지 않은 업스트림 호출을 기록합니다."""
+    _count("skipped_calls", stage)
+
+
+def check_budget(stage: str) -> None:
+    """
+    새 업스트림 호출을 시작할 시간이 남았는지 확인합니다.
+
+    Raises:
+        DeadlineExceeded: 남은 시간이 DEADLINE_MIN_CALL_SECONDS보다 적은 경우
+    """
+    if not can_start_call():
+        record_skipped_call(stage)
+        _count("deadline_exceeded", stage)
+        raise DeadlineExceeded(stage)
+
+
+async def within_deadline(awaitable: Awaitable[Any], stage: str) -> Any:
+    """
+    awaitable을 현재 요청의 마감 시각까지만 기다리고, 마감이 지나면 취소합니다.
+
+    Raises:
+        DeadlineExceeded: 마감 시각까지 끝나지 않은 경우
+    """
+    deadline = _current.get()
+    left = deadline.remaining() if deadline is not None else None
+    if left is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout=max(0.0, left))
+    except asyncio.TimeoutError:
+        if deadline.remaining() > 0:
+            # awaitable 자체의 타임아웃
+            raise
+        deadline.cancel_reason = deadline.cancel_reason or "deadline"
+        _count("deadline_exceeded", stage)
+        raise DeadlineExceeded(stage) from None
+
+
+def record_cancelled_call(elapsed: float) -> None:
+    """
+    진행 중에 취소된 업스트림 호출을 기록합니다.
+    요청 마감이나 연결 끊김으로 취소된 경우만 집계합니다 (헤지 요청의 패자 취소 등은 제외).
+    """
+    deadline = _current.get()
+    if deadline is None or deadline.cancel_reason is None:
+        return
+    _count("cancelled_calls", deadline.cancel_reason)
+    _stats["cancelled_call_seconds"] += elapsed
+
+
+def share_deadline() -> Optional[RequestDeadline]:
+    """여러 요청이 공유하는 호출(SingleFlight)용으로 현재 마감 정보를 복사합니다."""
+    deadline = _current.get()
+    if deadline is None:
+        return None
+    return RequestDeadline(deadline.expires_at)
+
+
+async def run_with_deadline(
+    deadline: Optional[RequestDeadline], factory: Callable[[], Awaitable[Any]]
+) -> Any:
+    """factory()를 주어진 마감 정보 아래에서 실행합니다 (새 Task 안에서 호출)."""
+    _current.set(deadline)
+    return await factory()
+
+
+def request_budget(path: str, headers: Mapping[str, str]) -> Optional[float]:
+    """X-Request-Deadline 헤더(초) 또는 트래픽 클래스/경로별 기본값으로 요청 예산을 정합니다."""
+    value = headers.get("x-request-deadline")
+    if value:
+        try:
+            budget = float(value)
+        except ValueError:
+            budget = 0.0
+        if budget > 0:
+            return min(budget, REQUEST_DEADLINE_MAX)
+    if classify_request(path, headers) == "batch":
+        default = REQUEST_DEADLINE_BATCH_DEFAULT
+    elif path.startswith(DEADLINE_STREAM_PATHS):
+        default = REQUEST_DEADLINE_STREAM_DEFAULT
+    else:
+        default = REQUEST_DEADLINE_DEFAULT
+    return default if default > 0 else None
+
+
+class DeadlineMiddleware:
+    """
+    ASGI 미들웨어: 요청 마감 시각을 정하고, 연결이 끊기거나 마감 + DEADLINE_GRACE가 지나면 요청 처리를 취소합니다.
+
+    요청 본문을 다 받은 뒤에는 미들웨어가 연결 끊김을 감시하고,
+    앱에는 연결이 끊겼을 때만 http.disconnect를 전달합니다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(
+            DEADLINE_PATH_PREFIXES
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {
+            key.decode("latin-1"): value.decode("latin-1")
+            for key, value in scope["headers"]
+        }
+        budget = request_budget(scope["path"], headers)
+        deadline = RequestDeadline(time.monotonic() + budget if budget else None)
+        _current.set(deadline)
+        _stats["requests"] += 1
+
+        body_received = asyncio.Event()
+        disconnected = asyncio.Event()
+        response = {"started": False, "finished": False}
+
+        async def app_receive():
+            if body_received.is_set():
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            elif not message.get("more_body", False):
+                body_received.set()
+            return message
+
+        async def app_send(message):
+            if message["type"] == "http.response.start":
+                response["started"] = True
+            elif message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                response["finished"] = True
+            await send(message)
+
+        async def watch_disconnect():
+            await body_received.wait()
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        app_task = asyncio.ensure_future(self.app(scope, app_receive, app_send))
+        watchers = [
+            asyncio.ensure_future(watch_disconnect()),
+            asyncio.ensure_future(disconnected.wait()),
+        ]
+        try:
+            timeout = (
+                max(0.0, deadline.remaining() + DEADLINE_GRACE)
+                if deadline.expires_at is not None
+                else None
+            )
+            await asyncio.wait(
+                [app_task, watchers[1]],
+                timeout=timeout,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if app_task.done() or response["finished"]:
+                await app_task
+                return
+
+            if disconnected.is_set():
+                deadline.cancel_reason = "client_disconnect"
+                _stats["client_disconnects"] += 1
+                logger.info(f"클라이언트 연결 끊김, 요청 처리 취소: {scope['path']}")
+                await self._cancel(app_task)
+                return
+
+            # 마감 + 유예 시간이 지났는데 응답이 끝나지 않음
+            deadline.cancel_reason = "deadline"
+            _stats["forced_cancels"] += 1
+            _count("deadline_exceeded", "request")
+            logger.warning(
+                f"요청 마감 초과, 요청 처리 취소: {scope['path']} ({budget:.0f}s)"
+            )
+            await self._cancel(app_task)
+            if not response["started"]:
+                await _send_timeout(send)
+            elif not response["finished"]:
+                await send(
+                    {"type": "http.response.body", "body": b"", "more_body": False}
+                )
+        finally:
+            for task in (app_task, *watchers):
+                if not task.done():
+                    task.cancel()
+
+    @staticmethod
+    async def _cancel(task: asyncio.Task) -> None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.debug(f"취소된 요청 처리 중 예외: {type(e).__name__}: {e}")
+
+
+async def _send_timeout(send) -> None:
+    payload = json.dumps(
+        {
+            "error": "deadline_exceeded",
+            "message": "요청 처리 시간 예산을 초과했습니다.",
+        },
+        ensure_ascii=False,
+    ).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 504,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(payload)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": payload})
+
+
+def get_deadline_stats(
+    output_mode_stats: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    마감 초과/연결 끊김 횟수와 취소·생략된 업스트림 호출 수를 반환합니다.
+
+    Args:
+        output_mode_stats: chain.get_output_mode_stats() 결과 (주면 호출당 평균 출력 토큰으로 절감량을 추정)
+    """
+    result = {
+        **_stats,
+        "deadline_exceeded": dict(_stats["deadline_exceeded"]),
+        "cancelled_calls": dict(_stats["cancelled_calls"]),
+        "skipped_calls": dict(_stats["skipped_calls"]),
+        "cancelled_call_seconds": round(_stats["cancelled_call_seconds"], 3),
+        "default_budget": REQUEST_DEADLINE_DEFAULT,
+        "stream_budget": REQUEST_DEADLINE_STREAM_DEFAULT,
+    }
+    if output_mode_stats:
+        calls = sum(stats["calls"] for stats in output_mode_stats.values())
+        output_tokens = sum(
+            stats["output_tokens"] for stats in output_mode_stats.values()
+        )
+        avoided = sum(_stats["cancelled_calls"].values()) + sum(
+            _stats["skipped_calls"].values()
+        )
+        result["estimated_output_tokens_saved"] = (
+            round(avoided * output_tokens / calls) if calls else 0
+        )
+    return result
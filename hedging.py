@@ -0,0 +1,196 @@
+"""
+업스트림 헤지 요청 (hedged requests)
+
+호출이 최근 지연 시간의 HEDGE_PERCENTILE 백분위수를 넘도록 끝나지 않으면
+같은 요청을 한 번 더 보내고, 먼저 도착한 정상 응답을 사용하며 나머지 호출은 취소합니다.
+
+헤지 요청은 호출마다 HEDGE_MAX_RATIO만큼 쌓이는 예산(최대 HEDGE_BURST)을 소비하므로,
+추가 업스트림 호출 수는 전체 호출의 HEDGE_MAX_RATIO 비율 + HEDGE_BURST를 넘지 않습니다.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# HEDGE_ENABLED=true 로 헤지 요청을 켬
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+# 이 백분위수의 최근 지연 시간이 지나도 응답이 없으면 헤지 요청 전송
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+# 헤지 대기 시간의 하한(초)
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "2.0"))
+# 백분위수를 계산하기 위해 필요한 최소 지연 시간 샘플 수
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+# 호출당 쌓이는 헤지 예산 (0.1이면 추가 호출이 전체의 10%를 넘지 않음)
+HEDGE_MAX_RATIO = float(os.getenv("HEDGE_MAX_RATIO", "0.1"))
+# 예산의 최대 누적량
+HEDGE_BURST = float(os.getenv("HEDGE_BURST", "5"))
+# 지연 시간 통계에 사용하는 최근 샘플 수
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", "200"))
+
+
+def percentile(samples, pct: float) -> Optional[float]:
+    """샘플의 pct 백분위수 (nearest-rank)"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class HedgePolicy:
+    """
+    호출 종류(이름)별 헤지 정책과 지연 시간 기록
+
+    - attempt 지연 시간: 끝까지 완료된 개별 업스트림 호출의 소요 시간 (헤지 없는 분포의 추정치)
+    - call 지연 시간: 헤지를 포함해 호출자가 실제로 기다린 시간
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.attempt_latencies: deque = deque(maxlen=HEDGE_WINDOW)
+        self.call_latencies: deque = deque(maxlen=HEDGE_WINDOW)
+        self.budget = HEDGE_BURST
+        self._counters = {
+            "calls": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "budget_denied": 0,
+            "cancelled": 0,
+        }
+
+    def hedge_delay(self) -> Optional[float]:
+        """헤지 요청을 보내기까지 기다릴 시간 (샘플이 부족하면 None)"""
+        if len(self.attempt_latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(
+            HEDGE_MIN_DELAY, percentile(self.attempt_latencies, HEDGE_PERCENTILE)
+        )
+
+    async def run(
+        self, factory: Callable[[], Awaitable[Any]], is_valid: Callable[[Any], bool]
+    ) -> Any:
+        """
+        factory()로 업스트림 호출을 실행하고, 필요하면 헤지 요청을 한 번 보냅니다.
+
+        Args:
+            factory: 업스트림 호출 코루틴을 만드는 함수 (헤지 시 한 번 더 호출됨)
+            is_valid: 응답을 채택해도 되는지 판단하는 함수
+
+        Returns:
+            먼저 도착한 정상 응답. 둘 다 비정상이면 먼저 도착한 응답,
+            둘 다 실패하면 마지막 예외를 그대로 발생시킵니다.
+        """
+        self._counters["calls"] += 1
+        self.budget = min(HEDGE_BURST, self.budget + HEDGE_MAX_RATIO)
+        started = time.monotonic()
+        tasks: List[asyncio.Task] = [asyncio.ensure_future(self._attempt(factory))]
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    if self.budget >= 1:
+                        self.budget -= 1
+                        self._counters["hedged"] += 1
+                        logger.info(f"헤지 요청 전송 ({self.name}, {delay:.2f}s 경과)")
+                        tasks.append(asyncio.ensure_future(self._attempt(factory)))
+                    else:
+                        self._counters["budget_denied"] += 1
+            return await self._first_valid(tasks, is_valid)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    self._counters["cancelled"] += 1
+                elif not task.cancelled():
+                    task.exception()  # 채택되지 않은 호출의 예외 회수
+            self.call_latencies.append(time.monotonic() - started)
+
+    async def _attempt(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        started = time.monotonic()
+        result = await factory()
+        self.attempt_latencies.append(time.monotonic() - started)
+        return result
+
+    async def _first_valid(
+        self, tasks: List[asyncio.Task], is_valid: Callable[[Any], bool]
+    ) -> Any:
+        pending = set(tasks)
+        first_result = None
+        has_result = False
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                result = task.result()
+                if is_valid(result):
+                    if task is not tasks[0]:
+                        self._counters["hedge_wins"] += 1
+                    return result
+                if not has_result:
+                    first_result, has_result = result, True
+        if has_result:
+            return first_result
+        raise error
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self._counters["calls"]
+        delay = self.hedge_delay()
+        return {
+            **self._counters,
+            "hedge_rate": round(self._counters["hedged"] / calls, 4) if calls else 0.0,
+            "budget": round(self.budget, 2),
+            "hedge_delay": round(delay, 3) if delay is not None else None,
+            "attempt_p50": _rounded(percentile(self.attempt_latencies, 50)),
+            "attempt_p99": _rounded(percentile(self.attempt_latencies, 99)),
+            "call_p50": _rounded(percentile(self.call_latencies, 50)),
+            "call_p99": _rounded(percentile(self.call_latencies, 99)),
+        }
+
+
+def _rounded(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+_policies: Dict[str, HedgePolicy] = {}
+
+
+async def hedged(
+    name: str,
+    factory: Callable[[], Awaitable[Any]],
+    is_valid: Callable[[Any], bool] = lambda result: True,
+) -> Any:
+    """
+    name별 헤지 정책으로 업스트림 호출을 실행합니다. HEDGE_ENABLED가 아니면 factory()를 그대로 기다립니다.
+
+    Args:
+        name: 지연 시간 분포를 공유하는 호출 종류 (예: "chain:prompt", "steps:structured")
+        factory: 업스트림 호출 코루틴을 만드는 함수
+        is_valid: 응답을 채택해도 되는지 판단하는 함수
+    """
+    if not HEDGE_ENABLED:
+        return await factory()
+    policy = _policies.get(name)
+    if policy is None:
+        policy = _policies[name] = HedgePolicy(name)
+    return await policy.run(factory, is_valid)
+
+
+def get_hedging_stats() -> Dict[str, Any]:
+    """호출 종류별 헤지 비율과 헤지 전/후 지연 시간 백분위수를 반환합니다."""
+    return {
+        "enabled": HEDGE_ENABLED,
+        "percentile": HEDGE_PERCENTILE,
+        "max_ratio": HEDGE_MAX_RATIO,
+        "policies": {name: policy.stats() for name, policy in _policies.items()},
+    }
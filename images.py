@@ -0,0 +1,671 @@
+"""
+비전 호출 전 이미지 전처리
+
+image_urls의 이미지를 동시에 내려받아 긴 변 기준으로 축소하고 JPEG로 다시 인코딩한 뒤
+data URL(+ detail 수준)로 GPT-4o에 전달합니다. 결과는 URL/ETag 기준으로 캐시하며,
+요청마다 절약한 바이트 수와 추정 비전 토큰 수를 보고합니다.
+같은 방을 다른 각도/크기로 찍은 사진처럼 거의 같은 이미지는
+지각 해시(dHash)로 찾아 프롬프트를 만들기 전에 하나로 합칩니다.
+패킹 모드에서는 축소된 이미지 여러 장을 번호가 붙은 격자(모자이크) 이미지로 묶어
+이미지 파트마다 붙는 고정 토큰 비용을 줄입니다.
+"""
+
+import asyncio
+import base64
+import io
+import ipaddress
+import logging
+import math
+import os
+import socket
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpcore
+import httpx
+
+from cache import cache_from_env, make_cache_key
+from clients import get_registered
+
+logger = logging.getLogger(__name__)
+
+# IMAGE_PREPROCESS_ENABLED=true 로 전처리 단계를 켬 (기본값: 원본 URL 그대로 전달)
+IMAGE_PREPROCESS_ENABLED = (
+    os.getenv("IMAGE_PREPROCESS_ENABLED", "false").lower() == "true"
+)
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1024"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "80"))
+# OpenAI 이미지 detail 수준: low / high / auto
+IMAGE_DETAIL = os.getenv("IMAGE_DETAIL", "high")
+IMAGE_FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", "15"))
+IMAGE_MAX_FETCH_BYTES = int(os.getenv("IMAGE_MAX_FETCH_BYTES", str(20 * 1024 * 1024)))
+IMAGE_FETCH_MAX_REDIRECTS = int(os.getenv("IMAGE_FETCH_MAX_REDIRECTS", "5"))
+
+# IMAGE_DEDUP_ENABLED=true 로 유사 이미지 합치기를 켬 (64비트 dHash 해밍 거리 기준)
+IMAGE_DEDUP_ENABLED = os.getenv("IMAGE_DEDUP_ENABLED", "false").lower() == "true"
+IMAGE_DEDUP_THRESHOLD = int(os.getenv("IMAGE_DEDUP_THRESHOLD", "5"))
+DHASH_SIZE = 8
+
+# IMAGE_PACKING_ENABLED=true 로 모자이크 패킹을 켬 (전처리 단계를 함께 사용)
+IMAGE_PACKING_ENABLED = os.getenv("IMAGE_PACKING_ENABLED", "false").lower() == "true"
+IMAGE_PACK_GRID = os.getenv("IMAGE_PACK_GRID", "2x2")  # 열x행
+IMAGE_PACK_TILE = int(os.getenv("IMAGE_PACK_TILE", "512"))  # 칸 하나의 크기(px)
+IMAGE_PACK_MAX_MOSAICS = int(os.getenv("IMAGE_PACK_MAX_MOSAICS", "2"))
+
+# 전처리 결과 캐시 (URL + 전처리 설정 → data URL, ETag)
+image_cache = cache_from_env("IMAGE_CACHE", os.path.join(".cache", "images"))
+
+_preprocess_totals = {
+    "requests": 0,
+    "images": 0,
+    "processed": 0,
+    "cache_hits": 0,
+    "passthrough": 0,
+    "original_bytes": 0,
+    "compressed_bytes": 0,
+    "estimated_tokens_before": 0,
+    "estimated_tokens_after": 0,
+    "dedup_merged": 0,
+}
+
+
+def convert_for_jpeg(img):
+    """JPEG로 저장할 수 없는 모드(RGBA, P 등)를 RGB로 변환합니다."""
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    return img
+
+
+def fit_within(img, max_width: int, max_height: int):
+    """
+    비율을 유지하면서 max_width x max_height 안에 들어오도록 리사이즈합니다.
+    이미 작은 이미지는 그대로 반환합니다.
+    """
+    from PIL import Image
+
+    original_width, original_height = img.size
+    if original_width > max_width or original_height > max_height:
+        ratio = min(max_width / original_width, max_height / original_height)
+        new_width = max(1, int(original_width * ratio))
+        new_height = max(1, int(original_height * ratio))
+        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+    return img
+
+
+def estimate_image_tokens(width: int, height: int, detail: str = "high") -> int:
+    """
+    GPT-4o 비전 입력 토큰 수를 추정합니다.
+
+    low는 고정 85토큰, high/auto는 2048 상자 → 짧은 변 768로 맞춘 뒤 512px 타일당 170토큰 + 85토큰입니다.
+    """
+    if detail == "low":
+        return 85
+    if width > 2048 or height > 2048:
+        ratio = 2048 / max(width, height)
+        width, height = width * ratio, height * ratio
+    if min(width, height) > 768:
+        ratio = 768 / min(width, height)
+        width, height = width * ratio, height * ratio
+    tiles = math.ceil(width / 512) * math.ceil(height / 512)
+    return 85 + 170 * tiles
+
+
+def dhash(img, hash_size: int = DHASH_SIZE) -> str:
+    """
+    이미지의 차분 해시(dHash)를 16진수 문자열로 반환합니다.
+
+    (hash_size+1) x hash_size 흑백 이미지로 줄인 뒤 가로로 이웃한 픽셀의 밝기 증감을 비트로 기록하므로
+    크기/압축률/약간의 시점 차이에는 거의 변하지 않습니다.
+    """
+    import numpy as np
+    from PIL import Image
+
+    gray = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    value = int("".join("1" if bit else "0" for bit in bits), 2)
+    return f"{value:0{hash_size * hash_size // 4}x}"
+
+
+def hamming_distance(hash_a: str, hash_b: str) -> int:
+    """두 16진수 해시 사이의 해밍 거리"""
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+def downscale_image(
+    data: bytes, max_edge: int = IMAGE_MAX_EDGE, quality: int = IMAGE_JPEG_QUALITY
+) -> Dict[str, Any]:
+    """
+    이미지 바이트를 긴 변 max_edge 이하로 축소하고 JPEG로 다시 인코딩합니다.
+
+    다시 인코딩한 결과가 원본보다 크고 축소도 필요 없었다면 원본 바이트를 그대로 사용합니다.
+
+    Returns:
+        data_url, 원본/결과 크기(px), 원본/결과 바이트 수, dHash를 담은 딕셔너리
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        source_format = img.format
+        original_width, original_height = img.size
+        resized = fit_within(convert_for_jpeg(img), max_edge, max_edge)
+        width, height = resized.size
+        image_hash = dhash(resized)
+        buffer = io.BytesIO()
+        resized.save(buffer, "JPEG", quality=quality, optimize=True)
+
+    encoded, mime = buffer.getvalue(), "image/jpeg"
+    unchanged = (width, height) == (original_width, original_height)
+    if (
+        unchanged
+        and len(encoded) >= len(data)
+        and source_format in ("JPEG", "PNG", "WEBP", "GIF")
+    ):
+        encoded, mime = data, f"image/{source_format.lower()}"
+
+    return {
+        "data_url": f"data:{mime};base64,{base64.b64encode(encoded).decode('ascii')}",
+        "width": width,
+        "height": height,
+        "original_width": original_width,
+        "original_height": original_height,
+        "original_bytes": len(data),
+        "compressed_bytes": len(encoded),
+        "dhash": image_hash,
+    }
+
+
+def get_image_http_client() -> httpx.AsyncClient:
+    """이미지 다운로드용 공유 비동기 httpx 클라이언트 (OpenAI 커넥션 풀과 분리)"""
+    # 리디렉션은 fetch_image()에서 홉마다 URL을 검사하며 직접 따라감
+    return get_registered(
+        "image_http_client",
+        lambda: httpx.AsyncClient(
+            transport=_public_only_transport(),
+            timeout=IMAGE_FETCH_TIMEOUT,
+            follow_redirects=False,
+        ),
+    )
+
+
+class ImageFetchError(ValueError):
+    """허용되지 않는 주소이거나 크기 제한을 넘는 이미지 다운로드"""
+
+
+def _is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    # is_global은 사설/루프백/링크 로컬(169.254.169.254 메타데이터 포함)/예약/CGNAT 대역을 모두 제외
+    return ip.is_global and not ip.is_multicast
+
+
+async def _lookup(host: str, port: int) -> List[str]:
+    """호스트 이름을 IP 주소 목록으로 해석합니다."""
+    infos = await asyncio.get_running_loop().getaddrinfo(
+        host, port, type=socket.SOCK_STREAM
+    )
+    return [info[4][0] for info in infos]
+
+
+async def _resolve_public_address(host: str, port: int) -> str:
+    """
+    호스트를 해석해 연결할 공인 주소 하나를 반환합니다 (SSRF 방지).
+
+    해석된 주소 중 하나라도 사설/루프백/링크 로컬/예약 대역이면 ImageFetchError를 발생시킵니다.
+    """
+    try:
+        addresses = [ipaddress.ip_address(host.strip("[]")).compressed]
+    except ValueError:
+        try:
+            addresses = await _lookup(host, port)
+        except socket.gaierror as e:
+            raise ImageFetchError(f"호스트를 찾을 수 없습니다: {host}") from e
+    blocked = [address for address in addresses if not _is_public_address(address)]
+    if blocked or not addresses:
+        raise ImageFetchError(
+            f"공인 주소가 아닌 호스트입니다: {host} ({', '.join(blocked)})"
+        )
+    return addresses[0]
+
+
+class _PublicAddressBackend(httpcore.AsyncNetworkBackend):
+    """
+    연결 직전에 호스트를 한 번만 해석하고, 검사를 통과한 그 IP로 바로 연결하는 네트워크 백엔드
+
+    검사와 연결이 같은 해석 결과를 쓰므로 DNS 재바인딩(검사 후 다른 주소로 바뀌는 응답)으로
+    사설 주소에 연결할 수 없습니다. URL의 호스트 이름은 그대로이므로 Host 헤더, SNI, 인증서 검증은 바뀌지 않습니다.
+    """
+
+    def __init__(self, backend: Optional[httpcore.AsyncNetworkBackend] = None):
+        self._backend = backend or httpcore.AnyIOBackend()
+
+    async def connect_tcp(
+        self, host, port, timeout=None, local_address=None, socket_options=None
+    ):
+        address = await _resolve_public_address(host, port)
+        return await self._backend.connect_tcp(
+            address,
+            port,
+            timeout=timeout,
+            local_address=local_address,
+            socket_options=socket_options,
+        )
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        raise ImageFetchError("유닉스 소켓 연결은 허용되지 않습니다")
+
+    async def sleep(self, seconds):
+        await self._backend.sleep(seconds)
+
+
+def _public_only_transport() -> httpx.AsyncHTTPTransport:
+    """_PublicAddressBackend로만 연결하는 전송 계층 (환경 변수 프록시는 사용하지 않음)"""
+    transport = httpx.AsyncHTTPTransport(trust_env=False)
+    # httpx 전송 계층은 네트워크 백엔드를 인자로 받지 않으므로 httpx 기본 한도와 같은 커넥션 풀로 교체
+    transport._pool = httpcore.AsyncConnectionPool(
+        ssl_context=httpx.create_ssl_context(trust_env=False),
+        max_connections=100,
+        max_keepalive_connections=20,
+        keepalive_expiry=5.0,
+        network_backend=_PublicAddressBackend(),
+    )
+    return transport
+
+
+def _check_url(url: httpx.URL) -> None:
+    """리디렉션 홉마다 스킴과 호스트를 검사합니다 (주소 검사는 연결 시 _PublicAddressBackend가 수행)."""
+    if url.scheme not in ("http", "https"):
+        raise ImageFetchError(f"허용되지 않는 URL 스킴: {url.scheme}")
+    if not url.host:
+        raise ImageFetchError("URL에 호스트가 없습니다")
+    try:
+        address = ipaddress.ip_address(url.host)
+    except ValueError:
+        return
+    # IP 리터럴은 연결 전에 바로 거절
+    if not _is_public_address(address.compressed):
+        raise ImageFetchError(f"공인 주소가 아닌 호스트입니다: {url.host}")
+
+
+async def fetch_image(
+    url: str, headers: Optional[Dict[str, str]] = None
+) -> Tuple[int, bytes, Optional[str]]:
+    """
+    이미지를 내려받습니다.
+
+    리디렉션은 IMAGE_FETCH_MAX_REDIRECTS번까지 직접 따라가며 홉마다 URL을 검사하고(호스트 주소는 연결할 때마다 검사),
+    본문은 스트리밍으로 읽다가 IMAGE_MAX_FETCH_BYTES를 넘으면 즉시 중단합니다.
+
+    Returns:
+        (상태 코드, 본문 바이트, ETag). 304 응답이면 본문은 비어 있습니다.
+    """
+    client = get_image_http_client()
+    target = httpx.URL(url)
+    for _ in range(IMAGE_FETCH_MAX_REDIRECTS + 1):
+        _check_url(target)
+        async with client.stream("GET", target, headers=headers) as response:
+            if response.is_redirect:
+                target = response.url.join(response.headers["location"])
+                continue
+            if response.status_code == 304:
+                return 304, b"", response.headers.get("etag")
+            response.raise_for_status()
+
+            declared = int(response.headers.get("content-length") or 0)
+            if declared > IMAGE_MAX_FETCH_BYTES:
+                raise ImageFetchError(f"이미지가 너무 큽니다: {declared} bytes")
+            chunks, size = [], 0
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > IMAGE_MAX_FETCH_BYTES:
+                    raise ImageFetchError(
+                        f"이미지가 너무 큽니다: {IMAGE_MAX_FETCH_BYTES} bytes 초과"
+                    )
+                chunks.append(chunk)
+            return response.status_code, b"".join(chunks), response.headers.get("etag")
+    raise ImageFetchError(
+        f"리디렉션이 너무 많습니다 (최대 {IMAGE_FETCH_MAX_REDIRECTS}번)"
+    )
+
+
+def _image_cache_key(url: str) -> str:
+    settings = {
+        "max_edge": IMAGE_MAX_EDGE,
+        "quality": IMAGE_JPEG_QUALITY,
+        "hash": f"dhash{DHASH_SIZE}",
+    }
+    return make_cache_key([url], "image-preprocess", settings)
+
+
+def _image_part(url: str) -> Dict[str, Any]:
+    return {"type": "image_url", "image_url": {"url": url, "detail": IMAGE_DETAIL}}
+
+
+async def _prepare_one(url: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    이미지 한 장을 전처리합니다. 실패하면 원본 URL을 그대로 사용합니다.
+
+    Returns:
+        (OpenAI image_url 콘텐츠 파트, 처리 정보)
+    """
+    key = _image_cache_key(url)
+    cached = await image_cache.get_async(key)
+    headers = {}
+    if cached:
+        if not cached.get("etag"):
+            # ETag가 없는 항목은 TTL 동안 재검증 없이 사용
+            return _image_part(cached["data_url"]), {**cached, "status": "cached"}
+        headers["If-None-Match"] = cached["etag"]
+
+    try:
+        status_code, content, etag = await fetch_image(url, headers)
+        if status_code == 304 and cached:
+            return _image_part(cached["data_url"]), {**cached, "status": "cached"}
+
+        # 디코딩/리사이즈는 CPU 작업이므로 이벤트 루프 밖에서 실행
+        info = await asyncio.to_thread(downscale_image, content)
+        info["etag"] = etag
+        await image_cache.set_async(key, info)
+        return _image_part(info["data_url"]), {**info, "status": "processed"}
+    except Exception as e:
+        if cached:
+            logger.warning(
+                f"이미지 재검증 실패, 캐시된 결과 사용 ({url[:100]}): {str(e)}"
+            )
+            return _image_part(cached["data_url"]), {**cached, "status": "cached"}
+        logger.warning(f"이미지 전처리 실패, 원본 URL 사용 ({url[:100]}): {str(e)}")
+        return _image_part(url), {"status": "passthrough"}
+
+
+async def prepare_images(
+    image_urls: List[str],
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    모든 이미지를 동시에 전처리합니다.
+
+    Args:
+        image_urls: 분석할 이미지 URL 목록
+
+    Returns:
+        (OpenAI image_url 콘텐츠 파트 목록, 요청 단위 절약 보고서)
+    """
+    started = time.monotonic()
+    results = await asyncio.gather(*[_prepare_one(url) for url in image_urls])
+
+    report = {
+        "images": len(image_urls),
+        "processed": 0,
+        "cache_hits": 0,
+        "passthrough": 0,
+        "original_bytes": 0,
+        "compressed_bytes": 0,
+        "estimated_tokens_before": 0,
+        "estimated_tokens_after": 0,
+    }
+    for _, info in results:
+        status = info["status"]
+        report["cache_hits" if status == "cached" else status] += 1
+        if status == "passthrough":
+            continue
+        report["original_bytes"] += info["original_bytes"]
+        report["compressed_bytes"] += info["compressed_bytes"]
+        # 원본은 detail 미지정(auto, 큰 이미지는 high와 동일) 기준으로 추정
+        report["estimated_tokens_before"] += estimate_image_tokens(
+            info["original_width"], info["original_height"], "high"
+        )
+        report["estimated_tokens_after"] += estimate_image_tokens(
+            info["width"], info["height"], IMAGE_DETAIL
+        )
+
+    for name, value in report.items():
+        _preprocess_totals[name] += value
+    _preprocess_totals["requests"] += 1
+
+    report["bytes_saved"] = report["original_bytes"] - report["compressed_bytes"]
+    report["estimated_tokens_saved"] = (
+        report["estimated_tokens_before"] - report["estimated_tokens_after"]
+    )
+    report["detail"] = IMAGE_DETAIL
+    report["max_edge"] = IMAGE_MAX_EDGE
+    report["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+
+    logger.info(
+        f"이미지 전처리 완료: {report['images']}개, {report['bytes_saved']} bytes 절약, "
+        f"추정 토큰 {report['estimated_tokens_saved']} 절약 ({report['elapsed_ms']}ms)"
+    )
+    return [part for part, _ in results], report
+
+
+async def dedup_image_urls(
+    image_urls: List[str],
+) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    거의 같은 이미지를 합칩니다. 앞쪽 이미지를 남기고 해밍 거리가
+    IMAGE_DEDUP_THRESHOLD 이하인 뒤쪽 이미지를 제외합니다.
+
+    해시는 전처리 단계와 같은 다운로드/캐시를 사용하며, 내려받지 못한 이미지는 항상 남깁니다.
+
+    Returns:
+        (남길 이미지 URL 목록, 합쳐진 이미지 목록 [{"url", "duplicate_of", "distance"}])
+    """
+    results = await asyncio.gather(*[_prepare_one(url) for url in image_urls])
+
+    kept: List[Tuple[str, Optional[str]]] = []
+    merged = []
+    for url, (_, info) in zip(image_urls, results):
+        image_hash = info.get("dhash")
+        duplicate = None
+        if image_hash:
+            for kept_url, kept_hash in kept:
+                if (
+                    kept_hash
+                    and hamming_distance(image_hash, kept_hash) <= IMAGE_DEDUP_THRESHOLD
+                ):
+                    duplicate = {
+                        "url": url,
+                        "duplicate_of": kept_url,
+                        "distance": hamming_distance(image_hash, kept_hash),
+                    }
+                    break
+        if duplicate:
+            merged.append(duplicate)
+        else:
+            kept.append((url, image_hash))
+
+    if merged:
+        logger.info(f"유사 이미지 합치기: {len(image_urls)}개 → {len(kept)}개")
+    _preprocess_totals["dedup_merged"] += len(merged)
+    return [url for url, _ in kept], merged
+
+
+def _pack_grid() -> Tuple[int, int]:
+    columns, rows = IMAGE_PACK_GRID.lower().split("x")
+    return int(columns), int(rows)
+
+
+def _label_font():
+    from PIL import ImageFont
+
+    try:
+        return ImageFont.load_default(size=max(12, IMAGE_PACK_TILE // 24))
+    except TypeError:
+        # Pillow 10.1 미만은 크기 지정 불가
+        return ImageFont.load_default()
+
+
+def pack_mosaic(tiles: List[Tuple[str, Any]], columns: int, rows: int, tile_size: int):
+    """
+    이미지들을 columns x rows 격자 한 장으로 묶고 각 칸 왼쪽 위에 라벨을 붙입니다.
+    채워지지 않은 아래쪽 행은 잘라냅니다.
+
+    Args:
+        tiles: (라벨, PIL 이미지) 목록. 최대 columns * rows개
+    """
+    from PIL import Image, ImageDraw
+
+    used_rows = min(rows, math.ceil(len(tiles) / columns))
+    canvas = Image.new(
+        "RGB", (columns * tile_size, used_rows * tile_size), (255, 255, 255)
+    )
+    draw = ImageDraw.Draw(canvas)
+    font = _label_font()
+
+    for index, (label, img) in enumerate(tiles):
+        left, top = (index % columns) * tile_size, (index // columns) * tile_size
+        thumb = fit_within(img.convert("RGB"), tile_size, tile_size)
+        canvas.paste(
+            thumb,
+            (
+                left + (tile_size - thumb.width) // 2,
+                top + (tile_size - thumb.height) // 2,
+            ),
+        )
+        box = draw.textbbox((left + 6, top + 4), label, font=font)
+        draw.rectangle((box[0] - 4, box[1] - 3, box[2] + 4, box[3] + 3), fill=(0, 0, 0))
+        draw.text((left + 6, top + 4), label, fill=(255, 255, 255), font=font)
+    return canvas
+
+
+def _decode_data_url(data_url: str):
+    from PIL import Image
+
+    return Image.open(io.BytesIO(base64.b64decode(data_url.split(",", 1)[1])))
+
+
+def _build_mosaics(labelled: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """(라벨, data URL) 목록을 모자이크 이미지들로 묶어 data URL과 크기를 반환합니다."""
+    columns, rows = _pack_grid()
+    per_mosaic = columns * rows
+    mosaics = []
+    for start in range(0, len(labelled), per_mosaic):
+        chunk = labelled[start : start + per_mosaic]
+        mosaic = pack_mosaic(
+            [(label, _decode_data_url(url)) for label, url in chunk],
+            columns,
+            rows,
+            IMAGE_PACK_TILE,
+        )
+        buffer = io.BytesIO()
+        mosaic.save(buffer, "JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True)
+        mosaics.append(
+            {
+                "data_url": f"data:image/jpeg;base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}",
+                "width": mosaic.width,
+                "height": mosaic.height,
+                "labels": [label for label, _ in chunk],
+            }
+        )
+    return mosaics
+
+
+async def pack_images(
+    image_urls: List[str],
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    이미지를 전처리한 뒤 최대 IMAGE_PACK_MAX_MOSAICS장의 모자이크로 묶습니다.
+
+    라벨(#번호)은 image_urls 순서이며, 다운로드하지 못했거나 모자이크 용량을 넘는 이미지는 개별 파트로 보냅니다.
+
+    Returns:
+        (안내 텍스트 + 모자이크/개별 이미지 파트 목록, 전처리 + 패킹 보고서)
+    """
+    parts, report = await prepare_images(image_urls)
+    columns, rows = _pack_grid()
+    capacity = columns * rows * IMAGE_PACK_MAX_MOSAICS
+
+    labelled, separate = [], []
+    for index, part in enumerate(parts):
+        url = part["image_url"]["url"]
+        if url.startswith("data:") and len(labelled) < capacity:
+            labelled.append((f"#{index + 1}", url))
+        else:
+            separate.append(part)
+
+    mosaics = await asyncio.to_thread(_build_mosaics, labelled) if labelled else []
+
+    packed_tokens = sum(
+        estimate_image_tokens(m["width"], m["height"], IMAGE_DETAIL) for m in mosaics
+    )
+    for part in separate:
+        url = part["image_url"]["url"]
+        # 원본 URL 그대로 보내는 이미지는 전처리 보고서와 같이 추정에서 제외
+        if url.startswith("data:"):
+            packed_tokens += estimate_image_tokens(
+                *_decode_data_url(url).size, IMAGE_DETAIL
+            )
+    report["packing"] = {
+        "grid": IMAGE_PACK_GRID,
+        "tile": IMAGE_PACK_TILE,
+        "mosaics": len(mosaics),
+        "packed_images": len(labelled),
+        "separate_images": len(separate),
+        "estimated_tokens_unpacked": report["estimated_tokens_after"],
+        "estimated_tokens_packed": packed_tokens,
+    }
+
+    packed_parts: List[Dict[str, Any]] = []
+    if mosaics:
+        packed_parts.append(
+            {
+                "type": "text",
+                "text": f"아래 격자 이미지는 사진 여러 장을 {IMAGE_PACK_GRID} 칸으로 묶은 것입니다. "
+                "각 칸 왼쪽 위의 #번호는 위 이미지 목록의 순서입니다.",
+            }
+        )
+        packed_parts.extend(_image_part(m["data_url"]) for m in mosaics)
+    packed_parts.extend(separate)
+
+    logger.info(
+        f"이미지 패킹 완료: {len(labelled)}개 → 모자이크 {len(mosaics)}장 (개별 {len(separate)}개)"
+    )
+    return packed_parts, report
+
+
+async def build_image_parts(
+    image_urls: List[str],
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[Dict[str, Any]]]:
+    """
+    설정에 따라 비전 호출에 보낼 이미지 파트를 만듭니다.
+
+    Returns:
+        (이미지 파트 목록, 보고서). 전처리/패킹이 모두 꺼져 있으면 (None, None)
+    """
+    if IMAGE_PACKING_ENABLED:
+        return await pack_images(image_urls)
+    if IMAGE_PREPROCESS_ENABLED:
+        return await prepare_images(image_urls)
+    return None, None
+
+
+def preprocess_settings() -> Optional[Dict[str, Any]]:
+    """분석 캐시 키에 포함할 전처리/패킹 설정 (비활성화 시 None)"""
+    if not (IMAGE_PREPROCESS_ENABLED or IMAGE_PACKING_ENABLED):
+        return None
+    settings = {
+        "max_edge": IMAGE_MAX_EDGE,
+        "quality": IMAGE_JPEG_QUALITY,
+        "detail": IMAGE_DETAIL,
+    }
+    if IMAGE_PACKING_ENABLED:
+        settings["packing"] = {
+            "grid": IMAGE_PACK_GRID,
+            "tile": IMAGE_PACK_TILE,
+            "max_mosaics": IMAGE_PACK_MAX_MOSAICS,
+        }
+    return settings
+
+
+def get_preprocess_stats() -> Dict[str, Any]:
+    """누적 전처리 통계를 반환합니다."""
+    return {
+        "enabled": IMAGE_PREPROCESS_ENABLED,
+        "dedup_enabled": IMAGE_DEDUP_ENABLED,
+        "packing_enabled": IMAGE_PACKING_ENABLED,
+        **_preprocess_totals,
+        "bytes_saved": _preprocess_totals["original_bytes"]
+        - _preprocess_totals["compressed_bytes"],
+        "estimated_tokens_saved": _preprocess_totals["estimated_tokens_before"]
+        - _preprocess_totals["estimated_tokens_after"],
+        "cache": image_cache.stats(),
+    }
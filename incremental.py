@@ -0,0 +1,113 @@
+"""
+증분 재분석 저장소
+
+이미지 세트별로 마지막 전체 분석 PensionAnalysis와 1단계 관찰 결과를 보관합니다.
+증분 갱신 결과는 근사치이므로 기준으로 저장하지 않습니다.
+새 요청의 이미지 세트가 저장된 세트와 조금(INCREMENTAL_MAX_DELTA장 이하)만 다르면
+추가된 이미지만 관찰하고 이전 결과를 텍스트 전용 호출로 갱신할 수 있도록 기준 세트를 찾아줍니다.
+"""
+
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from cache import cache_from_env, make_cache_key, normalize_image_urls
+
+logger = logging.getLogger(__name__)
+
+# INCREMENTAL_ENABLED=true 로 증분 재분석을 켬
+INCREMENTAL_ENABLED = os.getenv("INCREMENTAL_ENABLED", "false").lower() == "true"
+# 추가 + 제외된 이미지 수가 이 값 이하이면 증분 경로 사용
+INCREMENTAL_MAX_DELTA = int(os.getenv("INCREMENTAL_MAX_DELTA", "2"))
+# 기준 세트를 찾을 때 살펴보는 최근 이미지 세트 수
+INCREMENTAL_INDEX_SIZE = int(os.getenv("INCREMENTAL_INDEX_SIZE", "200"))
+
+incremental_store = cache_from_env(
+    "INCREMENTAL_STORE", os.path.join(".cache", "incremental")
+)
+
+# 최근 이미지 세트 목록 ([키, 이미지 URL 목록, 출력 모드])을 저장하는 항목의 키
+_INDEX_KEY = "index"
+
+_counters = {"lookups": 0, "bases_found": 0, "remembered": 0}
+
+
+def image_set_key(image_urls: List[str], output_mode: str) -> str:
+    """이미지 세트(순서 무관) + 출력 모드 단위의 저장소 키"""
+    return make_cache_key(image_urls, "incremental", {"output_mode": output_mode})
+
+
+async def find_base(
+    image_urls: List[str], output_mode: str
+) -> Optional[Dict[str, Any]]:
+    """
+    새 이미지 세트와 가장 적게 다른 저장된 세트를 찾습니다.
+
+    동일한 세트는 분석 캐시가 처리하므로 제외하며, 겹치는 이미지가 한 장 이상이어야 합니다.
+
+    Returns:
+        {"entry", "added", "removed"} 또는 기준 세트가 없으면 None
+    """
+    _counters["lookups"] += 1
+    target = set(normalize_image_urls(image_urls))
+    best = None
+    for key, urls, mode in reversed(
+        await incremental_store.get_async(_INDEX_KEY) or []
+    ):
+        previous = set(urls)
+        if mode != output_mode or previous == target or not previous & target:
+            continue
+        added, removed = target - previous, previous - target
+        delta = len(added) + len(removed)
+        if delta <= INCREMENTAL_MAX_DELTA and (best is None or delta < best[0]):
+            best = (delta, key, added, removed)
+
+    if best is None:
+        return None
+    _, key, added, removed = best
+    entry = await incremental_store.get_async(key)
+    if entry is None:
+        return None
+    _counters["bases_found"] += 1
+    # 추가된 이미지는 요청에 들어온 원래 URL 표기를 유지
+    added_urls = [url for url in image_urls if normalize_image_urls([url])[0] in added]
+    return {"entry": entry, "added": added_urls, "removed": sorted(removed)}
+
+
+async def remember(
+    image_urls: List[str],
+    output_mode: str,
+    analysis: Dict[str, Any],
+    observations: List[Dict[str, Any]],
+) -> None:
+    """
+    이미지 세트의 전체 분석 결과와 관찰 결과를 저장하고 최근 세트 목록을 갱신합니다.
+
+    Args:
+        analysis: PensionAnalysis.model_dump() 결과
+        observations: [{"image_urls": [...], "observation": 1단계 결과}] 목록
+    """
+    key = image_set_key(image_urls, output_mode)
+    urls = normalize_image_urls(image_urls)
+    await incremental_store.set_async(
+        key, {"image_urls": urls, "analysis": analysis, "observations": observations}
+    )
+
+    index = [
+        item
+        for item in await incremental_store.get_async(_INDEX_KEY) or []
+        if item[0] != key
+    ]
+    index.append([key, urls, output_mode])
+    await incremental_store.set_async(_INDEX_KEY, index[-INCREMENTAL_INDEX_SIZE:])
+    _counters["remembered"] += 1
+
+
+def get_incremental_stats() -> Dict[str, Any]:
+    """증분 재분석 저장소 통계를 반환합니다."""
+    return {
+        "enabled": INCREMENTAL_ENABLED,
+        "max_delta": INCREMENTAL_MAX_DELTA,
+        **_counters,
+        "store": incremental_store.stats(),
+    }
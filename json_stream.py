@@ -0,0 +1,278 @@
+"""
+선형 시간 JSON 객체 스캐너
+
+LLM 응답 텍스트에서 최상위 JSON 객체 후보를 한 번의 순회로 찾아냅니다.
+중괄호 깊이와 문자열/이스케이프 상태를 추적하므로 문자열 안의 중괄호에
+속지 않으며, 토큰 스트림을 조각 단위로 feed() 할 수 있습니다.
+"""
+
+import json
+import re
+from collections import deque
+from typing import Any, Deque, Iterator, List, Optional, Tuple
+
+# 스캐너가 상태를 바꾸는 문자만 찾아 건너뜀 (나머지 문자는 C 레벨에서 스킵)
+_SPECIAL_CHARS = re.compile(r'[{}"\\]')
+
+# 닫히지 않은 후보가 있을 때 그 다음 위치부터 다시 스캔하는 최대 횟수
+MAX_RESCANS = 3
+
+# 문자열 안의 줄바꿈 등 제어 문자를 허용하는 디코더 (loads_candidate와 같은 strict=False)
+_LENIENT_DECODER = json.JSONDecoder(strict=False)
+
+
+class JSONObjectScanner:
+    """
+    증분 JSON 객체 스캐너
+
+    feed()로 텍스트 조각을 넣으면 그 조각에서 완성된 최상위 JSON 객체
+    문자열 목록을 반환합니다. 각 문자는 한 번만 검사되므로 전체 비용은 O(n)입니다.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self._pos = 0  # 지금까지 소비한 전체 문자 수
+        self._skip_pos = -1  # 이스케이프되어 무시할 문자의 절대 위치
+        self._pending: List[str] = []  # 현재 후보의 이전 조각들
+        self._start: Optional[int] = None  # 현재 후보 시작의 절대 위치
+
+    @property
+    def candidate_start(self) -> Optional[int]:
+        """닫히지 않은 현재 후보의 시작 위치 (없으면 None)"""
+        return self._start
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        텍스트 조각을 처리합니다.
+
+        Args:
+            chunk: 새로 도착한 텍스트 조각
+
+        Returns:
+            이 조각에서 완성된 최상위 JSON 객체 문자열 목록
+        """
+        completed = []
+        base = self._pos
+        local_start = 0
+
+        for match in _SPECIAL_CHARS.finditer(chunk):
+            i = match.start()
+            char = chunk[i]
+
+            if self.in_string:
+                if base + i == self._skip_pos:
+                    continue
+                if char == "\\":
+                    self._skip_pos = base + i + 1
+                elif char == '"':
+                    self.in_string = False
+                continue
+
+            if self.depth == 0:
+                # 객체 밖의 텍스트에서는 여는 중괄호만 의미가 있음
+                if char == "{":
+                    self.depth = 1
+                    self._start = base + i
+                    self._pending = []
+                    local_start = i
+                continue
+
+            if char == '"':
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    self._pending.append(chunk[local_start : i + 1])
+                    completed.append("".join(self._pending))
+                    self._pending = []
+                    self._start = None
+
+        if self.depth > 0:
+            self._pending.append(chunk[local_start:])
+        self._pos += len(chunk)
+        return completed
+
+
+# 필드 스트리머가 상태를 바꾸는 문자 (배열 괄호, 키/값 구분자 포함)
+_FIELD_CHARS = re.compile(r'[{}\[\]"\\:,]')
+
+
+class JSONFieldStreamer:
+    """
+    증분 최상위 필드 파서
+
+    토큰 스트림을 feed()로 넣으면, 첫 번째 최상위 JSON 객체의 필드 값이
+    완성되는 즉시 (키, 값) 목록으로 반환합니다. 중첩된 객체/배열 값은
+    닫히는 시점에 한 번에 반환되며, 각 문자는 한 번만 검사됩니다.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.done = False  # 최상위 객체가 닫혔는지 여부
+        self._pos = 0  # 객체 시작 이후 받은 전체 문자 수
+        # 아직 파싱하지 않은 키/값이 걸쳐 있는 이전 조각들 (그보다 앞의 텍스트는 버림)
+        self._parts: Deque[str] = deque()
+        self._parts_start = 0  # _parts 첫 조각의 절대 위치
+        self._skip_pos = -1
+        self._expect_key = False
+        self._key_start: Optional[int] = None
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        텍스트 조각을 처리합니다.
+
+        Returns:
+            이 조각에서 값이 완성된 (키, 값) 목록
+        """
+        if self.done:
+            return []
+        if self.depth == 0:
+            # 객체 시작 전의 텍스트(코드 블록 표시 등)는 버림
+            start = chunk.find("{")
+            if start < 0:
+                return []
+            chunk = chunk[start:]
+
+        fields = []
+        base = self._pos
+        for match in _FIELD_CHARS.finditer(chunk):
+            pos = base + match.start()
+            char = match.group()
+
+            if self.in_string:
+                if pos == self._skip_pos:
+                    continue
+                if char == "\\":
+                    self._skip_pos = pos + 1
+                elif char == '"':
+                    self.in_string = False
+                    if self._key_start is not None:
+                        self._key = loads_value(
+                            self._slice(self._key_start, pos + 1, chunk, base)
+                        )
+                        self._key_start = None
+                continue
+
+            if char == '"':
+                self.in_string = True
+                if self.depth == 1 and self._expect_key:
+                    self._key_start = pos
+                    self._expect_key = False
+            elif char in "{[":
+                self.depth += 1
+                if self.depth == 1:
+                    self._expect_key = True
+            elif char in "}]":
+                if self.depth == 1:
+                    self._emit(fields, pos, chunk, base)
+                    self.depth = 0
+                    self.done = True
+                    break
+                self.depth -= 1
+            elif self.depth == 1:
+                if char == ":":
+                    self._value_start = pos + 1
+                elif char == ",":
+                    self._emit(fields, pos, chunk, base)
+                    self._expect_key = True
+
+        self._pos += len(chunk)
+        self._keep_pending(chunk)
+        return fields
+
+    def _slice(self, start: int, end: int, chunk: str, base: int) -> str:
+        """절대 위치 start ~ end의 텍스트 (end는 현재 조각 안, start는 보관 중인 조각 또는 현재 조각 안)"""
+        if start >= base:
+            return chunk[start - base : end - base]
+        return "".join(self._parts)[start - self._parts_start :] + chunk[: end - base]
+
+    def _keep_pending(self, chunk: str) -> None:
+        """아직 끝나지 않은 키/값이 시작된 조각부터만 남깁니다 (각 조각은 한 번만 보관/결합)."""
+        pending = [p for p in (self._key_start, self._value_start) if p is not None]
+        if not pending:
+            self._parts.clear()
+            self._parts_start = self._pos
+            return
+        self._parts.append(chunk)
+        keep_from = min(pending)
+        while self._parts and self._parts_start + len(self._parts[0]) <= keep_from:
+            self._parts_start += len(self._parts.popleft())
+
+    def _emit(
+        self, fields: List[Tuple[str, Any]], end: int, chunk: str, base: int
+    ) -> None:
+        """현재 키의 값 텍스트(_value_start ~ end)를 파싱해 fields에 추가합니다."""
+        if self._key is not None and self._value_start is not None:
+            value = loads_value(self._slice(self._value_start, end, chunk, base))
+            if value is not None:
+                fields.append((self._key, value))
+        self._key = None
+        self._value_start = None
+
+
+def loads_value(text: str) -> Any:
+    """필드 값 텍스트를 파싱합니다. 파싱할 수 없으면 None을 반환합니다."""
+    try:
+        return json.loads(text, strict=False)
+    except ValueError:
+        return None
+
+
+def iter_json_objects(text: str) -> Iterator[str]:
+    """
+    텍스트에서 최상위 JSON 객체 후보 문자열을 순서대로 반환합니다.
+
+    앞쪽의 짝이 맞지 않는 '{' 때문에 후보가 끝까지 닫히지 않으면,
+    그 다음 위치부터 최대 MAX_RESCANS번 다시 스캔합니다.
+    """
+    offset = 0
+    for _ in range(MAX_RESCANS + 1):
+        scanner = JSONObjectScanner()
+        yield from scanner.feed(text[offset:])
+        if scanner.candidate_start is None:
+            return
+        offset += scanner.candidate_start + 1
+
+
+def loads_candidate(candidate: str) -> Optional[dict]:
+    """
+    후보 문자열을 JSON 객체로 파싱합니다.
+
+    LLM이 문자열 안에 그대로 넣는 줄바꿈 등 제어 문자는 허용합니다(strict=False).
+    """
+    try:
+        parsed = json.loads(candidate, strict=False)
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def extract_first_json_object(text: str) -> Optional[dict]:
+    """
+    텍스트에서 파싱 가능한 첫 번째 최상위 JSON 객체를 반환합니다.
+
+    대부분의 응답(JSON만, 코드 블록, 앞뒤 설명 텍스트)은 첫 '{'에서 바로 올바른 객체가 시작되므로
+    그 위치에서 raw_decode를 한 번 먼저 시도하고(뒤따르는 텍스트는 무시), 실패할 때만 스캐너로 후보를 찾습니다.
+    첫 '{'에서 파싱된 객체는 스캐너의 첫 후보와 같은 객체입니다.
+    """
+    if not text:
+        return None
+    start = text.find("{")
+    if start < 0:
+        return None
+    try:
+        parsed, _ = _LENIENT_DECODER.raw_decode(text, start)
+        return parsed
+    except ValueError:
+        pass
+    for candidate in iter_json_objects(text):
+        parsed = loads_candidate(candidate)
+        if parsed is not None:
+            return parsed
+    return None
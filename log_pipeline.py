@@ -0,0 +1,190 @@
+"""
+비차단 로깅 파이프라인
+
+요청 경로에서는 로그 레코드를 큐에 넣기만 하고(QueueHandler), 포맷팅/마스킹/출력은
+별도 스레드(QueueListener)에서 수행합니다. 목적은 느린 출력 I/O가 요청 경로를 막지 않게 하는 것이며,
+리스너 스레드가 GIL을 나눠 쓰므로 요청 스레드의 CPU 비용이 줄어든다고 보장하지는 않습니다.
+
+- 로거별 샘플링: WARNING 미만 레코드를 로거 이름 접두사별 비율로만 남김 (LOG_SAMPLING)
+- 페이로드 정리: base64/data URL을 길이 표시로 바꾸고 API 키를 가리며, 긴 메시지(LLM 응답 등)는 잘라냄
+- 구조화 출력: 한 줄에 JSON 객체 하나 (LOG_FORMAT=json, 기본값) 또는 사람이 읽기 쉬운 텍스트
+
+main.py(펜션 분석 API), chain.py, server/api_server.py가 함께 사용합니다.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, TextIO
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_MAX_MESSAGE_CHARS = int(os.getenv("LOG_MAX_MESSAGE_CHARS", "1000"))
+# 예: "chain=0.2,schemas=0.1,httpx=0.05" (로거 이름 접두사=남길 비율)
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+
+_DATA_URL = re.compile(r"data:([\w/+.-]+);base64,[A-Za-z0-9+/=]{16,}")
+_BASE64_RUN = re.compile(r"[A-Za-z0-9+/]{200,}={0,2}")
+_API_KEY = re.compile(r"\bsk-[A-Za-z0-9_-]{16,}")
+
+_listener: Optional[QueueListener] = None
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """ "prefix=rate,prefix=rate" 형식의 샘플링 설정을 파싱합니다."""
+    rates = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, rate = item.split("=", 1)
+        rates[name.strip()] = max(0.0, min(1.0, float(rate)))
+    return rates
+
+
+def redact(text: str, max_chars: int = LOG_MAX_MESSAGE_CHARS) -> str:
+    """
+    로그 메시지에서 base64 데이터와 API 키를 가리고, max_chars를 넘는 부분을 잘라냅니다.
+    """
+    text = _DATA_URL.sub(
+        lambda m: f"data:{m.group(1)};base64,<{len(m.group(0))} chars>", text
+    )
+    text = _BASE64_RUN.sub(lambda m: f"<base64 {len(m.group(0))} chars>", text)
+    text = _API_KEY.sub("sk-***", text)
+    if max_chars and len(text) > max_chars:
+        text = f"{text[:max_chars]}...(+{len(text) - max_chars} chars)"
+    return text
+
+
+class SamplingFilter(logging.Filter):
+    """
+    로거 이름 접두사별 비율로 WARNING 미만 레코드를 샘플링합니다.
+    가장 길게 일치하는 접두사의 비율을 사용하며, WARNING 이상은 항상 남깁니다.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                if random.random() < rate:
+                    return True
+                self.dropped += 1
+                return False
+        return True
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    레코드를 포맷팅하지 않고 그대로 큐에 넣는 QueueHandler
+
+    기본 QueueHandler.prepare()는 호출 스레드에서 format()을 수행하므로,
+    같은 프로세스 안의 큐에서는 메시지 병합만 미루고 레코드를 그대로 전달합니다.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JSONLogFormatter(logging.Formatter):
+    """레코드를 한 줄짜리 JSON 객체로 출력합니다."""
+
+    def __init__(self, service: str):
+        super().__init__()
+        self.service = service
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "service": self.service,
+            "message": redact(record.getMessage()),
+        }
+        if record.exc_info:
+            entry["exc"] = redact(self.formatException(record.exc_info), max_chars=0)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RedactingFormatter(logging.Formatter):
+    """텍스트 형식 출력에도 같은 마스킹/잘라내기를 적용합니다."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return redact(super().format(record), max_chars=0)
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = redact(record.message)
+        return super().formatMessage(record)
+
+
+def setup_logging(
+    service: str, level: Optional[str] = None, stream: Optional[TextIO] = None
+) -> QueueListener:
+    """
+    루트 로거를 큐 기반 파이프라인으로 구성합니다. 여러 번 호출해도 한 번만 구성됩니다.
+
+    Args:
+        service: 로그에 기록할 서비스 이름
+        level: 로그 레벨 (기본값: LOG_LEVEL 환경 변수)
+        stream: 출력 스트림 (기본값: stderr)
+
+    Returns:
+        백그라운드 QueueListener
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    if LOG_FORMAT == "text":
+        formatter: logging.Formatter = RedactingFormatter(
+            "%(asctime)s %(levelname)s %(name)s: %(message)s"
+        )
+    else:
+        formatter = JSONLogFormatter(service)
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(formatter)
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(parse_sampling(LOG_SAMPLING)))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level or LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """큐에 남은 레코드를 모두 출력하고 리스너를 멈춥니다."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logging_stats() -> Dict[str, int]:
+    """샘플링으로 버려진 레코드 수 등 파이프라인 통계를 반환합니다."""
+    for handler in logging.getLogger().handlers:
+        for log_filter in handler.filters:
+            if isinstance(log_filter, SamplingFilter):
+                return {"sampled_out": log_filter.dropped}
+    return {"sampled_out": 0}
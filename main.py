@@ -1,29 +1,94 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from dotenv import load_dotenv
 import os
+import asyncio
 import logging
 import json
-from typing import List, Dict, Any
+import math
+import time
+from typing import List, Dict, Any, Literal, Optional, Tuple
 
-from schemas import AnalysisRequest, PensionAnalysis, ErrorResponse
-from chain import analyze_pension_style_with_retry, call_openai_api
+from schemas import (
+    AnalysisRequest,
+    ErrorResponse,
+    FusedAnalysis,
+    PensionAnalysis,
+    PensionAnalysisResponse,
+    Step1Observation,
+    Step2Validation,
+)
+from chain import (
+    CACHEABLE_TIERS,
+    analysis_cache_key,
+    analyze_pension_style_with_retry_async,
+    call_openai_api,
+    extract_json_from_text,
+    get_cached_analysis,
+    get_async_analysis_stats,
+    get_cascade_stats,
+    get_output_mode_stats,
+    get_recovery_stats,
+    json_schema_response_format,
+    resolve_output_mode,
+    store_cached_analysis,
+    stream_pension_analysis,
+)
+from cache import analysis_cache, hash_text, make_cache_key, step_result_store
+from prompts import (
+    FUSED_PROMPT,
+    INCREMENTAL_UPDATE_PROMPT,
+    STEP1_PROMPT,
+    STEP2_PROMPT,
+    STEP3_PROMPT,
+    STEP_PROMPTS,
+)
+from clients import close_clients, pool_stats
+from singleflight import SingleFlight
+from hedging import get_hedging_stats
+from upstream import UpstreamUnavailable, gateway, get_upstream_stats
+from admission import AdmissionMiddleware, get_admission_stats
+from deadline import DeadlineExceeded, DeadlineMiddleware, get_deadline_stats
+from metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    MetricsMiddleware,
+    render_metrics,
+    stage_timer,
+)
+from images import (
+    IMAGE_DEDUP_ENABLED,
+    dedup_image_urls,
+    get_preprocess_stats,
+    preprocess_settings,
+)
+from incremental import INCREMENTAL_ENABLED, find_base, get_incremental_stats, remember
+from log_pipeline import get_logging_stats, setup_logging
 
 # 환경 변수 로드
 load_dotenv()
 
-# 로깅 설정
-logging.basicConfig(level=logging.DEBUG)
+# 로깅 설정 (큐 기반 비차단 파이프라인, LOG_LEVEL / LOG_FORMAT / LOG_SAMPLING)
+setup_logging("pension-style-analyzer")
 logger = logging.getLogger(__name__)
 
 # FastAPI 앱 초기화
 app = FastAPI(
     title="펜션 스타일 분석 API",
     description="펜션 이미지를 분석하여 스타일과 적합한 고객 유형을 분석하는 API",
-    version="1.0.0"
+    version="1.0.0",
 )
 
+# 분석 엔드포인트(/api/...) 입장 제어: 제한된 대기열 + 503/Retry-After (/, /health, /stats는 별도 경로)
+# 요청을 interactive/batch(X-Traffic-Class 헤더, BATCH_API_KEYS, 배치 경로)로 분류해 대기열 우선순위에 반영
+# CORS 미들웨어보다 먼저 등록해 503 응답에도 CORS 헤더가 붙도록 함
+app.add_middleware(AdmissionMiddleware)
+
+# 요청 마감 시간(X-Request-Deadline 헤더 또는 서버 기본값) 전파, 연결이 끊기면 진행 중인 업스트림 호출 취소
+# 입장 제어 바깥에 두어 대기열에서 기다린 시간도 예산에 포함
+app.add_middleware(DeadlineMiddleware)
+
 # CORS 미들웨어 설정
 app.add_middleware(
     CORSMiddleware,
@@ -33,6 +98,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 엔드포인트별 지연 시간/처리 중인 요청 수 (/metrics), 입장 제어 거절(503)과 마감 초과(504)도 포함
+app.add_middleware(MetricsMiddleware, service="pension-style-analyzer")
+
+
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailable):
+    """서킷 브레이커가 열려 있으면 업스트림을 호출하지 않고 503 + Retry-After로 바로 응답"""
+    retry_after = math.ceil(exc.retry_after)
+    return JSONResponse(
+        status_code=503,
+        content={
+            "error": "upstream_unavailable",
+            "message": str(exc),
+            "retry_after": retry_after,
+        },
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    """요청 예산 안에 분석을 끝낼 수 없으면 남은 업스트림 호출 없이 504로 응답"""
+    return JSONResponse(
+        status_code=504,
+        content={"error": "deadline_exceeded", "message": str(exc), "stage": exc.stage},
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown_clients():
+    """공유 OpenAI HTTP 커넥션 풀 정리"""
+    await close_clients()
+
 
 @app.get("/")
 async def root():
@@ -41,8 +139,11 @@ async def root():
         "message": "펜션 스타일 분석 API",
         "version": "1.0.0",
         "endpoints": {
-            "analyze_pension_style": "/api/analyze-pension-style"
-        }
+            "analyze_pension_style": "/api/analyze-pension-style",
+            "analyze_pension_style_pipeline": "/api/analyze-pension-style-pipeline",
+            "analyze_pension_style_batch": "/api/analyze-pension-style-batch",
+            "analyze_pension_style_stream": "/api/analyze-pension-style-stream",
+        },
     }
 
 
@@ -52,18 +153,63 @@ async def health_check():
     return {"status": "healthy", "service": "pension-style-analyzer"}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus 텍스트 형식 메트릭 (엔드포인트/단계별 지연 시간, 복구 단계, fallback 수, 처리 중인 작업 수)"""
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/stats")
+async def get_stats():
+    """서비스 내부 통계 (캐시 적중률 등)"""
+    return {
+        "analysis_cache": analysis_cache.stats(),
+        "step_result_store": step_result_store.stats(),
+        "async_analysis": get_async_analysis_stats(),
+        "http_pool": pool_stats(),
+        "recovery_tiers": get_recovery_stats(),
+        "output_modes": get_output_mode_stats(),
+        "cascade": get_cascade_stats(),
+        "upstream": get_upstream_stats(),
+        "deadlines": get_deadline_stats(get_output_mode_stats()),
+        "admission": get_admission_stats(),
+        "hedging": get_hedging_stats(),
+        "coalescing": analysis_flight.stats(),
+        "image_preprocess": get_preprocess_stats(),
+        "incremental": get_incremental_stats(),
+        "batch": dict(_batch_stats),
+        "logging": get_logging_stats(),
+    }
+
+
 # 단계별 분석을 위한 Pydantic 모델들
+OutputMode = Optional[Literal["prompt", "structured"]]
+
+
 class Step1Request(BaseModel):
     image_urls: List[str] = Field(..., description="분석할 이미지 URL들")
+    output_mode: OutputMode = Field(None, description="출력 모드 (prompt / structured)")
+
 
 class Step2Request(BaseModel):
     image_urls: List[str] = Field(..., description="분석할 이미지 URL들")
     step1_result: Dict[str, Any] = Field(..., description="1단계 분석 결과")
+    output_mode: OutputMode = Field(None, description="출력 모드 (prompt / structured)")
+
 
 class Step3Request(BaseModel):
     image_urls: List[str] = Field(..., description="분석할 이미지 URL들")
     step1_result: Dict[str, Any] = Field(..., description="1단계 분석 결과")
     step2_result: Dict[str, Any] = Field(..., description="2단계 분석 결과")
+    output_mode: OutputMode = Field(None, description="출력 모드 (prompt / structured)")
+
+
+class PipelineRequest(AnalysisRequest):
+    # sequential: 3번의 호출 / fused: 한 번의 비전 호출로 세 단계 결과를 모두 생성
+    pipeline_mode: Literal["sequential", "fused"] = Field(
+        "sequential", description="파이프라인 실행 방식"
+    )
+
 
 @app.post("/api/analyze-pension-style-step1")
 async def analyze_pension_style_step1(request: Step1Request):
@@ -73,35 +219,33 @@ async def analyze_pension_style_step1(request: Step1Request):
     """
     try:
         logger.info(f"1단계 분석 요청: {len(request.image_urls)}개 이미지")
-        
+
         # OpenAI API 키 확인
         if not os.getenv("OPENAI_API_KEY"):
             raise HTTPException(
-                status_code=500, 
-                detail="OpenAI API 키가 설정되지 않았습니다."
+                status_code=500, detail="OpenAI API 키가 설정되지 않았습니다."
             )
-        
+
         # 1단계 분석 실행
-        result = await analyze_step1(request.image_urls)
-        
+        result = await analyze_step1(request.image_urls, request.output_mode)
+
         if result is not None:
             logger.info("1단계 분석 완료")
             return result
         else:
             raise HTTPException(
-                status_code=500,
-                detail="1단계 분석 결과를 생성할 수 없습니다."
+                status_code=500, detail="1단계 분석 결과를 생성할 수 없습니다."
             )
-            
-    except HTTPException:
+
+    except (HTTPException, UpstreamUnavailable, DeadlineExceeded):
         raise
     except Exception as e:
         logger.error(f"1단계 분석 중 오류 발생: {str(e)}")
         raise HTTPException(
-            status_code=500,
-            detail=f"1단계 분석 중 오류가 발생했습니다: {str(e)}"
+            status_code=500, detail=f"1단계 분석 중 오류가 발생했습니다: {str(e)}"
         )
 
+
 @app.post("/api/analyze-pension-style-step2")
 async def analyze_pension_style_step2(request: Step2Request):
     """
@@ -110,35 +254,35 @@ async def analyze_pension_style_step2(request: Step2Request):
     """
     try:
         logger.info(f"2단계 분석 요청: {len(request.image_urls)}개 이미지")
-        
+
         # OpenAI API 키 확인
         if not os.getenv("OPENAI_API_KEY"):
             raise HTTPException(
-                status_code=500, 
-                detail="OpenAI API 키가 설정되지 않았습니다."
+                status_code=500, detail="OpenAI API 키가 설정되지 않았습니다."
             )
-        
+
         # 2단계 분석 실행
-        result = await analyze_step2(request.image_urls, request.step1_result)
-        
+        result = await analyze_step2(
+            request.image_urls, request.step1_result, request.output_mode
+        )
+
         if result is not None:
             logger.info("2단계 분석 완료")
             return result
         else:
             raise HTTPException(
-                status_code=500,
-                detail="2단계 분석 결과를 생성할 수 없습니다."
+                status_code=500, detail="2단계 분석 결과를 생성할 수 없습니다."
             )
-            
-    except HTTPException:
+
+    except (HTTPException, UpstreamUnavailable, DeadlineExceeded):
         raise
     except Exception as e:
         logger.error(f"2단계 분석 중 오류 발생: {str(e)}")
         raise HTTPException(
-            status_code=500,
-            detail=f"2단계 분석 중 오류가 발생했습니다: {str(e)}"
+            status_code=500, detail=f"2단계 분석 중 오류가 발생했습니다: {str(e)}"
         )
 
+
 @app.post("/api/analyze-pension-style-step3")
 async def analyze_pension_style_step3(request: Step3Request):
     """
@@ -147,88 +291,500 @@ async def analyze_pension_style_step3(request: Step3Request):
     """
     try:
         logger.info(f"3단계 분석 요청: {len(request.image_urls)}개 이미지")
-        
+
         # OpenAI API 키 확인
         if not os.getenv("OPENAI_API_KEY"):
             raise HTTPException(
-                status_code=500, 
-                detail="OpenAI API 키가 설정되지 않았습니다."
+                status_code=500, detail="OpenAI API 키가 설정되지 않았습니다."
             )
-        
+
         # 3단계 분석 실행
-        result = await analyze_step3(request.image_urls, request.step1_result, request.step2_result)
-        
+        result = await analyze_step3(
+            request.image_urls,
+            request.step1_result,
+            request.step2_result,
+            request.output_mode,
+        )
+
         if result is not None:
             logger.info("3단계 분석 완료")
             return result
         else:
             raise HTTPException(
-                status_code=500,
-                detail="3단계 분석 결과를 생성할 수 없습니다."
+                status_code=500, detail="3단계 분석 결과를 생성할 수 없습니다."
             )
-            
-    except HTTPException:
+
+    except (HTTPException, UpstreamUnavailable, DeadlineExceeded):
         raise
     except Exception as e:
         logger.error(f"3단계 분석 중 오류 발생: {str(e)}")
         raise HTTPException(
-            status_code=500,
-            detail=f"3단계 분석 중 오류가 발생했습니다: {str(e)}"
+            status_code=500, detail=f"3단계 분석 중 오류가 발생했습니다: {str(e)}"
         )
 
-@app.post("/api/analyze-pension-style", response_model=PensionAnalysis)
+
+def _sse_event(event: str, data: Any) -> str:
+    """Server-Sent Events 형식의 메시지 한 건을 만듭니다."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _upstream_guarded(events):
+    """스트리밍 도중 서킷 브레이커가 열리거나 요청 마감을 넘기면 503/504 정보를 담은 error 이벤트로 스트림을 마칩니다."""
+    try:
+        async for event in events:
+            yield event
+    except UpstreamUnavailable as e:
+        yield _sse_event(
+            "error",
+            {"status": 503, "message": str(e), "retry_after": math.ceil(e.retry_after)},
+        )
+    except DeadlineExceeded as e:
+        yield _sse_event("error", {"status": 504, "message": str(e), "stage": e.stage})
+
+
+async def run_pipeline_events(
+    image_urls: List[str],
+    output_mode: Optional[str] = None,
+    pipeline_mode: str = "sequential",
+):
+    """
+    1 → 2 → 3단계 분석을 서버에서 순서대로 실행하며,
+    각 단계가 끝나는 즉시 그 결과를 SSE 이벤트로 내보냅니다.
+    fused 모드에서는 한 번의 호출 결과를 같은 세 이벤트로 나눠 보냅니다.
+
+    이벤트: step1, step2, step3 (각 단계 결과), error (실패한 단계), done (완료)
+    """
+    # 거의 같은 이미지는 프롬프트를 만들기 전에 하나로 합침.
+    # 요청 URL 그대로 모든 단계 결과가 저장되어 있으면 이미지를 내려받지 않고 바로 재사용
+    request_urls = image_urls
+    merged: List[Dict[str, Any]] = []
+    if IMAGE_DEDUP_ENABLED and not await _pipeline_memoized(
+        image_urls, output_mode, pipeline_mode
+    ):
+        image_urls, merged = await dedup_image_urls(image_urls)
+
+    # 이전 시도에서 성공한 단계는 메모이제이션 결과로 재개 (실패한 단계만 다시 호출)
+    resumed = (
+        await resumable_steps(image_urls, output_mode)
+        if pipeline_mode == "sequential"
+        else []
+    )
+    yield _sse_event(
+        "start",
+        {
+            "steps": 3,
+            "image_count": len(image_urls),
+            "pipeline_mode": pipeline_mode,
+            "resumed_steps": resumed,
+            "merged_images": merged,
+        },
+    )
+
+    if pipeline_mode == "fused":
+        fused = await analyze_fused(image_urls, output_mode)
+        if fused is None:
+            yield _sse_event(
+                "error", {"step": 0, "message": "fused 분석 결과를 생성할 수 없습니다."}
+            )
+            return
+        step1_result, step2_result, step3_result = fused
+        if merged:
+            await store_step_result(
+                "fused",
+                request_urls,
+                None,
+                output_mode,
+                {
+                    "observation": step1_result,
+                    "validation": step2_result,
+                    "analysis": step3_result.model_dump(),
+                },
+            )
+        yield _sse_event("step1", step1_result)
+        yield _sse_event("step2", step2_result)
+        yield _sse_event("step3", step3_result.model_dump())
+        yield _sse_event("done", {"steps": 3})
+        return
+
+    step1_result = await analyze_step1(image_urls, output_mode)
+    if step1_result is None:
+        yield _sse_event(
+            "error", {"step": 1, "message": "1단계 분석 결과를 생성할 수 없습니다."}
+        )
+        return
+    yield _sse_event("step1", step1_result)
+
+    step2_result = await analyze_step2(image_urls, step1_result, output_mode)
+    if step2_result is None:
+        yield _sse_event(
+            "error", {"step": 2, "message": "2단계 분석 결과를 생성할 수 없습니다."}
+        )
+        return
+    yield _sse_event("step2", step2_result)
+
+    step3_result = await analyze_step3(
+        image_urls, step1_result, step2_result, output_mode
+    )
+    if step3_result is None:
+        yield _sse_event(
+            "error", {"step": 3, "message": "3단계 분석 결과를 생성할 수 없습니다."}
+        )
+        return
+    yield _sse_event("step3", step3_result.model_dump())
+    if merged:
+        await store_step_result("step1", request_urls, None, output_mode, step1_result)
+        await store_step_result(
+            "step2", request_urls, step1_result, output_mode, step2_result
+        )
+        await store_step_result(
+            "step3",
+            request_urls,
+            {"step1": step1_result, "step2": step2_result},
+            output_mode,
+            step3_result.model_dump(),
+        )
+
+    yield _sse_event("done", {"steps": 3})
+
+
+@app.post("/api/analyze-pension-style-pipeline")
+async def analyze_pension_style_pipeline(request: PipelineRequest):
+    """
+    3단계 분석 파이프라인 (서버 오케스트레이션)
+
+    클라이언트가 step1/2/3 엔드포인트를 차례로 호출하며 중간 결과를 다시 보내는 대신,
+    서버에서 세 단계를 이어서 실행하고 각 단계 결과를 text/event-stream으로 스트리밍합니다.
+    """
+    logger.info(f"파이프라인 분석 요청: {len(request.image_urls)}개 이미지")
+
+    # OpenAI API 키 확인 (스트림 시작 전에 실패 처리)
+    if not os.getenv("OPENAI_API_KEY"):
+        raise HTTPException(
+            status_code=500, detail="OpenAI API 키가 설정되지 않았습니다."
+        )
+
+    # 업스트림이 비정상이면 스트림을 열기 전에 503으로 응답
+    gateway.check()
+    return StreamingResponse(
+        _upstream_guarded(
+            run_pipeline_events(
+                request.image_urls, request.output_mode, request.pipeline_mode
+            )
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def run_stream_events(image_urls: List[str], output_mode: Optional[str] = None):
+    """
+    분석 모델의 토큰 스트림에서 PensionAnalysis 필드가 완성될 때마다 SSE 이벤트로 내보냅니다.
+
+    이벤트: start, field (필드 이름/값 미리보기), result (최종 검증 결과 + meta), error, done
+    """
+    started = time.perf_counter()
+    meta: Dict[str, Any] = {}
+    request_urls = image_urls
+    merged: List[Dict[str, Any]] = []
+    # 캐시는 요청 URL 그대로 먼저 확인하고, 적중하지 않았을 때만 이미지를 내려받아 합침
+    if (
+        IMAGE_DEDUP_ENABLED
+        and await get_cached_analysis(image_urls, resolve_output_mode(output_mode))
+        is None
+    ):
+        image_urls, merged = await dedup_image_urls(image_urls)
+        meta["image_dedup"] = {"kept": image_urls, "merged": merged}
+    yield _sse_event("start", {"image_count": len(image_urls), "merged_images": merged})
+
+    async for kind, payload in stream_pension_analysis(
+        image_urls, output_mode=output_mode, meta=meta
+    ):
+        if kind == "field":
+            name, value = payload
+            yield _sse_event(
+                "field",
+                {
+                    "name": name,
+                    "value": value,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000),
+                },
+            )
+            continue
+
+        result, original_content = payload
+        if result is None:
+            yield _sse_event(
+                "error",
+                {
+                    "message": "AI 응답을 파싱할 수 없습니다.",
+                    "original_content_length": (
+                        len(original_content) if original_content else 0
+                    ),
+                },
+            )
+            return
+        meta.setdefault("analysis_path", "stream")
+        if merged and meta.get("recovery_tier") in CACHEABLE_TIERS:
+            await store_cached_analysis(
+                request_urls, result, resolve_output_mode(output_mode)
+            )
+        yield _sse_event(
+            "result",
+            PensionAnalysisResponse(**result.model_dump(), meta=meta).model_dump(),
+        )
+
+    yield _sse_event(
+        "done", {"elapsed_ms": round((time.perf_counter() - started) * 1000)}
+    )
+
+
+@app.post("/api/analyze-pension-style-stream")
+async def analyze_pension_style_stream(request: AnalysisRequest):
+    """
+    펜션 스타일 분석 (필드 단위 스트리밍)
+
+    /api/analyze-pension-style과 같은 분석을 수행하되, 모델 응답을 토큰 단위로 받아
+    core_style, key_elements, ..., pablo_memo 필드가 완성되는 즉시 text/event-stream으로 보냅니다.
+    마지막 result 이벤트는 schemas.PensionAnalysis 검증을 거친 최종 결과입니다.
+    """
+    logger.info(f"스트리밍 분석 요청: {len(request.image_urls)}개 이미지")
+
+    if not os.getenv("OPENAI_API_KEY"):
+        raise HTTPException(
+            status_code=500, detail="OpenAI API 키가 설정되지 않았습니다."
+        )
+
+    gateway.check()
+    return StreamingResponse(
+        _upstream_guarded(run_stream_events(request.image_urls, request.output_mode)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def run_analysis(
+    image_urls: List[str], output_mode: Optional[str] = None
+) -> Tuple[Optional[PensionAnalysis], Optional[str], Dict[str, Any]]:
+    """분석을 실행하고 (결과, 원본 텍스트, 처리 정보)를 반환합니다."""
+    meta: Dict[str, Any] = {}
+    request_urls = image_urls
+    merged: List[Dict[str, Any]] = []
+    if IMAGE_DEDUP_ENABLED:
+        # 캐시는 요청 URL 그대로 먼저 확인하고 (적중 시 이미지를 내려받지 않음),
+        # 적중하지 않았을 때만 거의 같은 이미지를 프롬프트를 만들기 전에 하나로 합침
+        cached = await get_cached_analysis(image_urls, resolve_output_mode(output_mode))
+        if cached is not None:
+            meta["analysis_path"] = "cache"
+            return cached, None, meta
+        image_urls, merged = await dedup_image_urls(image_urls)
+        meta["image_dedup"] = {"kept": image_urls, "merged": merged}
+
+    if INCREMENTAL_ENABLED:
+        # 이전에 분석한 세트와 조금만 다르면 추가된 이미지만 분석해 이전 결과를 갱신
+        updated = await run_incremental_analysis(image_urls, output_mode, meta)
+        if updated is not None:
+            return updated, None, meta
+
+    result, original_content = await analyze_pension_style_with_retry_async(
+        image_urls, max_retries=1, output_mode=output_mode, meta=meta
+    )
+    meta.setdefault("analysis_path", "full")
+
+    # 합쳐진 세트로 분석한 결과는 요청 URL 기준으로도 저장해 다음 요청이 합치기 전에 적중하게 함
+    if merged and result is not None and meta.get("recovery_tier") in CACHEABLE_TIERS:
+        await store_cached_analysis(
+            request_urls, result, resolve_output_mode(output_mode)
+        )
+
+    # 정상 분석 결과만 이후 증분 재분석의 기준으로 저장 (fallback 응답 제외)
+    if (
+        INCREMENTAL_ENABLED
+        and result is not None
+        and (
+            meta["analysis_path"] == "cache"
+            or meta.get("recovery_tier") in CACHEABLE_TIERS
+        )
+    ):
+        observations = await _memoized_observations(image_urls, output_mode)
+        await remember(
+            image_urls,
+            resolve_output_mode(output_mode),
+            result.model_dump(),
+            observations,
+        )
+    return result, original_content, meta
+
+
+async def _memoized_observations(
+    image_urls: List[str], output_mode: Optional[str]
+) -> List[Dict[str, Any]]:
+    """
+    증분 재분석 기준에 함께 저장할 1단계 관찰 결과를 단계 메모에서 찾습니다.
+
+    /analyze 전체 분석은 단일 호출이라 관찰 결과를 만들지 않으므로, 같은 세트를 3단계/fused
+    파이프라인으로 분석한 적이 있을 때만 관찰 결과가 있습니다 (없으면 빈 목록).
+    """
+    step1_result = await lookup_step_result("step1", image_urls, None, output_mode)
+    if step1_result is None:
+        fused = await lookup_step_result("fused", image_urls, None, output_mode)
+        step1_result = fused.get("observation") if fused else None
+    return (
+        [{"image_urls": image_urls, "observation": step1_result}]
+        if step1_result
+        else []
+    )
+
+
+async def run_incremental_analysis(
+    image_urls: List[str], output_mode: Optional[str], meta: Dict[str, Any]
+) -> Optional[PensionAnalysis]:
+    """
+    증분 재분석: 추가된 이미지만 1단계 관찰을 수행하고, 이전 분석 결과를 텍스트 전용 호출로 갱신합니다.
+
+    기준 세트에 1단계 관찰 결과가 없으면(같은 세트를 단계별 파이프라인으로 분석한 적 없음)
+    이미지가 추가되기만 한 경우에만 증분 갱신합니다.
+
+    Returns:
+        갱신된 PensionAnalysis, 기준 세트가 없거나 실패하면 None (전체 분석으로 진행)
+    """
+    mode = resolve_output_mode(output_mode)
+    if await get_cached_analysis(image_urls, mode) is not None:
+        # 동일 세트의 결과가 캐시에 있으면 전체 분석 경로가 더 저렴함
+        return None
+    base = await find_base(image_urls, mode)
+    if base is None:
+        return None
+
+    added, removed = base["added"], base["removed"]
+    entry = base["entry"]
+    meta["incremental"] = {
+        "base_image_count": len(entry["image_urls"]),
+        "added": added,
+        "removed": removed,
+    }
+    if removed and not entry["observations"]:
+        # 관찰 결과 없이 저장된 기준(/analyze 전체 분석만 거친 세트)은 제외된 이미지에만 근거한
+        # 내용을 가려낼 수 없으므로, 추가만 있는 경우에만 증분 갱신하고 나머지는 전체 분석으로 진행
+        logger.info(
+            "기준 세트에 관찰 결과가 없어 제외 이미지를 반영할 수 없음, 전체 분석으로 진행"
+        )
+        meta["incremental"]["fallback"] = "no_observations"
+        return None
+    logger.info(f"증분 재분석: 추가 {len(added)}개, 제외 {len(removed)}개")
+
+    new_observation = None
+    if added:
+        new_observation = await analyze_step1(added, output_mode)
+        if new_observation is None:
+            logger.warning("추가 이미지 관찰 실패, 전체 분석으로 진행")
+            meta["incremental"]["fallback"] = "observation_failed"
+            return None
+
+    update_prompt = INCREMENTAL_UPDATE_PROMPT.format(
+        previous_analysis=json.dumps(entry["analysis"], ensure_ascii=False, indent=2),
+        previous_observations=(
+            json.dumps(entry["observations"], ensure_ascii=False, indent=2)
+            if entry["observations"]
+            else "없음"
+        ),
+        new_observations=(
+            json.dumps(new_observation, ensure_ascii=False, indent=2)
+            if new_observation
+            else "없음"
+        ),
+        removed_images=_format_image_list(removed) if removed else "없음",
+    )
+
+    # 이미지 없이 텍스트만 보내는 갱신 호출
+    response_format = _step_response_format(PensionAnalysis, output_mode)
+    response = await call_openai_api(update_prompt, [], response_format)
+    try:
+        if response_format:
+            analysis = PensionAnalysis.model_validate_json(response)
+        else:
+            analysis = PensionAnalysis(**(extract_json_from_text(response) or {}))
+    except Exception as e:
+        logger.warning(f"증분 갱신 결과 파싱 실패, 전체 분석으로 진행: {str(e)}")
+        meta["incremental"]["fallback"] = "update_failed"
+        return None
+
+    # 증분 결과는 근사치이므로 분석 캐시(전체 분석 키)나 다음 증분의 기준으로 저장하지 않음.
+    # 기준은 항상 전체 분석 결과라서 갱신이 연쇄되며 오차가 쌓이지 않음
+    meta["analysis_path"] = "incremental"
+    return analysis
+
+
+async def run_coalesced_analysis(
+    image_urls: List[str], output_mode: Optional[str] = None
+) -> Tuple[Optional[PensionAnalysis], Optional[str], Dict[str, Any]]:
+    """같은 이미지 세트/출력 모드의 분석이 진행 중이면 그 호출 결과를 공유하는 run_analysis"""
+    flight_key = "analysis:" + analysis_cache_key(
+        image_urls, resolve_output_mode(output_mode)
+    )
+    return await analysis_flight.do(
+        flight_key, lambda: run_analysis(image_urls, output_mode)
+    )
+
+
+@app.post("/api/analyze-pension-style", response_model=PensionAnalysisResponse)
 async def analyze_pension_style(request: AnalysisRequest):
     """
     펜션 이미지들을 분석하여 스타일과 적합한 고객 유형을 분석합니다.
-    
+
     Args:
         request (AnalysisRequest): 분석 요청 데이터
-        
+
     Returns:
-        PensionAnalysis: 펜션 분석 결과
-        
+        PensionAnalysisResponse: 펜션 분석 결과 (+ 이미지 전처리 보고서 등 meta)
+
     Raises:
         HTTPException: 분석 실패 시 500 에러
     """
     try:
         logger.info(f"펜션 스타일 분석 요청: {len(request.image_urls)}개 이미지")
-        logger.info(f"이미지 URL들: {request.image_urls}")
-        
+        logger.debug(f"이미지 URL들: {request.image_urls}")
+
         # OpenAI API 키 확인
         if not os.getenv("OPENAI_API_KEY"):
             raise HTTPException(
-                status_code=500, 
-                detail="OpenAI API 키가 설정되지 않았습니다. .env 파일을 확인해주세요."
+                status_code=500,
+                detail="OpenAI API 키가 설정되지 않았습니다. .env 파일을 확인해주세요.",
             )
-        
-        # 펜션 스타일 분석 실행 (재시도 포함)
-        result, original_content = analyze_pension_style_with_retry(
-            request.image_urls, 
-            max_retries=1
+
+        # 펜션 스타일 분석 실행 (재시도 포함, 이벤트 루프를 막지 않는 비동기 경로)
+        # 같은 이미지 세트/출력 모드의 요청이 진행 중이면 그 호출 결과를 공유
+        result, original_content, meta = await run_coalesced_analysis(
+            request.image_urls, request.output_mode
         )
-        
+
         if result is not None:
             logger.info("펜션 스타일 분석 완료")
-            return result
+            return PensionAnalysisResponse(**result.model_dump(), meta=meta)
         else:
             # 파싱 실패 시 에러 응답
-            logger.error(f"분석 결과 파싱 실패. 원본 텍스트 길이: {len(original_content) if original_content else 0}")
-            
+            logger.error(
+                f"분석 결과 파싱 실패. 원본 텍스트 길이: {len(original_content) if original_content else 0}"
+            )
+
             # 원본 내용의 일부를 로깅하여 디버깅에 도움
             if original_content:
                 logger.error(f"원본 응답 내용: {original_content[:500]}...")
-            
+
             raise HTTPException(
                 status_code=500,
                 detail={
                     "error": "Failed to parse analysis result",
                     "message": "AI 응답을 파싱할 수 없습니다. 다시 시도해주세요.",
-                    "original_content_length": len(original_content) if original_content else 0,
-                    "original_content_preview": original_content[:200] if original_content else None
-                }
+                    "original_content_length": (
+                        len(original_content) if original_content else 0
+                    ),
+                    "original_content_preview": (
+                        original_content[:200] if original_content else None
+                    ),
+                },
             )
-            
-    except HTTPException:
+
+    except (HTTPException, UpstreamUnavailable, DeadlineExceeded):
         raise
     except Exception as e:
         logger.error(f"펜션 스타일 분석 중 오류 발생: {str(e)}")
@@ -236,172 +792,410 @@ async def analyze_pension_style(request: AnalysisRequest):
             status_code=500,
             detail={
                 "error": "Analysis failed",
-                "message": f"분석 중 오류가 발생했습니다: {str(e)}"
+                "message": f"분석 중 오류가 발생했습니다: {str(e)}",
+            },
+        )
+
+
+# 배치 분석
+# 한 배치 요청 안에서 동시에 실행할 분석 수 (요청의 concurrency로 더 낮게 지정 가능)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+# 한 배치 요청에 담을 수 있는 최대 항목 수
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+_batch_stats = {"batches": 0, "items": 0, "succeeded": 0, "failed": 0, "in_flight": 0}
+
+
+class BatchAnalysisRequest(BaseModel):
+    # 각 항목은 AnalysisRequest 형식 (+ 선택적 id). 항목별로 검증하므로 잘못된 항목이 있어도 배치 전체는 실패하지 않음
+    items: List[Dict[str, Any]] = Field(
+        ..., description="분석 요청 목록 ({id?, image_urls, output_mode?})"
+    )
+    concurrency: Optional[int] = Field(
+        None, ge=1, description="동시 분석 수 (최대 BATCH_CONCURRENCY)"
+    )
+
+
+async def _run_batch_item(
+    index: int, item: Dict[str, Any], semaphore: asyncio.Semaphore
+) -> Dict[str, Any]:
+    """배치 항목 하나를 검증/분석하고 NDJSON 한 줄로 보낼 결과 또는 오류를 반환합니다."""
+    item_id = item.get("id")
+    try:
+        request = AnalysisRequest(**{k: v for k, v in item.items() if k != "id"})
+    except ValidationError as e:
+        return {
+            "index": index,
+            "id": item_id,
+            "status": "error",
+            "error": "invalid_request",
+            "message": e.errors()[0]["msg"],
+        }
+
+    async with semaphore:
+        _batch_stats["in_flight"] += 1
+        start = time.perf_counter()
+        try:
+            result, original_content, meta = await run_coalesced_analysis(
+                request.image_urls, request.output_mode
+            )
+        except UpstreamUnavailable as e:
+            return {
+                "index": index,
+                "id": item_id,
+                "status": "error",
+                "error": "upstream_unavailable",
+                "message": str(e),
+                "retry_after": math.ceil(e.retry_after),
+            }
+        except DeadlineExceeded as e:
+            return {
+                "index": index,
+                "id": item_id,
+                "status": "error",
+                "error": "deadline_exceeded",
+                "message": str(e),
+                "stage": e.stage,
             }
+        except Exception as e:
+            logger.error(f"배치 항목 {index} 분석 중 오류 발생: {str(e)}")
+            return {
+                "index": index,
+                "id": item_id,
+                "status": "error",
+                "error": "analysis_failed",
+                "message": str(e),
+            }
+        finally:
+            _batch_stats["in_flight"] -= 1
+        elapsed = round(time.perf_counter() - start, 3)
+
+    if result is None:
+        return {
+            "index": index,
+            "id": item_id,
+            "status": "error",
+            "error": "parse_failed",
+            "message": "AI 응답을 파싱할 수 없습니다.",
+            "original_content_length": len(original_content) if original_content else 0,
+        }
+    response = PensionAnalysisResponse(**result.model_dump(), meta=meta)
+    return {
+        "index": index,
+        "id": item_id,
+        "status": "ok",
+        "elapsed": elapsed,
+        "result": response.model_dump(),
+    }
+
+
+async def run_batch_lines(items: List[Dict[str, Any]], concurrency: int):
+    """
+    배치 항목들을 최대 concurrency개씩 동시에 분석하고, 끝나는 순서대로 NDJSON 한 줄씩 내보냅니다.
+    마지막 줄은 {"done": true, ...} 요약입니다. 클라이언트 연결이 끊기면 남은 분석을 취소합니다.
+    """
+    _batch_stats["batches"] += 1
+    _batch_stats["items"] += len(items)
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [
+        asyncio.ensure_future(_run_batch_item(i, item, semaphore))
+        for i, item in enumerate(items)
+    ]
+    start = time.perf_counter()
+    succeeded = failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            if line["status"] == "ok":
+                succeeded += 1
+            else:
+                failed += 1
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+        _batch_stats["succeeded"] += succeeded
+        _batch_stats["failed"] += failed
+
+    logger.info(f"배치 분석 완료: 성공 {succeeded}개, 실패 {failed}개")
+    yield json.dumps(
+        {
+            "done": True,
+            "total": len(items),
+            "succeeded": succeeded,
+            "failed": failed,
+            "elapsed": round(time.perf_counter() - start, 3),
+        },
+        ensure_ascii=False,
+    ) + "\n"
+
+
+@app.post("/api/analyze-pension-style-batch")
+async def analyze_pension_style_batch(request: BatchAnalysisRequest):
+    """
+    여러 펜션을 한 번에 분석하는 배치 엔드포인트
+
+    항목마다 /api/analyze-pension-style과 같은 비동기 분석 경로(캐시, 중복 호출 병합 포함)를 사용하며,
+    결과는 완료되는 순서대로 application/x-ndjson으로 스트리밍합니다.
+    각 줄에는 요청 순서(index)와 id가 들어 있고, 실패한 항목은 status="error"로 보고됩니다.
+    """
+    logger.info(f"배치 분석 요청: {len(request.items)}개 항목")
+
+    if not os.getenv("OPENAI_API_KEY"):
+        raise HTTPException(
+            status_code=500, detail="OpenAI API 키가 설정되지 않았습니다."
+        )
+    if not request.items:
+        raise HTTPException(status_code=400, detail="배치 항목이 비어있습니다.")
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"배치 항목은 최대 {BATCH_MAX_ITEMS}개까지 허용됩니다.",
         )
 
+    concurrency = min(request.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY)
+    gateway.check()
+    return StreamingResponse(
+        run_batch_lines(request.items, concurrency),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 # 단계별 분석 함수들
-async def analyze_step1(image_urls: List[str]) -> Dict[str, Any]:
+# STEP_MEMO_ENABLED=false 로 단계별 결과 메모이제이션을 끌 수 있음
+STEP_MEMO_ENABLED = os.getenv("STEP_MEMO_ENABLED", "true").lower() == "true"
+
+# 동일 요청 합치기: 같은 정규화 키로 동시에 들어온 분석은 하나의 업스트림 호출을 공유
+analysis_flight = SingleFlight()
+
+
+def _format_image_list(image_urls: List[str]) -> str:
+    """이미지 URL들을 프롬프트용 목록 문자열로 변환합니다."""
+    return "\n".join([f"- {url}" for url in image_urls])
+
+
+def step_memo_key(
+    step: str, image_urls: List[str], upstream: Any, output_mode: Optional[str]
+) -> str:
+    """
+    단계별 결과 메모이제이션 키: (이미지 세트 해시, 단계, 이전 단계 결과 해시, 프롬프트 버전, 출력 모드)
+    """
+    settings = {
+        "step": step,
+        "upstream": hash_text(json.dumps(upstream, sort_keys=True, ensure_ascii=False)),
+        "output_mode": resolve_output_mode(output_mode),
+    }
+    if preprocess_settings():
+        settings["image_preprocess"] = preprocess_settings()
+    return make_cache_key(image_urls, STEP_PROMPTS[step], settings)
+
+
+async def lookup_step_result(
+    step: str, image_urls: List[str], upstream: Any, output_mode: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    """이전에 성공한 단계 결과가 있으면 반환합니다."""
+    if not STEP_MEMO_ENABLED:
+        return None
+    return await step_result_store.get_async(
+        step_memo_key(step, image_urls, upstream, output_mode)
+    )
+
+
+async def store_step_result(
+    step: str,
+    image_urls: List[str],
+    upstream: Any,
+    output_mode: Optional[str],
+    result: Dict[str, Any],
+) -> None:
+    """성공한 단계 결과를 저장합니다. 이후 재시도는 이 단계부터 이어서 실행됩니다."""
+    if STEP_MEMO_ENABLED:
+        await step_result_store.set_async(
+            step_memo_key(step, image_urls, upstream, output_mode), result
+        )
+
+
+async def _pipeline_memoized(
+    image_urls: List[str], output_mode: Optional[str], pipeline_mode: str
+) -> bool:
+    """파이프라인의 모든 단계 결과가 이 이미지 URL 목록 기준으로 저장되어 있는지 확인합니다."""
+    if pipeline_mode == "fused":
+        return (
+            await lookup_step_result("fused", image_urls, None, output_mode) is not None
+        )
+    return await resumable_steps(image_urls, output_mode) == [1, 2, 3]
+
+
+async def resumable_steps(
+    image_urls: List[str], output_mode: Optional[str]
+) -> List[int]:
+    """메모이제이션된 결과로 건너뛸 수 있는 앞쪽 단계 번호 목록을 반환합니다."""
+    step1_result = await lookup_step_result("step1", image_urls, None, output_mode)
+    if step1_result is None:
+        return []
+    step2_result = await lookup_step_result(
+        "step2", image_urls, step1_result, output_mode
+    )
+    if step2_result is None:
+        return [1]
+    upstream = {"step1": step1_result, "step2": step2_result}
+    if await lookup_step_result("step3", image_urls, upstream, output_mode) is None:
+        return [1, 2]
+    return [1, 2, 3]
+
+
+def _step_response_format(
+    model_cls, output_mode: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    """structured 모드이면 단계 결과 모델의 strict JSON 스키마 response_format을 반환합니다."""
+    if resolve_output_mode(output_mode) == "structured":
+        return json_schema_response_format(model_cls)
+    return None
+
+
+def _parse_step_response(
+    response: str, model_cls, response_format: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    단계 응답을 파싱합니다.
+    structured 모드에서는 스키마가 보장되므로 모델 검증 한 번으로 끝납니다.
+    """
+    with stage_timer("validation"):
+        if response_format:
+            return model_cls.model_validate_json(response).model_dump()
+        return json.loads(response)
+
+
+async def _analyze_step1(
+    image_urls: List[str], output_mode: Optional[str] = None
+) -> Dict[str, Any]:
     """
     1단계: 관찰 및 1차 분석
     이미지에서 기본적인 디자인 요소들을 관찰하고 파악합니다.
     """
+    cached = await lookup_step_result("step1", image_urls, None, output_mode)
+    if cached is not None:
+        logger.info("1단계 메모이제이션 결과 사용")
+        return cached
+
     try:
         # 1단계 분석을 위한 프롬프트
-        step1_prompt = f"""
-당신은 공간 심리학자이자 경험 디자이너입니다. 
-제공된 펜션 이미지들을 관찰하여 기본적인 디자인 요소들을 파악해주세요.
-
-**1단계: 관찰 및 1차 분석**
-
-다음 이미지들을 자세히 관찰하세요:
-{chr(10).join([f"- {url}" for url in image_urls])}
-
-**관찰해야 할 요소들:**
-1. **색상 팔레트**: 주요 색상과 색상 조합
-2. **재료와 질감**: 나무, 돌, 금속, 직물 등의 재료 사용
-3. **공간 구성**: 방의 배치, 크기, 높이, 개방성
-4. **조명**: 자연광과 인공조명의 활용
-5. **가구와 소품**: 스타일, 배치, 브랜드 특성
-6. **외부 환경**: 창밖 풍경, 테라스, 정원 등
-
-**분석 결과를 다음 JSON 형식으로 제공해주세요:**
-{{
-    "color_palette": ["주요 색상 1", "주요 색상 2", "주요 색상 3"],
-    "materials": ["주요 재료 1", "주요 재료 2", "주요 재료 3"],
-    "spatial_layout": ["공간 구성 특징 1", "공간 구성 특징 2"],
-    "lighting": ["조명 특징 1", "조명 특징 2"],
-    "furniture_style": ["가구 스타일 1", "가구 스타일 2"],
-    "overall_impression": "전체적인 첫인상과 분위기",
-    "key_observations": ["핵심 관찰 사항 1", "핵심 관찰 사항 2", "핵심 관찰 사항 3"]
-}}
-
-JSON 형식으로만 응답해주세요.
-"""
-
-        # OpenAI API 호출
-        response = await call_openai_api(step1_prompt, image_urls)
-        
+        step1_prompt = STEP1_PROMPT.format(image_urls=_format_image_list(image_urls))
+
+        # OpenAI API 호출 (structured 모드면 JSON 스키마 강제)
+        response_format = _step_response_format(Step1Observation, output_mode)
+        response = await call_openai_api(step1_prompt, image_urls, response_format)
+
         if response:
             # JSON 파싱 시도
             try:
-                result = json.loads(response)
+                result = _parse_step_response(
+                    response, Step1Observation, response_format
+                )
+                await store_step_result("step1", image_urls, None, output_mode, result)
                 return result
-            except json.JSONDecodeError:
+            except ValueError:
                 logger.error(f"1단계 분석 결과 JSON 파싱 실패: {response}")
                 return None
         else:
             return None
-            
+
+    except (UpstreamUnavailable, DeadlineExceeded):
+        raise
     except Exception as e:
         logger.error(f"1단계 분석 중 오류: {str(e)}")
         return None
 
-async def analyze_step2(image_urls: List[str], step1_result: Dict[str, Any]) -> Dict[str, Any]:
+
+async def _analyze_step2(
+    image_urls: List[str],
+    step1_result: Dict[str, Any],
+    output_mode: Optional[str] = None,
+) -> Dict[str, Any]:
     """
     2단계: 자기 검증 및 근거 도출
     관찰 결과를 바탕으로 '왜?'라는 질문에 답하며 검증합니다.
     """
+    cached = await lookup_step_result("step2", image_urls, step1_result, output_mode)
+    if cached is not None:
+        logger.info("2단계 메모이제이션 결과 사용")
+        return cached
+
     try:
         # 2단계 분석을 위한 프롬프트
-        step2_prompt = f"""
-당신은 공간 심리학자이자 경험 디자이너입니다.
-1단계에서 관찰한 결과를 바탕으로 '왜?'라는 질문에 답하며 검증해주세요.
-
-**2단계: 자기 검증 및 근거 도출**
-
-**1단계 관찰 결과:**
-{json.dumps(step1_result, ensure_ascii=False, indent=2)}
-
-**검증해야 할 질문들:**
-1. **색상 선택의 이유**: 왜 이런 색상 조합을 선택했을까?
-2. **재료 선택의 이유**: 왜 이런 재료들을 사용했을까?
-3. **공간 구성의 이유**: 왜 이런 레이아웃을 만들었을까?
-4. **조명 설계의 이유**: 왜 이런 조명 방식을 선택했을까?
-5. **전체적인 의도**: 이 공간이 어떤 경험을 제공하려고 하는가?
-
-**검증 결과를 다음 JSON 형식으로 제공해주세요:**
-{{
-    "color_reasoning": "색상 선택의 심리적, 기능적 이유",
-    "material_reasoning": "재료 선택의 심리적, 기능적 이유",
-    "spatial_reasoning": "공간 구성의 심리적, 기능적 이유",
-    "lighting_reasoning": "조명 설계의 심리적, 기능적 이유",
-    "experience_intent": "이 공간이 제공하려는 경험의 의도",
-    "psychological_impact": "이 디자인이 사람들에게 미치는 심리적 영향",
-    "validation_insights": ["검증을 통해 발견한 통찰 1", "검증을 통해 발견한 통찰 2", "검증을 통해 발견한 통찰 3"]
-}}
-
-JSON 형식으로만 응답해주세요.
-"""
-
-        # OpenAI API 호출
-        response = await call_openai_api(step2_prompt, image_urls)
-        
+        step2_prompt = STEP2_PROMPT.format(
+            step1_result=json.dumps(step1_result, ensure_ascii=False, indent=2)
+        )
+
+        # OpenAI API 호출 (structured 모드면 JSON 스키마 강제)
+        response_format = _step_response_format(Step2Validation, output_mode)
+        response = await call_openai_api(step2_prompt, image_urls, response_format)
+
         if response:
             # JSON 파싱 시도
             try:
-                result = json.loads(response)
+                result = _parse_step_response(
+                    response, Step2Validation, response_format
+                )
+                await store_step_result(
+                    "step2", image_urls, step1_result, output_mode, result
+                )
                 return result
-            except json.JSONDecodeError:
+            except ValueError:
                 logger.error(f"2단계 분석 결과 JSON 파싱 실패: {response}")
                 return None
         else:
             return None
-            
+
+    except (UpstreamUnavailable, DeadlineExceeded):
+        raise
     except Exception as e:
         logger.error(f"2단계 분석 중 오류: {str(e)}")
         return None
 
-async def analyze_step3(image_urls: List[str], step1_result: Dict[str, Any], step2_result: Dict[str, Any]) -> PensionAnalysis:
+
+async def _analyze_step3(
+    image_urls: List[str],
+    step1_result: Dict[str, Any],
+    step2_result: Dict[str, Any],
+    output_mode: Optional[str] = None,
+) -> PensionAnalysis:
     """
     3단계: 최종 결과물 생성
     검증된 통찰력을 바탕으로 최종 분석 결과를 생성합니다.
     """
+    upstream = {"step1": step1_result, "step2": step2_result}
+    cached = await lookup_step_result("step3", image_urls, upstream, output_mode)
+    if cached is not None:
+        logger.info("3단계 메모이제이션 결과 사용")
+        return PensionAnalysis(**cached)
+
     try:
         # 3단계 분석을 위한 프롬프트
-        step3_prompt = f"""
-당신은 공간 심리학자이자 경험 디자이너입니다.
-1단계와 2단계의 분석 결과를 바탕으로 최종적인 펜션 스타일 분석 결과를 생성해주세요.
-
-**3단계: 최종 결과물 생성**
-
-**1단계 관찰 결과:**
-{json.dumps(step1_result, ensure_ascii=False, indent=2)}
-
-**2단계 검증 결과:**
-{json.dumps(step2_result, ensure_ascii=False, indent=2)}
-
-**최종 분석 결과를 다음 JSON 형식으로 제공해주세요:**
-{{
-    "core_style": ["핵심 스타일 1", "핵심 스타일 2", "핵심 스타일 3"],
-    "key_elements": ["주요 디자인 요소 1", "주요 디자인 요소 2", "주요 디자인 요소 3"],
-    "target_persona": ["적합한 고객 유형 1", "적합한 고객 유형 2", "적합한 고객 유형 3"],
-    "recommended_activities": ["추천 활동 1", "추천 활동 2", "추천 활동 3"],
-    "unsuitable_persona": ["부적합한 고객 유형 1", "부적합한 고객 유형 2"],
-    "confidence_score": 0.85,
-    "pablo_memo": "종합적인 분석 메모와 스토리"
-}}
-
-**분석 기준:**
-- **핵심 스타일**: 공간이 만들어내는 감정적 경험 중심
-- **주요 요소**: 각 디자인 요소가 유발하는 감정적 반응
-- **고객 유형**: 표면적 특징을 넘어 숨겨진 욕망까지 파악
-- **추천 활동**: 시간대별 구체적인 경험 시나리오
-- **신뢰도**: 분석의 확신 정도 (0.0~1.0)
-
-JSON 형식으로만 응답해주세요.
-"""
-
-        # OpenAI API 호출
-        response = await call_openai_api(step3_prompt, image_urls)
-        
+        step3_prompt = STEP3_PROMPT.format(
+            step1_result=json.dumps(step1_result, ensure_ascii=False, indent=2),
+            step2_result=json.dumps(step2_result, ensure_ascii=False, indent=2),
+        )
+
+        # OpenAI API 호출 (structured 모드면 JSON 스키마 강제)
+        response_format = _step_response_format(PensionAnalysis, output_mode)
+        response = await call_openai_api(step3_prompt, image_urls, response_format)
+
         if response:
             # JSON 파싱 시도
             try:
-                result = json.loads(response)
-                # PensionAnalysis 모델에 맞게 변환
-                return PensionAnalysis(**result)
+                with stage_timer("validation"):
+                    if response_format:
+                        analysis = PensionAnalysis.model_validate_json(response)
+                    else:
+                        result = json.loads(response)
+                        # PensionAnalysis 모델에 맞게 변환
+                        analysis = PensionAnalysis(**result)
+                await store_step_result(
+                    "step3", image_urls, upstream, output_mode, analysis.model_dump()
+                )
+                return analysis
             except json.JSONDecodeError:
                 logger.error(f"3단계 분석 결과 JSON 파싱 실패: {response}")
                 return None
@@ -410,31 +1204,138 @@ JSON 형식으로만 응답해주세요.
                 return None
         else:
             return None
-            
+
+    except (UpstreamUnavailable, DeadlineExceeded):
+        raise
     except Exception as e:
         logger.error(f"3단계 분석 중 오류: {str(e)}")
         return None
 
+
+async def _analyze_fused(
+    image_urls: List[str], output_mode: Optional[str] = None
+) -> Optional[Tuple[Dict[str, Any], Dict[str, Any], PensionAnalysis]]:
+    """
+    단일 호출(fused) 모드: 관찰 → 검증 → 최종 분석을 한 번의 비전 호출로 수행합니다.
+    이미지 토큰을 한 번만 지불하며, 결과는 단계별 엔드포인트와 같은 세 개의 결과로 나눠 반환합니다.
+
+    Returns:
+        (1단계 결과, 2단계 결과, PensionAnalysis) 또는 실패 시 None
+    """
+    cached = await lookup_step_result("fused", image_urls, None, output_mode)
+    if cached is not None:
+        logger.info("fused 메모이제이션 결과 사용")
+        return (
+            cached["observation"],
+            cached["validation"],
+            PensionAnalysis(**cached["analysis"]),
+        )
+
+    try:
+        fused_prompt = FUSED_PROMPT.format(image_urls=_format_image_list(image_urls))
+
+        # OpenAI API 호출 (이미지는 한 번만 전송)
+        response_format = _step_response_format(FusedAnalysis, output_mode)
+        response = await call_openai_api(fused_prompt, image_urls, response_format)
+
+        if response:
+            try:
+                with stage_timer("validation"):
+                    if response_format:
+                        fused = FusedAnalysis.model_validate_json(response)
+                    else:
+                        fused = FusedAnalysis(**json.loads(response))
+                await store_step_result(
+                    "fused", image_urls, None, output_mode, fused.model_dump()
+                )
+                return (
+                    fused.observation.model_dump(),
+                    fused.validation.model_dump(),
+                    fused.analysis,
+                )
+            except ValueError as e:
+                logger.error(f"fused 분석 결과 파싱/검증 실패: {str(e)}")
+                return None
+        else:
+            return None
+
+    except (UpstreamUnavailable, DeadlineExceeded):
+        raise
+    except Exception as e:
+        logger.error(f"fused 분석 중 오류: {str(e)}")
+        return None
+
+
+async def analyze_step1(
+    image_urls: List[str], output_mode: Optional[str] = None
+) -> Dict[str, Any]:
+    """1단계 분석 (진행 중인 동일 요청이 있으면 그 결과를 공유)"""
+    key = "step1:" + step_memo_key("step1", image_urls, None, output_mode)
+    return await analysis_flight.do(
+        key, lambda: _analyze_step1(image_urls, output_mode)
+    )
+
+
+async def analyze_step2(
+    image_urls: List[str],
+    step1_result: Dict[str, Any],
+    output_mode: Optional[str] = None,
+) -> Dict[str, Any]:
+    """2단계 분석 (진행 중인 동일 요청이 있으면 그 결과를 공유)"""
+    key = "step2:" + step_memo_key("step2", image_urls, step1_result, output_mode)
+    return await analysis_flight.do(
+        key, lambda: _analyze_step2(image_urls, step1_result, output_mode)
+    )
+
+
+async def analyze_step3(
+    image_urls: List[str],
+    step1_result: Dict[str, Any],
+    step2_result: Dict[str, Any],
+    output_mode: Optional[str] = None,
+) -> PensionAnalysis:
+    """3단계 분석 (진행 중인 동일 요청이 있으면 그 결과를 공유)"""
+    upstream = {"step1": step1_result, "step2": step2_result}
+    key = "step3:" + step_memo_key("step3", image_urls, upstream, output_mode)
+    return await analysis_flight.do(
+        key, lambda: _analyze_step3(image_urls, step1_result, step2_result, output_mode)
+    )
+
+
+async def analyze_fused(
+    image_urls: List[str], output_mode: Optional[str] = None
+) -> Optional[Tuple[Dict[str, Any], Dict[str, Any], PensionAnalysis]]:
+    """단일 호출(fused) 분석 (진행 중인 동일 요청이 있으면 그 결과를 공유)"""
+    key = "fused:" + step_memo_key("fused", image_urls, None, output_mode)
+    return await analysis_flight.do(
+        key, lambda: _analyze_fused(image_urls, output_mode)
+    )
+
+
 # 디버깅을 위한 엔드포인트 추가
 @app.post("/api/debug-request")
 async def debug_request(request: dict):
     """요청 데이터를 디버깅하기 위한 엔드포인트"""
     logger.info(f"디버그 요청 받음: {request}")
     logger.info(f"요청 타입: {type(request)}")
-    logger.info(f"요청 키들: {list(request.keys()) if isinstance(request, dict) else 'Not a dict'}")
-    
-    if 'image_urls' in request:
+    logger.info(
+        f"요청 키들: {list(request.keys()) if isinstance(request, dict) else 'Not a dict'}"
+    )
+
+    if "image_urls" in request:
         logger.info(f"image_urls 타입: {type(request['image_urls'])}")
-        logger.info(f"image_urls 길이: {len(request['image_urls']) if isinstance(request['image_urls'], list) else 'Not a list'}")
-        for i, url in enumerate(request['image_urls']):
+        logger.info(
+            f"image_urls 길이: {len(request['image_urls']) if isinstance(request['image_urls'], list) else 'Not a list'}"
+        )
+        for i, url in enumerate(request["image_urls"]):
             logger.info(f"URL {i+1}: {url[:100]}...")
-    
+
     return {"message": "Debug info logged", "received_data": request}
 
 
 if __name__ == "__main__":
     import uvicorn
-    
+
     # 테스트용 이미지 URL 예시 (주석 처리)
     """
     테스트용 이미지 URL 예시:
@@ -444,11 +1345,5 @@ if __name__ == "__main__":
         "https://example.com/pension3.jpg"
     ]
     """
-    
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
-    )
+
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True, log_level="info")
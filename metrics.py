@@ -0,0 +1,288 @@
+"""
+Prometheus 텍스트 형식(0.0.4) 메트릭
+
+main.py(분석 서비스)와 server/api_server.py(라우터 서비스)의 /metrics 엔드포인트가 사용합니다.
+외부 의존성 없이 카운터/게이지/히스토그램만 구현하며, 기록 비용은 잠금 한 번과 딕셔너리 갱신이라
+운영 환경에서 계속 켜 두어도 됩니다. 라벨 값은 단계/경로 템플릿/복구 단계처럼 종류가 정해진 값만 사용합니다.
+
+- staypost_http_request_duration_seconds: 엔드포인트(경로 템플릿)별 지연 시간 히스토그램
+- staypost_http_requests_in_flight: 처리 중인 요청 수
+- staypost_stage_duration_seconds: 단계별(프롬프트 생성, 업스트림, 파서, 복구, 검증 등) 지연 시간 히스토그램
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# LLM 호출(수십 초)부터 프롬프트 생성(수백 마이크로초)까지 담는 기본 버킷
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    20,
+    30,
+    60,
+    120,
+)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(labels[name] for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """단조 증가 카운터"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """현재 값 게이지. set_function()을 쓰면 수집 시점에 값을 읽습니다 (라벨 없는 게이지)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def _samples(self) -> List[str]:
+        if self._function is not None:
+            return [f"{self.name} {_format_value(self._function())}"]
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """누적 버킷 히스토그램 (관측값은 초 단위)"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 라벨 값 → [버킷별 개수(+Inf 포함), 합계]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels: str):
+        """with 블록의 소요 시간을 관측합니다 (예외가 나도 기록)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [
+                (key, list(counts), total)
+                for key, (counts, total) in self._values.items()
+            ]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            lines.append(
+                f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            )
+            lines.append(
+                f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+            )
+        return lines
+
+
+def render_metrics() -> str:
+    """등록된 모든 메트릭을 Prometheus 텍스트 형식으로 반환합니다."""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    "staypost_http_request_duration_seconds",
+    "HTTP request latency by endpoint (route template)",
+    ("service", "method", "route", "status"),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "staypost_http_requests_in_flight",
+    "HTTP requests currently being processed",
+    ("service",),
+)
+STAGE_DURATION = Histogram(
+    "staypost_stage_duration_seconds",
+    "Latency of internal processing stages (prompt_render, upstream, output_parser, recover, validation, ...)",
+    ("stage",),
+)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """단계 소요 시간(초)을 기록합니다."""
+    STAGE_DURATION.observe(seconds, stage=stage)
+
+
+def stage_timer(stage: str):
+    """with stage_timer("prompt_render"): ... 형태로 단계 소요 시간을 기록합니다."""
+    return STAGE_DURATION.time(stage=stage)
+
+
+class MetricsMiddleware:
+    """
+    ASGI 미들웨어: 엔드포인트별 지연 시간과 처리 중인 요청 수를 기록합니다.
+
+    경로는 라우트 템플릿(/api/...)으로 기록하며, 라우트에 닿지 못한 요청(입장 제어 거절 등)은
+    라우트 목록에서 템플릿을 찾고, 없으면 "unmatched"로 기록합니다.
+    """
+
+    def __init__(self, app, service: str):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc(service=self.service)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(service=self.service)
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                service=self.service,
+                method=scope["method"],
+                route=_route_template(scope),
+                status=str(status["code"]),
+            )
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    app = scope.get("app")
+    for candidate in getattr(app, "routes", ()):
+        path = getattr(candidate, "path", None)
+        if path is not None and candidate.matches(scope)[0].name == "FULL":
+            return path
+    return "unmatched"
@@ -0,0 +1,151 @@
+"""
+대화형(interactive) / 배치(batch) 트래픽 우선순위 스케줄링
+
+요청은 헤더, API 키, 경로로 interactive 또는 batch로 분류되며(컨텍스트 변수로 요청 처리 전체에 전달),
+입장 제어 대기열과 업스트림 동시성 슬롯은 PriorityWaitQueue로 다음 대기자를 고릅니다.
+
+- 두 클래스가 모두 기다리고 있으면 interactive를 먼저 처리하되,
+  경합 중 배정된 슬롯의 PRIORITY_BATCH_MIN_SHARE 비율은 batch에 보장합니다.
+- 한쪽만 기다리고 있으면 그 클래스가 남은 슬롯을 모두 사용합니다.
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Mapping, Optional
+
+TRAFFIC_CLASSES = ("interactive", "batch")
+
+# 경합 시 batch에 보장하는 최소 슬롯 비율
+PRIORITY_BATCH_MIN_SHARE = float(os.getenv("PRIORITY_BATCH_MIN_SHARE", "0.2"))
+# 이 API 키(X-API-Key)로 들어온 요청은 항상 batch
+BATCH_API_KEYS = {
+    key.strip() for key in os.getenv("BATCH_API_KEYS", "").split(",") if key.strip()
+}
+# 헤더가 없을 때 batch로 분류하는 경로
+PRIORITY_BATCH_PATHS = tuple(
+    path.strip()
+    for path in os.getenv(
+        "PRIORITY_BATCH_PATHS", "/api/analyze-pension-style-batch"
+    ).split(",")
+    if path.strip()
+)
+
+traffic_class: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "traffic_class", default="interactive"
+)
+
+
+def classify_request(path: str, headers: Mapping[str, str]) -> str:
+    """
+    요청의 트래픽 클래스를 정합니다.
+
+    배치용 API 키 → batch, X-Traffic-Class 헤더 → 그 값, 배치 경로 → batch, 그 외 interactive
+    """
+    if headers.get("x-api-key") in BATCH_API_KEYS:
+        return "batch"
+    requested = (headers.get("x-traffic-class") or "").lower()
+    if requested in TRAFFIC_CLASSES:
+        return requested
+    if path.startswith(PRIORITY_BATCH_PATHS):
+        return "batch"
+    return "interactive"
+
+
+def current_traffic_class() -> str:
+    """현재 요청(또는 작업)의 트래픽 클래스"""
+    return traffic_class.get()
+
+
+class PriorityWaitQueue:
+    """클래스별 FIFO 대기열과, 슬롯이 났을 때 다음 대기자를 고르는 가중 우선순위 규칙"""
+
+    def __init__(self):
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {
+            name: deque() for name in TRAFFIC_CLASSES
+        }
+        self._enqueued_at: Dict[asyncio.Future, float] = {}
+        self._contended_grants = {name: 0 for name in TRAFFIC_CLASSES}
+        self._stats = {
+            name: {"granted": 0, "waits": deque(maxlen=500), "max_depth": 0}
+            for name in TRAFFIC_CLASSES
+        }
+
+    def depth(self, name: Optional[str] = None) -> int:
+        """대기 중인 요청 수 (name이 없으면 전체)"""
+        names = [name] if name else TRAFFIC_CLASSES
+        return sum(1 for n in names for waiter in self._waiters[n] if not waiter.done())
+
+    def push(self, name: str) -> asyncio.Future:
+        """name 클래스 대기열에 대기자를 추가하고, 슬롯을 넘겨받을 때 완료되는 Future를 반환합니다."""
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[name].append(waiter)
+        self._enqueued_at[waiter] = time.monotonic()
+        stats = self._stats[name]
+        stats["max_depth"] = max(stats["max_depth"], self.depth(name))
+        return waiter
+
+    def discard(self, waiter: asyncio.Future) -> None:
+        """취소/타임아웃된 대기자를 대기열에서 제거합니다."""
+        self._enqueued_at.pop(waiter, None)
+        for queue in self._waiters.values():
+            if waiter in queue:
+                queue.remove(waiter)
+                return
+
+    def record_immediate(self, name: str) -> None:
+        """대기 없이 바로 슬롯을 얻은 경우"""
+        self._stats[name]["granted"] += 1
+        self._stats[name]["waits"].append(0.0)
+
+    def grant_next(self) -> bool:
+        """
+        다음 대기자에게 슬롯을 넘깁니다.
+
+        Returns:
+            넘겨받은 대기자가 있으면 True
+        """
+        for queue in self._waiters.values():
+            while queue and queue[0].done():
+                self._enqueued_at.pop(queue.popleft(), None)
+        waiting = [name for name in TRAFFIC_CLASSES if self._waiters[name]]
+        if not waiting:
+            return False
+        if len(waiting) == 1:
+            name = waiting[0]
+        else:
+            # 둘 다 대기 중: batch가 최소 몫보다 적게 받았으면 batch, 아니면 interactive
+            total = sum(self._contended_grants.values()) + 1
+            name = (
+                "batch"
+                if self._contended_grants["batch"] < PRIORITY_BATCH_MIN_SHARE * total
+                else "interactive"
+            )
+            self._contended_grants[name] += 1
+        waiter = self._waiters[name].popleft()
+        waited = time.monotonic() - self._enqueued_at.pop(waiter, time.monotonic())
+        self._stats[name]["granted"] += 1
+        self._stats[name]["waits"].append(waited)
+        waiter.set_result(None)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        result = {}
+        for name in TRAFFIC_CLASSES:
+            stats = self._stats[name]
+            waits = sorted(stats["waits"])
+            result[name] = {
+                "queued": self.depth(name),
+                "max_depth": stats["max_depth"],
+                "granted": stats["granted"],
+                "contended_grants": self._contended_grants[name],
+                "wait_p50": round(waits[len(waits) // 2], 3) if waits else 0.0,
+                "wait_p95": (
+                    round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3)
+                    if waits
+                    else 0.0
+                ),
+            }
+        return result
@@ -43,5 +43,201 @@ PENSION_ANALYSIS_PROMPT = PromptTemplate(
 - JSON 외의 다른 텍스트나 설명은 절대 포함하지 않음
 - 입력된 모든 이미지의 맥락을 종합적으로 고려하여 분석
 - 각 항목은 단순한 나열이 아닌 '스토리'와 '맥락'을 포함하여 작성
-"""
+""",
 )
+
+# 3단계 분석 1단계: 관찰 및 1차 분석 (image_urls)
+STEP1_PROMPT = """
+당신은 공간 심리학자이자 경험 디자이너입니다. 
+제공된 펜션 이미지들을 관찰하여 기본적인 디자인 요소들을 파악해주세요.
+
+**1단계: 관찰 및 1차 분석**
+
+다음 이미지들을 자세히 관찰하세요:
+{image_urls}
+
+**관찰해야 할 요소들:**
+1. **색상 팔레트**: 주요 색상과 색상 조합
+2. **재료와 질감**: 나무, 돌, 금속, 직물 등의 재료 사용
+3. **공간 구성**: 방의 배치, 크기, 높이, 개방성
+4. **조명**: 자연광과 인공조명의 활용
+5. **가구와 소품**: 스타일, 배치, 브랜드 특성
+6. **외부 환경**: 창밖 풍경, 테라스, 정원 등
+
+**분석 결과를 다음 JSON 형식으로 제공해주세요:**
+{{
+    "color_palette": ["주요 색상 1", "주요 색상 2", "주요 색상 3"],
+    "materials": ["주요 재료 1", "주요 재료 2", "주요 재료 3"],
+    "spatial_layout": ["공간 구성 특징 1", "공간 구성 특징 2"],
+    "lighting": ["조명 특징 1", "조명 특징 2"],
+    "furniture_style": ["가구 스타일 1", "가구 스타일 2"],
+    "overall_impression": "전체적인 첫인상과 분위기",
+    "key_observations": ["핵심 관찰 사항 1", "핵심 관찰 사항 2", "핵심 관찰 사항 3"]
+}}
+
+JSON 형식으로만 응답해주세요.
+"""
+
+# 3단계 분석 2단계: 자기 검증 및 근거 도출 (step1_result)
+STEP2_PROMPT = """
+당신은 공간 심리학자이자 경험 디자이너입니다.
+1단계에서 관찰한 결과를 바탕으로 '왜?'라는 질문에 답하며 검증해주세요.
+
+**2단계: 자기 검증 및 근거 도출**
+
+**1단계 관찰 결과:**
+{step1_result}
+
+**검증해야 할 질문들:**
+1. **색상 선택의 이유**: 왜 이런 색상 조합을 선택했을까?
+2. **재료 선택의 이유**: 왜 이런 재료들을 사용했을까?
+3. **공간 구성의 이유**: 왜 이런 레이아웃을 만들었을까?
+4. **조명 설계의 이유**: 왜 이런 조명 방식을 선택했을까?
+5. **전체적인 의도**: 이 공간이 어떤 경험을 제공하려고 하는가?
+
+**검증 결과를 다음 JSON 형식으로 제공해주세요:**
+{{
+    "color_reasoning": "색상 선택의 심리적, 기능적 이유",
+    "material_reasoning": "재료 선택의 심리적, 기능적 이유",
+    "spatial_reasoning": "공간 구성의 심리적, 기능적 이유",
+    "lighting_reasoning": "조명 설계의 심리적, 기능적 이유",
+    "experience_intent": "이 공간이 제공하려는 경험의 의도",
+    "psychological_impact": "이 디자인이 사람들에게 미치는 심리적 영향",
+    "validation_insights": ["검증을 통해 발견한 통찰 1", "검증을 통해 발견한 통찰 2", "검증을 통해 발견한 통찰 3"]
+}}
+
+JSON 형식으로만 응답해주세요.
+"""
+
+# 3단계 분석 3단계: 최종 결과물 생성 (step1_result, step2_result)
+STEP3_PROMPT = """
+당신은 공간 심리학자이자 경험 디자이너입니다.
+1단계와 2단계의 분석 결과를 바탕으로 최종적인 펜션 스타일 분석 결과를 생성해주세요.
+
+**3단계: 최종 결과물 생성**
+
+**1단계 관찰 결과:**
+{step1_result}
+
+**2단계 검증 결과:**
+{step2_result}
+
+**최종 분석 결과를 다음 JSON 형식으로 제공해주세요:**
+{{
+    "core_style": ["핵심 스타일 1", "핵심 스타일 2", "핵심 스타일 3"],
+    "key_elements": ["주요 디자인 요소 1", "주요 디자인 요소 2", "주요 디자인 요소 3"],
+    "target_persona": ["적합한 고객 유형 1", "적합한 고객 유형 2", "적합한 고객 유형 3"],
+    "recommended_activities": ["추천 활동 1", "추천 활동 2", "추천 활동 3"],
+    "unsuitable_persona": ["부적합한 고객 유형 1", "부적합한 고객 유형 2"],
+    "confidence_score": 0.85,
+    "pablo_memo": "종합적인 분석 메모와 스토리"
+}}
+
+**분석 기준:**
+- **핵심 스타일**: 공간이 만들어내는 감정적 경험 중심
+- **주요 요소**: 각 디자인 요소가 유발하는 감정적 반응
+- **고객 유형**: 표면적 특징을 넘어 숨겨진 욕망까지 파악
+- **추천 활동**: 시간대별 구체적인 경험 시나리오
+- **신뢰도**: 분석의 확신 정도 (0.0~1.0)
+
+JSON 형식으로만 응답해주세요.
+"""
+
+# 단일 호출(fused) 모드: 관찰/검증/최종 분석을 한 번에 생성 (image_urls)
+FUSED_PROMPT = """
+당신은 공간 심리학자이자 경험 디자이너입니다.
+제공된 펜션 이미지들을 한 번에 분석하되, 아래 세 단계를 순서대로 생각하고 그 결과를 모두 제공해주세요.
+
+다음 이미지들을 자세히 관찰하세요:
+{image_urls}
+
+**1단계: 관찰 및 1차 분석 (observation)**
+색상 팔레트, 재료와 질감, 공간 구성, 조명, 가구와 소품, 외부 환경을 관찰합니다.
+
+**2단계: 자기 검증 및 근거 도출 (validation)**
+1단계 관찰 결과에 대해 '왜?'라는 질문에 답하며 색상/재료/공간/조명 선택의 이유와
+이 공간이 제공하려는 경험의 의도, 심리적 영향을 검증합니다.
+
+**3단계: 최종 결과물 생성 (analysis)**
+검증된 통찰력을 바탕으로 핵심 스타일, 주요 요소, 고객 유형(숨겨진 욕망 포함),
+시간대별 추천 활동, 부적합 고객, 신뢰도(0.0~1.0), 종합 메모를 작성합니다.
+
+**결과를 다음 JSON 형식으로 제공해주세요:**
+{{
+    "observation": {{
+        "color_palette": ["주요 색상 1", "주요 색상 2", "주요 색상 3"],
+        "materials": ["주요 재료 1", "주요 재료 2", "주요 재료 3"],
+        "spatial_layout": ["공간 구성 특징 1", "공간 구성 특징 2"],
+        "lighting": ["조명 특징 1", "조명 특징 2"],
+        "furniture_style": ["가구 스타일 1", "가구 스타일 2"],
+        "overall_impression": "전체적인 첫인상과 분위기",
+        "key_observations": ["핵심 관찰 사항 1", "핵심 관찰 사항 2", "핵심 관찰 사항 3"]
+    }},
+    "validation": {{
+        "color_reasoning": "색상 선택의 심리적, 기능적 이유",
+        "material_reasoning": "재료 선택의 심리적, 기능적 이유",
+        "spatial_reasoning": "공간 구성의 심리적, 기능적 이유",
+        "lighting_reasoning": "조명 설계의 심리적, 기능적 이유",
+        "experience_intent": "이 공간이 제공하려는 경험의 의도",
+        "psychological_impact": "이 디자인이 사람들에게 미치는 심리적 영향",
+        "validation_insights": ["검증을 통해 발견한 통찰 1", "검증을 통해 발견한 통찰 2", "검증을 통해 발견한 통찰 3"]
+    }},
+    "analysis": {{
+        "core_style": ["핵심 스타일 1", "핵심 스타일 2", "핵심 스타일 3"],
+        "key_elements": ["주요 디자인 요소 1", "주요 디자인 요소 2", "주요 디자인 요소 3"],
+        "target_persona": ["적합한 고객 유형 1", "적합한 고객 유형 2", "적합한 고객 유형 3"],
+        "recommended_activities": ["추천 활동 1", "추천 활동 2", "추천 활동 3"],
+        "unsuitable_persona": ["부적합한 고객 유형 1", "부적합한 고객 유형 2"],
+        "confidence_score": 0.85,
+        "pablo_memo": "종합적인 분석 메모와 스토리"
+    }}
+}}
+
+JSON 형식으로만 응답해주세요.
+"""
+
+# 증분 재분석: 이미지 세트가 조금 바뀌었을 때 이전 결과를 텍스트만으로 갱신
+# (previous_analysis, previous_observations, new_observations, removed_images)
+INCREMENTAL_UPDATE_PROMPT = """
+당신은 공간 심리학자이자 경험 디자이너입니다.
+같은 펜션의 이미지 세트가 조금 바뀌었습니다. 이전 분석 결과를 바탕으로 바뀐 부분만 반영하여 최종 분석 결과를 갱신해주세요.
+
+**이전 분석 결과:**
+{previous_analysis}
+
+**이전 이미지 관찰 결과:**
+{previous_observations}
+
+**새로 추가된 이미지의 관찰 결과:**
+{new_observations}
+
+**제외된 이미지:**
+{removed_images}
+
+**갱신 기준:**
+- 새로 추가된 이미지에서 드러난 요소는 반영하고, 제외된 이미지에만 근거한 내용은 줄이거나 제거
+- 바뀌지 않은 부분은 이전 분석의 표현을 그대로 유지
+- 신뢰도(confidence_score)는 변경 폭을 고려하여 조정
+
+**갱신된 분석 결과를 다음 JSON 형식으로 제공해주세요:**
+{{
+    "core_style": ["핵심 스타일 1", "핵심 스타일 2", "핵심 스타일 3"],
+    "key_elements": ["주요 디자인 요소 1", "주요 디자인 요소 2", "주요 디자인 요소 3"],
+    "target_persona": ["적합한 고객 유형 1", "적합한 고객 유형 2", "적합한 고객 유형 3"],
+    "recommended_activities": ["추천 활동 1", "추천 활동 2", "추천 활동 3"],
+    "unsuitable_persona": ["부적합한 고객 유형 1", "부적합한 고객 유형 2"],
+    "confidence_score": 0.85,
+    "pablo_memo": "종합적인 분석 메모와 스토리"
+}}
+
+JSON 형식으로만 응답해주세요.
+"""
+
+# 단계 이름 → 프롬프트 템플릿 (메모이제이션 키의 프롬프트 버전 계산에 사용)
+STEP_PROMPTS = {
+    "step1": STEP1_PROMPT,
+    "step2": STEP2_PROMPT,
+    "step3": STEP3_PROMPT,
+    "fused": FUSED_PROMPT,
+    "incremental": INCREMENTAL_UPDATE_PROMPT,
+}
@@ -1,37 +1,41 @@
 from pydantic import BaseModel, Field, validator
-from typing import List
+from typing import Any, Dict, List, Literal, Optional
 import re
 import logging
 
 logger = logging.getLogger(__name__)
 
+
 class AnalysisRequest(BaseModel):
     """펜션 스타일 분석 요청 모델"""
+
     image_urls: List[str]
-    
-    @validator('image_urls')
+    # 출력 모드: "prompt"(프롬프트 지시만) 또는 "structured"(JSON 스키마 강제). 미지정 시 서버 기본값
+    output_mode: Optional[Literal["prompt", "structured"]] = None
+
+    @validator("image_urls")
     def validate_image_urls(cls, v):
         """이미지 URL 유효성 검증 - HTTP/HTTPS URL만 허용"""
         if not v or len(v) == 0:
             raise ValueError("이미지 URL이 비어있습니다")
         if len(v) > 10:
             raise ValueError("이미지는 최대 10개까지 허용됩니다")
-            
-        logger.info(f"URL 검증 시작: {len(v)}개 URL")
+
         for i, url in enumerate(v):
-            logger.info(f"URL {i+1}: {url[:100]}...")  # URL의 처음 100자만 로깅
-            
             # HTTP/HTTPS URL만 허용
-            if not url.startswith(('http://', 'https://')):
+            if not url.startswith(("http://", "https://")):
                 logger.error(f"Invalid URL format at index {i}: {url[:100]}...")
-                raise ValueError(f"Invalid URL format at index {i}: HTTP/HTTPS URL만 허용됩니다")
-                
-        logger.info("URL 검증 완료")
+                raise ValueError(
+                    f"Invalid URL format at index {i}: HTTP/HTTPS URL만 허용됩니다"
+                )
+
+        logger.debug(f"URL 검증 완료: {len(v)}개 URL")
         return v
 
 
 class PensionAnalysis(BaseModel):
     """펜션 스타일 분석 결과 모델"""
+
     core_style: List[str]
     key_elements: List[str]
     target_persona: List[str]
@@ -39,8 +43,8 @@ class PensionAnalysis(BaseModel):
     unsuitable_persona: List[str]
     confidence_score: float
     pablo_memo: str
-    
-    @validator('confidence_score')
+
+    @validator("confidence_score")
     def validate_confidence_score(cls, v):
         """신뢰도 점수 검증"""
         if not 0.0 <= v <= 1.0:
@@ -48,7 +52,47 @@ class PensionAnalysis(BaseModel):
         return round(v, 2)
 
 
+class PensionAnalysisResponse(PensionAnalysis):
+    """분석 API 응답 모델 - 분석 결과 + 처리 정보(meta)"""
+
+    # 예: {"analysis_path": "full" | "cache" | "incremental", "image_preprocess": {"bytes_saved": ...}}
+    meta: Dict[str, Any] = Field(default_factory=dict)
+
+
+class Step1Observation(BaseModel):
+    """1단계(관찰 및 1차 분석) 결과 모델"""
+
+    color_palette: List[str]
+    materials: List[str]
+    spatial_layout: List[str]
+    lighting: List[str]
+    furniture_style: List[str]
+    overall_impression: str
+    key_observations: List[str]
+
+
+class Step2Validation(BaseModel):
+    """2단계(자기 검증 및 근거 도출) 결과 모델"""
+
+    color_reasoning: str
+    material_reasoning: str
+    spatial_reasoning: str
+    lighting_reasoning: str
+    experience_intent: str
+    psychological_impact: str
+    validation_insights: List[str]
+
+
+class FusedAnalysis(BaseModel):
+    """단일 호출(fused) 모드 결과 모델 - 관찰/검증/최종 분석을 한 번의 비전 호출로 생성"""
+
+    observation: Step1Observation
+    validation: Step2Validation
+    analysis: PensionAnalysis
+
+
 class ErrorResponse(BaseModel):
     """에러 응답 모델"""
+
     error: str
     original_content_length: int
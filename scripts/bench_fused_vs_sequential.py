@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+fused vs sequential 파이프라인 벤치마크
+
+같은 이미지 세트에 대해 3단계 순차 호출(analyze_step1 → 2 → 3)과
+단일 호출(analyze_fused)의 전체 지연 시간과 토큰 사용량을 비교합니다.
+실제 OpenAI API를 호출하므로 OPENAI_API_KEY가 필요합니다.
+
+매 실행이 실제로 업스트림을 호출하도록 단계별 결과 메모이제이션(STEP_MEMO_ENABLED)을 끄고,
+동일 요청 합치기(SingleFlight)를 거치지 않는 내부 함수(_analyze_step1/2/3, _analyze_fused)를 직접 호출합니다.
+
+사용법:
+    python scripts/bench_fused_vs_sequential.py --image https://.../1.jpg --image https://.../2.jpg --runs 3
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+import main as api  # noqa: E402
+from chain import get_output_mode_stats  # noqa: E402
+from main import (
+    _analyze_fused,
+    _analyze_step1,
+    _analyze_step2,
+    _analyze_step3,
+)  # noqa: E402
+
+# 메모이제이션 결과(메모리/디스크)를 재사용하면 두 번째 실행부터 업스트림 호출 없이 끝나므로 끔
+api.STEP_MEMO_ENABLED = False
+
+
+def _token_totals(output_mode):
+    stats = get_output_mode_stats().get(f"steps:{output_mode}", {})
+    return (
+        stats.get("input_tokens", 0),
+        stats.get("output_tokens", 0),
+        stats.get("calls", 0),
+    )
+
+
+async def run_sequential(image_urls, output_mode):
+    step1 = await _analyze_step1(image_urls, output_mode)
+    if step1 is None:
+        return False
+    step2 = await _analyze_step2(image_urls, step1, output_mode)
+    if step2 is None:
+        return False
+    return await _analyze_step3(image_urls, step1, step2, output_mode) is not None
+
+
+async def run_fused(image_urls, output_mode):
+    return await _analyze_fused(image_urls, output_mode) is not None
+
+
+async def measure(name, runner, image_urls, output_mode, runs):
+    latencies = []
+    successes = 0
+    before = _token_totals(output_mode)
+    for _ in range(runs):
+        start = time.perf_counter()
+        successes += bool(await runner(image_urls, output_mode))
+        latencies.append(time.perf_counter() - start)
+    after = _token_totals(output_mode)
+    return {
+        "name": name,
+        "success": f"{successes}/{runs}",
+        "p50": statistics.median(latencies),
+        "max": max(latencies),
+        "input_tokens": (after[0] - before[0]) / runs,
+        "output_tokens": (after[1] - before[1]) / runs,
+        "calls": (after[2] - before[2]) / runs,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="fused vs sequential 파이프라인 벤치마크"
+    )
+    parser.add_argument(
+        "--image",
+        action="append",
+        required=True,
+        help="분석할 이미지 URL (여러 번 지정 가능)",
+    )
+    parser.add_argument("--runs", type=int, default=3, help="모드별 실행 횟수")
+    parser.add_argument(
+        "--output-mode", choices=["prompt", "structured"], default="structured"
+    )
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("❌ OPENAI_API_KEY가 설정되지 않았습니다.")
+        sys.exit(1)
+
+    print(
+        f"🖼️  이미지 {len(args.image)}개, 모드별 {args.runs}회 실행 (output_mode={args.output_mode})"
+    )
+    results = [
+        await measure(
+            "sequential", run_sequential, args.image, args.output_mode, args.runs
+        ),
+        await measure("fused", run_fused, args.image, args.output_mode, args.runs),
+    ]
+
+    print(
+        f"{'mode':<12}{'success':>9}{'p50 s':>9}{'max s':>9}{'calls':>7}{'in tok':>10}{'out tok':>10}"
+    )
+    print("-" * 66)
+    for r in results:
+        print(
+            f"{r['name']:<12}{r['success']:>9}{r['p50']:>9.2f}{r['max']:>9.2f}{r['calls']:>7.1f}"
+            f"{r['input_tokens']:>10.0f}{r['output_tokens']:>10.0f}"
+        )
+
+    sequential, fused = results
+    if sequential["input_tokens"]:
+        saved = 1 - fused["input_tokens"] / sequential["input_tokens"]
+        print(
+            f"📉 입력 토큰 절감: {saved * 100:.1f}%, p50 지연 비율: {fused['p50'] / sequential['p50']:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+모자이크 패킹 vs 개별 이미지 벤치마크
+
+같은 이미지 세트에 대해 이미지를 개별 파트로 보내는 경우(전처리만)와
+격자 모자이크로 묶어 보내는 경우(패킹)의 토큰 사용량, 지연 시간,
+그리고 결과 PensionAnalysis 필드가 얼마나 겹치는지를 비교합니다.
+실제 OpenAI API를 호출하므로 OPENAI_API_KEY가 필요합니다.
+
+사용법:
+    python scripts/bench_image_packing.py --image https://.../1.jpg --image https://.../2.jpg --runs 3
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+import images  # noqa: E402
+from chain import (
+    analyze_pension_style_with_retry_async,
+    get_output_mode_stats,
+)  # noqa: E402
+
+LIST_FIELDS = [
+    "core_style",
+    "key_elements",
+    "target_persona",
+    "recommended_activities",
+    "unsuitable_persona",
+]
+
+
+def _token_totals(output_mode):
+    stats = get_output_mode_stats().get(f"chain:{output_mode}", {})
+    return stats.get("input_tokens", 0), stats.get("output_tokens", 0)
+
+
+def _jaccard(a, b):
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+async def measure(name, packing, image_urls, output_mode, runs):
+    # 모듈 설정을 바꿔 같은 프로세스에서 두 모드를 번갈아 실행 (캐시 키에도 반영됨)
+    images.IMAGE_PREPROCESS_ENABLED = True
+    images.IMAGE_PACKING_ENABLED = packing
+
+    latencies = []
+    results = []
+    reports = []
+    before = _token_totals(output_mode)
+    for _ in range(runs):
+        meta = {}
+        start = time.perf_counter()
+        result, _ = await analyze_pension_style_with_retry_async(
+            image_urls,
+            max_retries=1,
+            use_cache=False,
+            output_mode=output_mode,
+            meta=meta,
+        )
+        latencies.append(time.perf_counter() - start)
+        results.append(result)
+        reports.append(meta.get("image_preprocess", {}))
+    after = _token_totals(output_mode)
+
+    packing_report = reports[-1].get("packing", {})
+    return {
+        "name": name,
+        "p50": statistics.median(latencies),
+        "max": max(latencies),
+        "input_tokens": (after[0] - before[0]) / runs,
+        "output_tokens": (after[1] - before[1]) / runs,
+        "image_parts": (
+            packing_report.get("mosaics", 0) + packing_report.get("separate_images", 0)
+            if packing
+            else len(image_urls)
+        ),
+        "results": results,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="모자이크 패킹 vs 개별 이미지 벤치마크"
+    )
+    parser.add_argument(
+        "--image",
+        action="append",
+        required=True,
+        help="분석할 이미지 URL (여러 번 지정 가능)",
+    )
+    parser.add_argument("--runs", type=int, default=3, help="모드별 실행 횟수")
+    parser.add_argument(
+        "--output-mode", choices=["prompt", "structured"], default="structured"
+    )
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("❌ OPENAI_API_KEY가 설정되지 않았습니다.")
+        sys.exit(1)
+
+    print(
+        f"🖼️  이미지 {len(args.image)}개, 모드별 {args.runs}회 실행 "
+        f"(grid={images.IMAGE_PACK_GRID}, tile={images.IMAGE_PACK_TILE}, detail={images.IMAGE_DETAIL})"
+    )
+    unpacked = await measure("unpacked", False, args.image, args.output_mode, args.runs)
+    packed = await measure("packed", True, args.image, args.output_mode, args.runs)
+
+    print(
+        f"{'mode':<10}{'parts':>7}{'p50 s':>9}{'max s':>9}{'in tok':>10}{'out tok':>10}"
+    )
+    print("-" * 55)
+    for r in (unpacked, packed):
+        print(
+            f"{r['name']:<10}{r['image_parts']:>7}{r['p50']:>9.2f}{r['max']:>9.2f}"
+            f"{r['input_tokens']:>10.0f}{r['output_tokens']:>10.0f}"
+        )
+
+    if unpacked["input_tokens"]:
+        saved = 1 - packed["input_tokens"] / unpacked["input_tokens"]
+        print(
+            f"📉 입력 토큰 절감: {saved * 100:.1f}%, p50 지연 비율: {packed['p50'] / unpacked['p50']:.2f}x"
+        )
+
+    # 결과 필드 비교 (각 모드의 마지막 실행 결과 기준)
+    a, b = unpacked["results"][-1], packed["results"][-1]
+    if a is None or b is None:
+        print("⚠️  분석 결과가 없어 필드 비교를 건너뜁니다.")
+        return
+    print("\n🔍 결과 필드 겹침 (Jaccard)")
+    for field in LIST_FIELDS:
+        print(f"  {field:<24}{_jaccard(getattr(a, field), getattr(b, field)):.2f}")
+    print(
+        f"  {'confidence_score':<24}{a.confidence_score:.2f} → {b.confidence_score:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+JSON 추출 마이크로 벤치마크
+
+기존 정규식 캐스케이드(extract_json_from_text 구버전)와 단일 패스 스캐너
+(json_stream.extract_first_json_object)를 실제로 관찰된 형태의 깨진 LLM 응답과
+--size 문자(기본 10만 자) 크기의 병적인 입력에서 비교합니다.
+
+사용법:
+    python scripts/bench_json_extract.py [--size 100000] [--repeat 5]
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from json_stream import extract_first_json_object  # noqa: E402
+
+SAMPLE = {
+    "core_style": ["도시의 번잡함에서 벗어나 마음의 여백을 찾는 모던 미니멀"],
+    "key_elements": ["자연의 따뜻함을 전하는 원목 가구", "개방감을 주는 {대형} 창문"],
+    "target_persona": ["프라이빗한 휴식을 갈망하는 20-30대 커플"],
+    "recommended_activities": ["아침: 통창 앞에서 커피 마시기"],
+    "unsuitable_persona": ["파티를 원하는 단체 고객"],
+    "confidence_score": 0.85,
+    "pablo_memo": '이 펜션은 "쉼"이라는 단어가 가장 잘 어울리는 공간입니다.',
+}
+
+
+def legacy_extract(text):
+    """정규식 캐스케이드 기반 구버전 구현 (로깅 제외, 동작 동일)"""
+    if not text:
+        return None
+    patterns = [
+        r"```(?:json)?\s*(\{.*?\})\s*```",
+        r"\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}",
+        r"\{.*?\}",
+    ]
+    for pattern in patterns:
+        for match in re.findall(pattern, text, re.DOTALL):
+            try:
+                json_str = match if isinstance(match, str) else match[0]
+                return json.loads(json_str.strip())
+            except (json.JSONDecodeError, IndexError, AttributeError):
+                continue
+    try:
+        start = text.find("{")
+        end = text.rfind("}")
+        if start != -1 and end > start:
+            return json.loads(text[start : end + 1])
+    except json.JSONDecodeError:
+        pass
+    try:
+        modified_text = text.strip()
+        if "```" in modified_text:
+            start = modified_text.find("```")
+            end = modified_text.rfind("```")
+            if start != -1 and end > start:
+                modified_text = modified_text[start + 3 : end].strip()
+                if modified_text.startswith("json"):
+                    modified_text = modified_text[4:].strip()
+        start = modified_text.find("{")
+        end = modified_text.rfind("}")
+        if start != -1 and end > start:
+            json_str = modified_text[start : end + 1]
+            json_str = json_str.replace("\n", " ").replace("\r", " ")
+            json_str = re.sub(r"\s+", " ", json_str)
+            return json.loads(json_str)
+    except json.JSONDecodeError:
+        pass
+    return None
+
+
+def build_corpus(size):
+    """실제 응답에서 관찰된 유형별 입력 생성"""
+    pretty = json.dumps(SAMPLE, ensure_ascii=False, indent=2)
+    raw_newline = pretty.replace(
+        "공간입니다.", "공간입니다.\n줄바꿈이 그대로 들어간 메모"
+    )
+    sentence = "분석 중 참고한 세부 관찰 내용입니다. "
+    filler = (sentence * (size // len(sentence) + 1))[:size]
+    open_brace = '{"key": "값", '
+    return {
+        "clean": pretty,
+        "prose_wrapped": f"분석 결과는 다음과 같습니다.\n{pretty}\n추가 설명이 필요하면 말씀해주세요.",
+        "fenced": f"```json\n{pretty}\n```",
+        "raw_newline_in_string": f"```json\n{raw_newline}\n```",
+        "trailing_commentary_braces": f"{pretty}\n참고: {{예시}} 형식은 무시하세요.",
+        "no_json": "죄송하지만 이미지를 확인할 수 없습니다. " * 20,
+        "long_memo_100k": json.dumps(
+            {**SAMPLE, "pablo_memo": filler}, ensure_ascii=False
+        ),
+        "prose_100k_then_json": filler + pretty,
+        "unclosed_100k": "{" + filler,
+        "unclosed_100k_then_json": "{" + filler + "\n" + pretty,
+        "many_open_braces_100k": (open_brace * (size // len(open_brace) + 1))[:size],
+    }
+
+
+def bench(func, text, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON 추출 마이크로 벤치마크")
+    parser.add_argument(
+        "--size", type=int, default=100_000, help="병적인 입력 크기 (문자 수)"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="반복 횟수 (최솟값 기록)")
+    parser.add_argument(
+        "--legacy-repeat",
+        type=int,
+        default=1,
+        help="구버전 반복 횟수 (느린 케이스 대비)",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'case':<28}{'chars':>9}{'legacy ms':>12}{'scanner ms':>12}{'speedup':>10}  same"
+    )
+    print("-" * 80)
+    for name, text in build_corpus(args.size).items():
+        legacy_time, legacy_result = bench(legacy_extract, text, args.legacy_repeat)
+        new_time, new_result = bench(extract_first_json_object, text, args.repeat)
+        speedup = legacy_time / new_time if new_time else float("inf")
+        same = "yes" if legacy_result == new_result else "no"
+        print(
+            f"{name:<28}{len(text):>9}{legacy_time * 1000:>12.2f}{new_time * 1000:>12.3f}{speedup:>9.1f}x  {same}"
+        )
+
+
+if __name__ == "__main__":
+    main()
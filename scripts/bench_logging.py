@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+로깅 오버헤드 벤치마크
+
+분석 요청 한 건이 남기는 것과 비슷한 로그(이미지 URL별 로그, data URL이 포함된 긴 원본 응답)를
+기존 방식(logging.basicConfig + 동기 StreamHandler)과
+큐 기반 파이프라인(log_pipeline.setup_logging)으로 같은 로그 레벨에서 각각 남기면서
+요청 스레드에서 소요되는 시간을 비교합니다. 출력은 모두 os.devnull로 보냅니다.
+
+파이프라인은 마스킹/JSON 포맷팅을 리스너 스레드로 옮길 뿐 총 작업량을 줄이지 않으며,
+리스너 스레드가 GIL을 나눠 쓰므로 평균보다 꼬리 지연(p99)을 함께 확인해야 합니다.
+
+사용법:
+    python scripts/bench_logging.py --requests 2000 --images 5
+"""
+
+import argparse
+import base64
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import log_pipeline  # noqa: E402
+
+
+def simulate_request(images, raw_body):
+    """요청 한 건 동안 main.py / chain.py / schemas.py가 남기는 로그를 흉내냅니다."""
+    main_logger = logging.getLogger("main")
+    chain_logger = logging.getLogger("chain")
+    schemas_logger = logging.getLogger("schemas")
+
+    main_logger.info(f"펜션 스타일 분석 요청 받음: {len(images)}개 이미지")
+    for i, url in enumerate(images):
+        main_logger.debug(f"이미지 URL {i + 1}: {url}")
+        schemas_logger.debug(f"검증 중인 URL: {url}")
+    chain_logger.debug(f"원본 응답: {raw_body}")
+    chain_logger.info("분석 완료")
+
+
+def measure(name, images, raw_body, requests):
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        simulate_request(images, raw_body)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "name": name,
+        "mean_us": statistics.mean(latencies) * 1e6,
+        "p50_us": latencies[len(latencies) // 2] * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99) - 1] * 1e6,
+    }
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로깅 오버헤드 벤치마크")
+    parser.add_argument("--requests", type=int, default=2000, help="모드별 요청 수")
+    parser.add_argument("--images", type=int, default=5, help="요청당 이미지 수")
+    parser.add_argument(
+        "--level", default="DEBUG", help="두 방식에 공통으로 적용할 로그 레벨"
+    )
+    args = parser.parse_args()
+
+    images = [f"https://example.com/pension/{i}.jpg" for i in range(args.images)]
+    data_url = "data:image/jpeg;base64," + base64.b64encode(os.urandom(48_000)).decode()
+    raw_body = f'{{"core_style": ["모던"], "preview": "{data_url}"}}'
+
+    with open(os.devnull, "w") as devnull:
+        reset_root()
+        logging.basicConfig(level=args.level.upper(), stream=devnull, force=True)
+        baseline = measure("basicConfig", images, raw_body, args.requests)
+
+        reset_root()
+        log_pipeline.setup_logging("bench", level=args.level, stream=devnull)
+        pipeline = measure("pipeline", images, raw_body, args.requests)
+        log_pipeline.shutdown_logging()
+
+    print(
+        f"요청 {args.requests}건, 요청당 이미지 {args.images}개, 원본 응답 {len(raw_body):,}자, 레벨 {args.level.upper()}"
+    )
+    print(f"{'mode':<14}{'mean µs':>10}{'p50 µs':>10}{'p99 µs':>10}")
+    print("-" * 44)
+    for r in (baseline, pipeline):
+        print(
+            f"{r['name']:<14}{r['mean_us']:>10.1f}{r['p50_us']:>10.1f}{r['p99_us']:>10.1f}"
+        )
+    # 1보다 크면 파이프라인이 빠름, 작으면 느림
+    print(
+        f"basicConfig 대비 속도: 평균 {baseline['mean_us'] / pipeline['mean_us']:.2f}x, "
+        f"p99 {baseline['p99_us'] / pipeline['p99_us']:.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+대량 펜션 재분석 CLI
+
+JSONL 매니페스트({"pension_id": ..., "image_urls": [...]}를 한 줄에 하나)를 읽어
+chain.py의 비동기 분석 경로로 펜션들을 분석하고, 결과와 원본 응답을 JSONL 또는 SQLite 싱크에 기록합니다.
+(캐시 적중으로 얻은 결과는 원본 응답이 없어 raw가 비어 있습니다.)
+
+- 동시 실행 수(--concurrency)와 초당 시작 수(--rate)로 업스트림 부하를 제한
+- 항목이 끝날 때마다 싱크에 바로 기록하며, 싱크가 체크포인트 역할을 함:
+  다시 실행하면 이미 성공(status=ok)한 pension_id는 건너뛰고 나머지만 분석
+- 업스트림 오류나 fallback 응답은 지수 백오프로 재시도하고, 끝까지 실패하면 status=failed로 기록
+- 마지막에 처리량, 오류/재시도 수, 지연 시간, 토큰 사용량을 출력
+- 모든 분석은 batch 트래픽으로 분류되어, 업스트림 슬롯을 대화형 요청보다 나중에(최소 몫은 보장) 얻음
+
+사용법:
+    python scripts/bulk_analyze.py manifest.jsonl --output results.sqlite --concurrency 4 --rate 2
+    python scripts/bulk_analyze.py manifest.jsonl --output results.jsonl   # 중단 후 같은 명령으로 재개
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dotenv import load_dotenv  # noqa: E402
+from pydantic import ValidationError  # noqa: E402
+
+load_dotenv()
+
+from chain import (  # noqa: E402
+    CACHEABLE_TIERS,
+    analyze_pension_style_with_retry_async,
+    get_output_mode_stats,
+    resolve_output_mode,
+)
+from clients import close_clients  # noqa: E402
+from log_pipeline import setup_logging  # noqa: E402
+from priority import traffic_class  # noqa: E402
+from schemas import AnalysisRequest  # noqa: E402
+
+
+class JSONLSink:
+    """결과를 JSONL 파일에 추가합니다. 같은 pension_id는 나중 줄이 우선합니다."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "a", encoding="utf-8")
+
+    def completed_ids(self):
+        status = {}
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 중단 시점에 잘린 마지막 줄
+                    continue
+                status[record["pension_id"]] = record["status"]
+        return {pension_id for pension_id, s in status.items() if s == "ok"}
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+class SQLiteSink:
+    """결과를 SQLite results 테이블에 pension_id 기준으로 덮어씁니다."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "pension_id TEXT PRIMARY KEY, status TEXT, attempts INTEGER, elapsed REAL, "
+            "result TEXT, raw TEXT, meta TEXT, error TEXT, finished_at TEXT)"
+        )
+        self.conn.commit()
+
+    def completed_ids(self):
+        return {
+            row[0]
+            for row in self.conn.execute(
+                "SELECT pension_id FROM results WHERE status = 'ok'"
+            )
+        }
+
+    def write(self, record):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                record["pension_id"],
+                record["status"],
+                record["attempts"],
+                record["elapsed"],
+                (
+                    json.dumps(record["result"], ensure_ascii=False)
+                    if record["result"] is not None
+                    else None
+                ),
+                record["raw"],
+                json.dumps(record["meta"], ensure_ascii=False),
+                record["error"],
+                record["finished_at"],
+            ),
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def open_sink(path):
+    if path.endswith((".sqlite", ".sqlite3", ".db")):
+        return SQLiteSink(path)
+    return JSONLSink(path)
+
+
+class RateLimiter:
+    """분석 시작 간격을 1/rate초 이상으로 유지합니다 (rate가 0이면 제한 없음)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_start = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_start - now
+            self.next_start = max(now, self.next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def token_usage():
+    """호출 경로별 (입력, 출력) 누적 토큰 수 (상위 모델 chain:*과 캐스케이드 cascade:* 등 모든 경로)"""
+    return {
+        key: (stats.get("input_tokens", 0), stats.get("output_tokens", 0))
+        for key, stats in get_output_mode_stats().items()
+    }
+
+
+def read_manifest(path, completed, stats):
+    """매니페스트에서 아직 성공하지 않은 항목만 골라 반환합니다."""
+    items = []
+    seen = set()
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                pension_id = str(entry["pension_id"])
+                request = AnalysisRequest(image_urls=entry["image_urls"])
+            except ValidationError as e:
+                print(f"⚠️  매니페스트 {line_no}번째 줄 건너뜀: {e.errors()[0]['msg']}")
+                stats["invalid"] += 1
+                continue
+            except (ValueError, KeyError, TypeError) as e:
+                print(
+                    f"⚠️  매니페스트 {line_no}번째 줄 건너뜀: {type(e).__name__}: {e}"
+                )
+                stats["invalid"] += 1
+                continue
+            if pension_id in seen:
+                stats["duplicate"] += 1
+                continue
+            seen.add(pension_id)
+            if pension_id in completed:
+                stats["skipped"] += 1
+                continue
+            items.append((pension_id, request.image_urls))
+    return items
+
+
+async def analyze_item(pension_id, image_urls, args, limiter, stats):
+    """한 펜션을 분석하고, 정상 결과를 얻을 때까지 백오프하며 재시도합니다."""
+    start = time.perf_counter()
+    result, raw, meta, error = None, None, {}, None
+    attempt = 0
+    for attempt in range(1, args.max_retries + 2):
+        if attempt > 1:
+            stats["retries"] += 1
+            await asyncio.sleep(
+                min(args.backoff * 2 ** (attempt - 2), 60) * random.uniform(0.5, 1.5)
+            )
+        await limiter.wait()
+        meta = {}
+        try:
+            result, raw = await analyze_pension_style_with_retry_async(
+                image_urls,
+                max_retries=1,
+                use_cache=args.use_cache,
+                output_mode=args.output_mode,
+                meta=meta,
+            )
+        except Exception as e:
+            result, error = None, str(e)
+            continue
+        # 캐시 적중 또는 파서/JSON 추출로 얻은 결과만 성공으로 간주 (fallback 응답은 재시도)
+        if (
+            meta.get("analysis_path") == "cache"
+            or meta.get("recovery_tier") in CACHEABLE_TIERS
+        ):
+            error = None
+            break
+        error = f"recovery_tier={meta.get('recovery_tier')}"
+
+    elapsed = time.perf_counter() - start
+    status = "failed" if error else "ok"
+    stats[status] += 1
+    if status == "ok":
+        stats["latencies"].append(elapsed)
+    return {
+        "pension_id": pension_id,
+        "status": status,
+        "attempts": attempt,
+        "elapsed": round(elapsed, 3),
+        "result": result.model_dump() if result is not None else None,
+        "raw": raw,
+        "meta": meta,
+        "error": error,
+        "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+async def run(args):
+    traffic_class.set("batch")
+    sink = open_sink(args.output)
+    stats = {
+        "invalid": 0,
+        "duplicate": 0,
+        "skipped": 0,
+        "ok": 0,
+        "failed": 0,
+        "retries": 0,
+        "latencies": [],
+    }
+    items = read_manifest(args.manifest, sink.completed_ids(), stats)
+    if args.limit:
+        items = items[: args.limit]
+    print(
+        f"📋 분석 대상 {len(items)}개 (이미 완료 {stats['skipped']}개 건너뜀), "
+        f"동시 {args.concurrency}개, 초당 {args.rate or '무제한'}건"
+    )
+
+    queue = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+    limiter = RateLimiter(args.rate)
+    tokens_before = token_usage()
+    start = time.perf_counter()
+
+    async def worker():
+        while True:
+            try:
+                pension_id, image_urls = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            record = await analyze_item(pension_id, image_urls, args, limiter, stats)
+            sink.write(record)
+            done = stats["ok"] + stats["failed"]
+            if done % args.progress_every == 0 or done == len(items):
+                print(f"  ... {done}/{len(items)} 완료 (실패 {stats['failed']}개)")
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    finally:
+        sink.close()
+        await close_clients()
+
+    elapsed = time.perf_counter() - start
+    tokens_after = token_usage()
+    latencies = sorted(stats["latencies"])
+    processed = stats["ok"] + stats["failed"]
+
+    print("\n📊 결과")
+    print(
+        f"  성공 {stats['ok']}개, 실패 {stats['failed']}개, 재시도 {stats['retries']}회, "
+        f"건너뜀 {stats['skipped']}개, 잘못된 줄 {stats['invalid']}개, 중복 {stats['duplicate']}개"
+    )
+    print(
+        f"  소요 {elapsed:.1f}s, 처리량 {processed / elapsed * 60 if elapsed else 0:.1f}건/분"
+    )
+    if latencies:
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"  지연 p50 {statistics.median(latencies):.2f}s, p95 {p95:.2f}s")
+    used = {
+        key: (
+            after[0] - tokens_before.get(key, (0, 0))[0],
+            after[1] - tokens_before.get(key, (0, 0))[1],
+        )
+        for key, after in tokens_after.items()
+    }
+    print(
+        f"  토큰: 입력 {sum(u[0] for u in used.values())}, 출력 {sum(u[1] for u in used.values())}"
+    )
+    for key, (input_tokens, output_tokens) in sorted(used.items()):
+        if input_tokens or output_tokens:
+            print(f"    {key}: 입력 {input_tokens}, 출력 {output_tokens}")
+    return 1 if stats["failed"] else 0
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"1 이상이어야 합니다: {value}")
+    return number
+
+
+def non_negative_int(value):
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"0 이상이어야 합니다: {value}")
+    return number
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="JSONL 매니페스트 기반 대량 펜션 분석 (중단 후 재개 가능)"
+    )
+    parser.add_argument("manifest", help='{"pension_id", "image_urls"} JSONL 파일')
+    parser.add_argument(
+        "--output", required=True, help="결과 싱크 (.jsonl 또는 .sqlite/.db)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=positive_int,
+        default=4,
+        help="동시 분석 수 (chain의 ANALYSIS_MAX_CONCURRENCY도 적용됨)",
+    )
+    parser.add_argument(
+        "--rate", type=float, default=0, help="초당 분석 시작 수 (0이면 제한 없음)"
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=non_negative_int,
+        default=2,
+        help="항목별 추가 재시도 횟수",
+    )
+    parser.add_argument(
+        "--backoff",
+        type=float,
+        default=2.0,
+        help="첫 재시도 대기 시간(초), 이후 2배씩 증가",
+    )
+    parser.add_argument("--output-mode", choices=["prompt", "structured"], default=None)
+    parser.add_argument(
+        "--use-cache",
+        action="store_true",
+        help="분석 결과 캐시 사용 (기본값: 항상 새로 분석)",
+    )
+    parser.add_argument(
+        "--limit",
+        type=non_negative_int,
+        default=0,
+        help="이번 실행에서 처리할 최대 항목 수 (0이면 전체)",
+    )
+    parser.add_argument(
+        "--progress-every",
+        type=positive_int,
+        default=20,
+        help="진행 상황 출력 간격 (항목 수)",
+    )
+    args = parser.parse_args()
+    args.output_mode = resolve_output_mode(args.output_mode)
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("❌ OPENAI_API_KEY가 설정되지 않았습니다.")
+        sys.exit(1)
+
+    setup_logging("bulk-analyze", level=os.getenv("LOG_LEVEL", "WARNING"))
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
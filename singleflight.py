@@ -0,0 +1,95 @@
+"""
+동일 요청 합치기 (single-flight)
+
+같은 키로 동시에 들어온 요청들이 하나의 업스트림 호출(Task)을 공유하도록 합니다.
+먼저 들어온 요청이 호출을 시작하고, 늦게 들어온 요청은 진행 중인 호출의 결과를 기다립니다.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from deadline import (
+    RequestDeadline,
+    current_deadline,
+    run_with_deadline,
+    share_deadline,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """진행 중인 공유 호출 하나 (Task, 결과를 기다리는 요청 수, 공유 마감 정보)"""
+
+    def __init__(self, task: asyncio.Task, deadline: Optional[RequestDeadline]):
+        self.task = task
+        self.waiters = 0
+        self.deadline = deadline
+
+
+class SingleFlight:
+    """
+    키별 진행 중 호출 레지스트리
+
+    - 모든 대기자가 같은 결과(또는 같은 예외)를 받습니다.
+    - 한 대기자가 취소되어도 다른 대기자가 남아 있으면 호출은 계속됩니다.
+    - 마지막 대기자까지 취소되면 업스트림 호출도 취소합니다.
+    - 공유 호출의 마감 시각은 대기자 중 가장 늦은 요청 마감을 따릅니다.
+    - 대기자 수는 호출 객체별로 세므로, 끝난 호출의 대기자가 같은 키로 새로 시작된 호출에 영향을 주지 않습니다.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, _Call] = {}
+        self._counters = {"leaders": 0, "coalesced": 0, "abandoned": 0}
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        key에 해당하는 호출이 진행 중이면 그 결과를 기다리고, 없으면 factory()로 시작합니다.
+
+        Args:
+            key: 요청의 정규화된 키
+            factory: 업스트림 호출 코루틴을 만드는 함수
+
+        Returns:
+            공유된 호출의 결과
+        """
+        call = self._inflight.get(key)
+        if call is None:
+            shared = share_deadline()
+            call = _Call(
+                asyncio.ensure_future(run_with_deadline(shared, factory)), shared
+            )
+            self._inflight[key] = call
+            self._counters["leaders"] += 1
+            call.task.add_done_callback(
+                lambda _, key=key, call=call: self._forget(key, call)
+            )
+        else:
+            self._counters["coalesced"] += 1
+            if call.deadline is not None:
+                call.deadline.extend_to(current_deadline())
+            logger.info(f"진행 중인 동일 요청에 합류: {key[:12]}")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if not call.task.done() and call.waiters == 1:
+                # 결과를 기다리는 요청이 더 이상 없으면 업스트림 호출도 중단
+                waiter = current_deadline()
+                if call.deadline is not None and waiter is not None:
+                    call.deadline.cancel_reason = waiter.cancel_reason
+                call.task.cancel()
+                self._counters["abandoned"] += 1
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._inflight.get(key) is call:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """합쳐진 호출 수 등 통계를 반환합니다."""
+        return {**self._counters, "in_flight": len(self._inflight)}
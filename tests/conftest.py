@@ -0,0 +1,22 @@
+"""
+테스트 공통 설정
+
+루트 모듈(cache.py, upstream.py 등)을 import할 수 있도록 저장소 루트를 경로에 추가하고,
+전역 캐시가 작업 디렉터리에 디스크 파일을 만들지 않도록 디스크 계층을 끕니다.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+for prefix in (
+    "ANALYSIS_CACHE",
+    "STEP_RESULT_STORE",
+    "IMAGE_CACHE",
+    "INCREMENTAL_STORE",
+):
+    os.environ.setdefault(f"{prefix}_DIR", "")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
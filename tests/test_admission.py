@@ -0,0 +1,113 @@
+"""admission: 동시 처리 수 제한과 대기열 초과 시 503 + Retry-After"""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from admission import AdmissionController, AdmissionMiddleware, AdmissionRejected
+
+
+def test_waiters_are_admitted_in_order_as_slots_free():
+    controller = AdmissionController(max_active=1, max_queue=2, max_wait=1)
+
+    async def scenario():
+        await controller.acquire()
+        waiters = [asyncio.ensure_future(controller.acquire()) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert controller.queued == 2
+        controller.release(0.5)
+        await asyncio.sleep(0.01)
+        assert [w.done() for w in waiters] == [True, False]
+        controller.release(0.5)
+        await asyncio.gather(*waiters)
+        return controller.active
+
+    assert asyncio.run(scenario()) == 1
+    assert controller.stats()["admitted"] == 3
+
+
+def test_queue_full_is_rejected_immediately():
+    controller = AdmissionController(max_active=1, max_queue=1, max_wait=1)
+
+    async def scenario():
+        await controller.acquire()
+        waiter = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0.01)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire()
+        waiter.cancel()
+        return excinfo.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.reason == "queue_full"
+    assert rejected.retry_after >= 1
+    assert controller.stats()["rejected_queue_full"] == 1
+
+
+def test_queue_timeout_is_rejected():
+    controller = AdmissionController(max_active=1, max_queue=1, max_wait=0.05)
+
+    async def scenario():
+        await controller.acquire()
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire()
+        return excinfo.value
+
+    assert asyncio.run(scenario()).reason == "queue_timeout"
+    assert controller.queued == 0
+    assert controller.stats()["rejected_timeout"] == 1
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    controller = AdmissionController(max_active=1, max_queue=1, max_wait=1)
+
+    async def scenario():
+        await controller.acquire()
+        waiter = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.sleep(0.01)
+        controller.release()
+        return controller.active, controller.queued
+
+    assert asyncio.run(scenario()) == (0, 0)
+
+
+def test_middleware_returns_503_with_retry_after_when_queue_is_full():
+    controller = AdmissionController(max_active=1, max_queue=0, max_wait=1)
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.post("/api/analyze")
+    async def analyze():
+        await release.wait()
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    wrapped = AdmissionMiddleware(app, controller)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=wrapped)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            first = asyncio.ensure_future(client.post("/api/analyze"))
+            await asyncio.sleep(0.05)
+            rejected = await client.post("/api/analyze")
+            # /api/ 밖의 경로는 입장 제어를 거치지 않음
+            health = await client.get("/health")
+            release.set()
+            return (await first), rejected, health
+
+    first, rejected, health = asyncio.run(scenario())
+    assert first.status_code == 200
+    assert rejected.status_code == 503
+    assert rejected.headers["retry-after"] == "1"
+    assert rejected.json()["reason"] == "queue_full"
+    assert health.status_code == 200
+    assert controller.active == 0
@@ -0,0 +1,73 @@
+"""main.py 배치 NDJSON 엔드포인트: 실패한 항목은 해당 줄의 오류로 보고하고 나머지 항목은 계속 스트리밍"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from schemas import PensionAnalysis
+
+ANALYSIS = PensionAnalysis(
+    core_style=["모던"],
+    key_elements=["원목 가구"],
+    target_persona=["커플"],
+    recommended_activities=["바비큐"],
+    unsuitable_persona=["대가족"],
+    confidence_score=0.9,
+    pablo_memo="따뜻한 분위기",
+)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """이미지 URL 경로에 따라 성공/예외/파싱 실패를 돌려주는 run_analysis로 교체합니다."""
+
+    async def fake_run_analysis(image_urls, output_mode=None):
+        await asyncio.sleep(0.01)
+        if "fail" in image_urls[0]:
+            raise RuntimeError("upstream exploded")
+        if "unparsable" in image_urls[0]:
+            return None, "not json", {}
+        return ANALYSIS, "{}", {"analysis_path": "full"}
+
+    monkeypatch.setattr(main, "run_analysis", fake_run_analysis)
+    return TestClient(main.app)
+
+
+def test_failing_item_is_reported_and_stream_continues(client):
+    items = [
+        {"id": "a", "image_urls": ["https://example.com/batch-ok-1.jpg"]},
+        {"id": "b", "image_urls": ["https://example.com/batch-fail.jpg"]},
+        {"id": "c", "image_urls": ["ftp://example.com/invalid.jpg"]},
+        {"id": "d", "image_urls": ["https://example.com/batch-unparsable.jpg"]},
+        {"id": "e", "image_urls": ["https://example.com/batch-ok-2.jpg"]},
+    ]
+    response = client.post(
+        "/api/analyze-pension-style-batch", json={"items": items, "concurrency": 2}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    summary = lines.pop()
+    by_id = {line["id"]: line for line in lines}
+    assert sorted(by_id) == ["a", "b", "c", "d", "e"]
+    assert by_id["a"]["status"] == by_id["e"]["status"] == "ok"
+    assert by_id["a"]["result"]["core_style"] == ["모던"]
+    assert by_id["a"]["result"]["meta"] == {"analysis_path": "full"}
+    assert (by_id["b"]["status"], by_id["b"]["error"]) == ("error", "analysis_failed")
+    assert by_id["b"]["message"] == "upstream exploded"
+    assert by_id["c"]["error"] == "invalid_request"
+    assert by_id["d"]["error"] == "parse_failed"
+    assert {line["index"] for line in lines} == set(range(5))
+    assert summary["done"] is True
+    assert (summary["total"], summary["succeeded"], summary["failed"]) == (5, 2, 3)
+
+
+def test_empty_batch_is_rejected(client):
+    assert (
+        client.post("/api/analyze-pension-style-batch", json={"items": []}).status_code
+        == 400
+    )
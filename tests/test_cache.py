@@ -0,0 +1,94 @@
+"""TwoTierCache: 메모리/디스크 계층, TTL 만료, LRU 제거, 비동기 조회"""
+
+import asyncio
+import time
+
+from cache import TwoTierCache, make_cache_key
+
+
+def test_memory_hit_and_miss(tmp_path):
+    cache = TwoTierCache(str(tmp_path))
+    assert cache.get("missing") is None
+    cache.set("key", {"a": 1})
+    assert cache.get("key") == {"a": 1}
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_disk_tier_survives_memory_clear_and_new_instance(tmp_path):
+    cache = TwoTierCache(str(tmp_path))
+    cache.set("key", [1, 2, 3])
+    cache.clear()
+    assert cache.get("key") == [1, 2, 3]
+    assert cache.stats()["disk_hits"] == 1
+
+    # 재시작 후에도 디스크에서 읽고, 메모리 계층에 다시 올림
+    restarted = TwoTierCache(str(tmp_path))
+    assert restarted.get("key") == [1, 2, 3]
+    assert restarted.get("key") == [1, 2, 3]
+    assert restarted.stats()["disk_hits"] == 1
+    assert restarted.stats()["memory_hits"] == 1
+
+
+def test_memory_only_when_directory_is_empty():
+    cache = TwoTierCache(None)
+    cache.set("key", "value")
+    cache.clear()
+    assert cache.get("key") is None
+
+
+def test_ttl_expiry_in_both_tiers(tmp_path):
+    cache = TwoTierCache(str(tmp_path), ttl_seconds=0.05)
+    cache.set("key", "value")
+    time.sleep(0.1)
+    assert cache.get("key") is None
+    assert cache.stats()["expirations"] == 2
+    # 만료된 디스크 파일은 삭제됨
+    assert not list(tmp_path.glob("*.json"))
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = TwoTierCache(None, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_async_get_and_set(tmp_path):
+    cache = TwoTierCache(str(tmp_path))
+
+    async def scenario():
+        assert await cache.get_async("key") is None
+        await cache.set_async("key", {"b": 2})
+        assert await cache.get_async("key") == {"b": 2}
+        cache.clear()
+        return await cache.get_async("key")
+
+    assert asyncio.run(scenario()) == {"b": 2}
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_cache_key_ignores_url_order_and_duplicates():
+    settings = {"model": "gpt-4o"}
+    key = make_cache_key(
+        ["https://A.com/1.jpg", "https://a.com/2.jpg"], "prompt", settings
+    )
+    assert key == make_cache_key(
+        ["https://a.com/2.jpg", " https://a.com/1.jpg", "https://a.com/2.jpg"],
+        "prompt",
+        settings,
+    )
+    assert key != make_cache_key(
+        ["https://a.com/1.jpg", "https://a.com/2.jpg"], "other prompt", settings
+    )
+    assert key != make_cache_key(
+        ["https://a.com/1.jpg", "https://a.com/2.jpg"],
+        "prompt",
+        {"model": "gpt-4o-mini"},
+    )
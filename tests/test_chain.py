@@ -0,0 +1,243 @@
+"""chain: 파서 실패 시 원본 텍스트 복구 (업스트림 재호출 없음), 복구 단계별 캐시 저장, 모델 캐스케이드 승격"""
+
+import asyncio
+import itertools
+import json
+
+import pytest
+
+import chain
+from schemas import PensionAnalysis
+
+ANALYSIS = {
+    "core_style": ["모던"],
+    "key_elements": ["원목 가구"],
+    "target_persona": ["커플"],
+    "recommended_activities": ["바비큐"],
+    "unsuitable_persona": ["대가족"],
+    "confidence_score": 0.9,
+    "pablo_memo": "따뜻한 분위기",
+}
+
+_urls = itertools.count()
+
+
+@pytest.fixture
+def image_urls():
+    """테스트마다 다른 이미지 URL (프로세스 전역 분석 캐시를 공유하지 않도록)"""
+    return [f"https://example.com/chain-{next(_urls)}.jpg"]
+
+
+class FakeChain:
+    """ainvoke() 호출마다 준비된 체인 출력({"raw", "parsed", "parsing_error", "usage"})을 차례로 반환합니다."""
+
+    def __init__(self, *outputs):
+        self.outputs = list(outputs)
+        self.calls = 0
+
+    async def ainvoke(self, chain_input):
+        output = self.outputs[self.calls]
+        self.calls += 1
+        return output
+
+
+def chain_output(raw, parsed=None):
+    return {
+        "raw": raw,
+        "parsed": parsed,
+        "parsing_error": None if parsed is not None else ValueError("parse failed"),
+        "usage": {"input_tokens": 100, "output_tokens": 50},
+    }
+
+
+@pytest.fixture
+def stub_chain(monkeypatch):
+    """get_pension_analysis_chain()을 모델별 FakeChain으로 교체합니다."""
+    chains = {}
+
+    def install(fake, model_settings=None):
+        chains[(model_settings or chain.PENSION_MODEL_SETTINGS)["model"]] = fake
+        return fake
+
+    monkeypatch.setattr(
+        chain,
+        "get_pension_analysis_chain",
+        lambda output_mode="prompt", model_settings=None: chains[
+            (model_settings or chain.PENSION_MODEL_SETTINGS)["model"]
+        ],
+    )
+    monkeypatch.setattr(chain, "ANALYSIS_CACHE_ENABLED", True)
+    return install
+
+
+def analyze(image_urls, max_retries=1):
+    meta = {}
+    result, raw = asyncio.run(
+        chain.analyze_pension_style_with_retry_async(
+            image_urls, max_retries=max_retries, output_mode="prompt", meta=meta
+        )
+    )
+    return result, raw, meta
+
+
+def cached(image_urls):
+    return asyncio.run(chain.get_cached_analysis(image_urls, "prompt"))
+
+
+def test_parser_success_is_cached(stub_chain, image_urls):
+    raw = json.dumps(ANALYSIS, ensure_ascii=False)
+    fake = stub_chain(FakeChain(chain_output(raw, PensionAnalysis(**ANALYSIS))))
+    result, returned_raw, meta = analyze(image_urls)
+    assert fake.calls == 1
+    assert meta["recovery_tier"] == "parser"
+    assert returned_raw == raw
+    assert cached(image_urls) == result
+
+    # 캐시 적중이면 업스트림을 호출하지 않음
+    _, raw_on_hit, meta = analyze(image_urls)
+    assert fake.calls == 1
+    assert meta["analysis_path"] == "cache"
+    assert raw_on_hit is None
+
+
+def test_parser_failure_recovers_from_raw_text_without_second_call(
+    stub_chain, image_urls
+):
+    raw = f"분석 결과입니다.\n```json\n{json.dumps(ANALYSIS, ensure_ascii=False)}\n```\n참고하세요."
+    fake = stub_chain(FakeChain(chain_output(raw)))
+    result, returned_raw, meta = analyze(image_urls)
+    assert fake.calls == 1
+    assert meta["recovery_tier"] == "json_extract"
+    assert result == PensionAnalysis(**ANALYSIS)
+    assert returned_raw == raw
+    assert cached(image_urls) == result
+
+
+def test_defaults_merge_result_is_not_cached(stub_chain, image_urls):
+    partial = {key: value for key, value in ANALYSIS.items() if key != "pablo_memo"}
+    fake = stub_chain(FakeChain(chain_output(json.dumps(partial, ensure_ascii=False))))
+    result, _, meta = analyze(image_urls, max_retries=0)
+    assert fake.calls == 1
+    assert meta["recovery_tier"] == "defaults_merge"
+    assert result.core_style == ["모던"]
+    assert cached(image_urls) is None
+
+
+def test_text_extract_result_is_not_cached(stub_chain, image_urls):
+    fake = stub_chain(
+        FakeChain(chain_output("스타일: 모던, 내추럴\n신뢰도는 보통입니다."))
+    )
+    result, _, meta = analyze(image_urls, max_retries=0)
+    assert fake.calls == 1
+    assert meta["recovery_tier"] == "text_extract"
+    assert isinstance(result, PensionAnalysis)
+    assert cached(image_urls) is None
+
+
+def test_unrecoverable_output_falls_back_without_caching(stub_chain, image_urls):
+    # JSON은 있지만 기본값을 채워도 검증할 수 없는 응답
+    fake = stub_chain(FakeChain(chain_output('{"core_style": 5}')))
+    before = chain.get_recovery_stats()["fallback"]
+    result, _, _ = analyze(image_urls, max_retries=0)
+    assert fake.calls == 1
+    assert chain.get_recovery_stats()["fallback"] == before + 1
+    assert result == chain.create_fallback_response()
+    assert cached(image_urls) is None
+
+
+class FailingChain(FakeChain):
+    async def ainvoke(self, chain_input):
+        self.calls += 1
+        raise ValueError("invalid request")
+
+
+def test_upstream_error_falls_back_without_caching(stub_chain, image_urls):
+    fake = stub_chain(FailingChain())
+    before = chain.get_recovery_stats()["upstream_error"]
+    result, _, _ = analyze(image_urls)
+    assert fake.calls == 1
+    assert chain.get_recovery_stats()["upstream_error"] == before + 1
+    assert result == chain.create_fallback_response()
+    assert cached(image_urls) is None
+
+
+def test_retry_only_when_json_extract_fails_before_final_attempt(
+    stub_chain, image_urls
+):
+    raw = json.dumps(ANALYSIS, ensure_ascii=False)
+    fake = stub_chain(
+        FakeChain(
+            chain_output("JSON 없음"), chain_output(raw, PensionAnalysis(**ANALYSIS))
+        )
+    )
+    _, _, meta = analyze(image_urls, max_retries=1)
+    assert fake.calls == 2
+    assert meta["recovery_tier"] == "parser"
+
+
+@pytest.fixture
+def cascade(monkeypatch, stub_chain):
+    """캐스케이드를 켜고 (작은 모델 체인, 상위 모델 체인)을 설치하는 함수를 반환합니다."""
+    monkeypatch.setattr(chain, "CASCADE_ENABLED", True)
+    monkeypatch.setattr(chain, "CASCADE_MIN_CONFIDENCE", 0.7)
+
+    def install(small_output, large_output=None):
+        small = stub_chain(FakeChain(small_output), chain.CASCADE_MODEL_SETTINGS)
+        large = stub_chain(FakeChain(*([large_output] if large_output else [])))
+        return small, large
+
+    return install
+
+
+def _parsed(confidence):
+    analysis = {**ANALYSIS, "confidence_score": confidence}
+    return chain_output(
+        json.dumps(analysis, ensure_ascii=False), PensionAnalysis(**analysis)
+    )
+
+
+def test_cascade_keeps_confident_small_model_result(cascade, image_urls):
+    small, large = cascade(_parsed(0.8))
+    result, _, meta = analyze(image_urls)
+    assert (small.calls, large.calls) == (1, 0)
+    assert result.confidence_score == 0.8
+    assert meta["cascade"]["escalated"] is False
+    assert cached(image_urls) == result
+
+
+def test_cascade_keeps_small_result_recovered_by_json_extract(cascade, image_urls):
+    raw = f"결과: {json.dumps({**ANALYSIS, 'confidence_score': 0.75}, ensure_ascii=False)}"
+    small, large = cascade(chain_output(raw))
+    _, _, meta = analyze(image_urls)
+    assert (small.calls, large.calls) == (1, 0)
+    assert meta["recovery_tier"] == "json_extract"
+
+
+def test_cascade_escalates_on_low_confidence(cascade, image_urls):
+    small, large = cascade(_parsed(0.5), _parsed(0.95))
+    result, _, meta = analyze(image_urls)
+    assert (small.calls, large.calls) == (1, 1)
+    assert result.confidence_score == 0.95
+    assert meta["cascade"] == {
+        "model": chain.CASCADE_MODEL,
+        "escalated": True,
+        "reason": "low_confidence",
+        "small_confidence": 0.5,
+    }
+
+
+def test_cascade_escalates_on_validation_failure(cascade, image_urls):
+    # 작은 모델에서는 기본값 병합/텍스트 추출 같은 관대한 복구를 쓰지 않음
+    small, large = cascade(chain_output("스타일: 모던"), _parsed(0.9))
+    result, _, meta = analyze(image_urls)
+    assert (small.calls, large.calls) == (1, 1)
+    assert meta["cascade"]["reason"] == "validation_failed"
+    assert result.confidence_score == 0.9
+
+
+def test_cascade_escalates_on_small_model_error(cascade, image_urls, stub_chain):
+    small = stub_chain(FailingChain(), chain.CASCADE_MODEL_SETTINGS)
+    large = stub_chain(FakeChain(_parsed(0.9)))
+    _, _, meta = analyze(image_urls)
+    assert (small.calls, large.calls) == (1, 1)
+    assert meta["cascade"]["reason"] == "error"
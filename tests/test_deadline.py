@@ -0,0 +1,155 @@
+"""deadline: 요청 예산, 마감 시각 취소, 504 응답"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+import deadline
+from deadline import (
+    DeadlineExceeded,
+    DeadlineMiddleware,
+    RequestDeadline,
+    check_budget,
+    request_budget,
+    run_with_deadline,
+    within_deadline,
+)
+
+
+def _run_within(budget, factory):
+    """budget초 마감 아래에서 factory()를 새 Task로 실행합니다."""
+
+    async def scenario():
+        limit = RequestDeadline(
+            time.monotonic() + budget if budget is not None else None
+        )
+        return await asyncio.ensure_future(run_with_deadline(limit, factory))
+
+    return asyncio.run(scenario())
+
+
+def test_within_deadline_cancels_at_expiry():
+    cancelled = []
+
+    async def slow_call():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded) as excinfo:
+        _run_within(0.05, lambda: within_deadline(slow_call(), "upstream"))
+    assert time.monotonic() - started < 0.5
+    assert excinfo.value.stage == "upstream"
+    assert cancelled == [True]
+    assert deadline.get_deadline_stats()["deadline_exceeded"].get("upstream", 0) >= 1
+
+
+def test_within_deadline_passes_through_without_deadline():
+    assert (
+        _run_within(
+            None, lambda: within_deadline(asyncio.sleep(0.01, "done"), "upstream")
+        )
+        == "done"
+    )
+
+
+def test_check_budget_requires_minimum_call_time(monkeypatch):
+    monkeypatch.setattr(deadline, "DEADLINE_MIN_CALL_SECONDS", 3.0)
+
+    async def check():
+        check_budget("upstream")
+        return "started"
+
+    assert _run_within(10, check) == "started"
+    with pytest.raises(DeadlineExceeded):
+        _run_within(1, check)
+
+
+def test_request_budget(monkeypatch):
+    monkeypatch.setattr(deadline, "REQUEST_DEADLINE_DEFAULT", 60.0)
+    monkeypatch.setattr(deadline, "REQUEST_DEADLINE_BATCH_DEFAULT", 0.0)
+    monkeypatch.setattr(deadline, "REQUEST_DEADLINE_MAX", 600.0)
+    assert request_budget("/api/analyze-pension-style", {}) == 60.0
+    assert (
+        request_budget("/api/analyze-pension-style", {"x-request-deadline": "12.5"})
+        == 12.5
+    )
+    assert (
+        request_budget("/api/analyze-pension-style", {"x-request-deadline": "9999"})
+        == 600.0
+    )
+    assert (
+        request_budget("/api/analyze-pension-style", {"x-request-deadline": "abc"})
+        == 60.0
+    )
+    assert request_budget("/api/analyze-pension-style-batch", {}) is None
+
+
+def test_sse_paths_get_the_longer_default_budget(monkeypatch):
+    monkeypatch.setattr(deadline, "REQUEST_DEADLINE_DEFAULT", 60.0)
+    monkeypatch.setattr(deadline, "REQUEST_DEADLINE_STREAM_DEFAULT", 180.0)
+    assert request_budget("/api/analyze-pension-style-pipeline", {}) == 180.0
+    assert request_budget("/api/analyze-pension-style-stream", {}) == 180.0
+    # 헤더로 지정한 예산이 우선
+    assert (
+        request_budget(
+            "/api/analyze-pension-style-pipeline", {"x-request-deadline": "30"}
+        )
+        == 30.0
+    )
+    monkeypatch.setattr(deadline, "REQUEST_DEADLINE_STREAM_DEFAULT", 0.0)
+    assert request_budget("/api/analyze-pension-style-pipeline", {}) is None
+
+
+def _deadline_app():
+    app = FastAPI()
+
+    @app.post("/api/slow")
+    async def slow():
+        await asyncio.sleep(1)
+        return {"ok": True}
+
+    @app.post("/api/upstream")
+    async def upstream_call():
+        return await within_deadline(asyncio.sleep(1, {"ok": True}), "upstream")
+
+    @app.exception_handler(DeadlineExceeded)
+    async def deadline_exceeded_handler(request, exc):
+        return JSONResponse(
+            status_code=504, content={"error": "deadline_exceeded", "stage": exc.stage}
+        )
+
+    return DeadlineMiddleware(app)
+
+
+def _post(path, headers):
+    async def scenario():
+        transport = httpx.ASGITransport(app=_deadline_app())
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            return await client.post(path, headers=headers)
+
+    return asyncio.run(scenario())
+
+
+def test_middleware_cancels_request_after_deadline_and_grace(monkeypatch):
+    monkeypatch.setattr(deadline, "DEADLINE_GRACE", 0.05)
+    started = time.monotonic()
+    response = _post("/api/slow", {"x-request-deadline": "0.1"})
+    assert time.monotonic() - started < 0.8
+    assert response.status_code == 504
+    assert response.json()["error"] == "deadline_exceeded"
+
+
+def test_middleware_propagates_deadline_to_upstream_calls():
+    response = _post("/api/upstream", {"x-request-deadline": "0.1"})
+    assert response.status_code == 504
+    assert response.json()["stage"] == "upstream"
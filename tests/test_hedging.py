@@ -0,0 +1,147 @@
+"""hedging: 지연된 호출의 헤지 요청, 헤지 예산, 먼저 도착한 정상 응답 채택"""
+
+import asyncio
+
+import pytest
+
+import hedging
+from hedging import HedgePolicy, hedged
+
+
+@pytest.fixture(autouse=True)
+def short_hedge_delay(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGE_MIN_DELAY", 0.05)
+    monkeypatch.setattr(hedging, "HEDGE_MIN_SAMPLES", 3)
+
+
+def _warm_policy(name="test"):
+    """헤지 대기 시간이 HEDGE_MIN_DELAY(0.05초)가 되도록 지연 시간 샘플을 채운 정책"""
+    policy = HedgePolicy(name)
+    policy.attempt_latencies.extend([0.01] * 50)
+    return policy
+
+
+class FakeUpstream:
+    """호출 순서대로 (지연 시간, 결과) 응답을 돌려주고, 취소된 호출을 기록합니다."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+        self.cancelled = []
+
+    def __call__(self):
+        index = self.calls
+        self.calls += 1
+        return self._respond(index, *self.responses[index])
+
+    async def _respond(self, index, delay, result):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(index)
+            raise
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def _run(policy, upstream, is_valid=lambda result: True):
+    async def scenario():
+        result = await policy.run(upstream, is_valid)
+        await asyncio.sleep(0)  # 취소된 호출이 CancelledError를 처리할 기회
+        return result
+
+    return asyncio.run(scenario())
+
+
+def test_no_hedge_without_enough_samples():
+    upstream = FakeUpstream((0.1, "primary"), (0, "hedge"))
+    assert _run(HedgePolicy("cold"), upstream) == "primary"
+    assert upstream.calls == 1
+
+
+def test_no_hedge_when_budget_is_exhausted():
+    policy = _warm_policy()
+    policy.budget = 0
+    upstream = FakeUpstream((0.1, "primary"), (0, "hedge"))
+    assert _run(policy, upstream) == "primary"
+    assert upstream.calls == 1
+    assert policy.stats()["budget_denied"] == 1
+
+
+def test_fast_primary_does_not_hedge():
+    policy = _warm_policy()
+    upstream = FakeUpstream((0.01, "primary"), (0, "hedge"))
+    assert _run(policy, upstream) == "primary"
+    assert upstream.calls == 1
+    assert policy.budget == hedging.HEDGE_BURST
+
+
+def test_primary_wins_and_hedge_is_cancelled():
+    policy = _warm_policy()
+    upstream = FakeUpstream((0.1, "primary"), (1, "hedge"))
+    assert _run(policy, upstream) == "primary"
+    assert upstream.calls == 2
+    assert upstream.cancelled == [1]
+    stats = policy.stats()
+    assert stats["hedged"] == 1
+    assert stats["hedge_wins"] == 0
+    assert stats["cancelled"] == 1
+
+
+def test_hedge_wins_and_primary_is_cancelled():
+    policy = _warm_policy()
+    upstream = FakeUpstream((1, "primary"), (0.01, "hedge"))
+    assert _run(policy, upstream) == "hedge"
+    assert upstream.cancelled == [0]
+    assert policy.stats()["hedge_wins"] == 1
+    assert policy.budget == pytest.approx(hedging.HEDGE_BURST - 1)
+
+
+def test_invalid_first_result_falls_through_to_the_other():
+    policy = _warm_policy()
+    upstream = FakeUpstream((0.08, {"ok": False}), (0.1, {"ok": True}))
+    assert _run(policy, upstream, is_valid=lambda result: result["ok"]) == {"ok": True}
+    assert upstream.cancelled == []
+
+
+def test_failed_first_call_falls_through_to_the_other():
+    policy = _warm_policy()
+    upstream = FakeUpstream((0.08, RuntimeError("upstream failed")), (0.1, "hedge"))
+    assert _run(policy, upstream) == "hedge"
+
+
+def test_returns_first_result_when_none_is_valid():
+    policy = _warm_policy()
+    upstream = FakeUpstream((0.08, "first"), (0.1, "second"))
+    assert _run(policy, upstream, is_valid=lambda result: False) == "first"
+
+
+def test_raises_when_both_calls_fail():
+    policy = _warm_policy()
+    upstream = FakeUpstream(
+        (0.08, RuntimeError("first")), (0.1, RuntimeError("second"))
+    )
+    with pytest.raises(RuntimeError):
+        _run(policy, upstream)
+
+
+def test_budget_limits_hedge_ratio(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGE_BURST", 1.0)
+    monkeypatch.setattr(hedging, "HEDGE_MAX_RATIO", 0.5)
+    policy = _warm_policy()
+    # 매 호출의 첫 요청이 헤지 대기 시간을 넘는 업스트림: 예산(호출당 0.5, 최대 1)이 허용하는 호출만 헤지
+    hedges = 0
+    for _ in range(4):
+        upstream = FakeUpstream((0.2, "primary"), (0.01, "hedge"))
+        _run(policy, upstream)
+        hedges += upstream.calls - 1
+    assert hedges == 2
+    assert policy.stats()["budget_denied"] == 2
+
+
+def test_hedged_is_a_passthrough_when_disabled(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGE_ENABLED", False)
+    upstream = FakeUpstream((0, "primary"))
+    assert asyncio.run(hedged("test:disabled", upstream)) == "primary"
+    assert "test:disabled" not in hedging._policies
@@ -0,0 +1,190 @@
+"""images.fetch_image: 공인 주소만 허용하는 이미지 다운로드 (SSRF 방지)와 크기 제한"""
+
+import asyncio
+import http.server
+import threading
+
+import httpx
+import pytest
+
+import images
+from images import ImageFetchError, fetch_image
+
+PUBLIC_URL = "https://93.184.216.34/room.jpg"
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """요청 URL → (상태 코드, 헤더, 본문) 응답을 돌려주는 MockTransport 클라이언트로 교체합니다."""
+    routes = {}
+    requested = []
+
+    def handler(request):
+        requested.append(str(request.url))
+        status, headers, body = routes[str(request.url)]
+        return httpx.Response(status, headers=headers, content=body)
+
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), follow_redirects=False
+    )
+    monkeypatch.setattr(images, "get_image_http_client", lambda: client)
+    return routes, requested
+
+
+@pytest.mark.parametrize(
+    "address, public",
+    [
+        ("93.184.216.34", True),
+        ("127.0.0.1", False),
+        ("10.0.0.5", False),
+        ("169.254.169.254", False),
+        ("100.64.0.1", False),
+        ("::1", False),
+        ("::ffff:127.0.0.1", False),
+        ("fe80::1%eth0", False),
+        ("224.0.0.1", False),
+    ],
+)
+def test_is_public_address(address, public):
+    assert images._is_public_address(address) is public
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "http://127.0.0.1/a.jpg",
+        "http://[::ffff:10.0.0.1]/a.jpg",
+        "http://[fe80::1]/a.jpg",
+        "file:///etc/passwd",
+    ],
+)
+def test_rejects_non_public_urls_before_connecting(upstream, url):
+    _, requested = upstream
+    with pytest.raises(ImageFetchError):
+        asyncio.run(fetch_image(url))
+    assert requested == []
+
+
+def test_checks_every_redirect_hop(upstream):
+    routes, requested = upstream
+    routes[PUBLIC_URL] = (
+        302,
+        {"location": "http://169.254.169.254/latest/meta-data/"},
+        b"",
+    )
+    with pytest.raises(ImageFetchError):
+        asyncio.run(fetch_image(PUBLIC_URL))
+    assert requested == [PUBLIC_URL]
+
+
+def test_follows_public_redirects(upstream):
+    routes, _ = upstream
+    routes[PUBLIC_URL] = (301, {"location": "/moved.jpg"}, b"")
+    routes["https://93.184.216.34/moved.jpg"] = (200, {"etag": '"v1"'}, b"image-bytes")
+    assert asyncio.run(fetch_image(PUBLIC_URL)) == (200, b"image-bytes", '"v1"')
+
+
+def test_too_many_redirects(upstream, monkeypatch):
+    monkeypatch.setattr(images, "IMAGE_FETCH_MAX_REDIRECTS", 2)
+    routes, requested = upstream
+    routes[PUBLIC_URL] = (302, {"location": PUBLIC_URL}, b"")
+    with pytest.raises(ImageFetchError):
+        asyncio.run(fetch_image(PUBLIC_URL))
+    assert len(requested) == 3
+
+
+def test_caps_download_size(upstream, monkeypatch):
+    monkeypatch.setattr(images, "IMAGE_MAX_FETCH_BYTES", 10)
+    routes, _ = upstream
+    routes[PUBLIC_URL] = (200, {}, b"x" * 11)
+    with pytest.raises(ImageFetchError):
+        asyncio.run(fetch_image(PUBLIC_URL))
+
+
+class FakeBackend:
+    """연결 요청을 기록만 하는 네트워크 백엔드"""
+
+    def __init__(self):
+        self.connected = []
+
+    async def connect_tcp(self, host, port, **kwargs):
+        self.connected.append((host, port))
+        return "stream"
+
+
+@pytest.fixture
+def dns(monkeypatch):
+    """호스트 이름 해석 결과를 호출 순서대로 돌려주는 가짜 DNS"""
+    answers = []
+    lookups = []
+
+    async def lookup(host, port):
+        lookups.append(host)
+        return answers.pop(0)
+
+    monkeypatch.setattr(images, "_lookup", lookup)
+    return answers, lookups
+
+
+def test_backend_connects_to_the_vetted_address(dns):
+    answers, lookups = dns
+    # 검사 후 사설 주소로 바뀌는 DNS 재바인딩 응답: 두 번째 응답은 사용되지 않음
+    answers.extend([["93.184.216.34"], ["127.0.0.1"]])
+    backend = FakeBackend()
+    stream = asyncio.run(
+        images._PublicAddressBackend(backend).connect_tcp("photos.example", 443)
+    )
+    assert stream == "stream"
+    assert backend.connected == [("93.184.216.34", 443)]
+    assert lookups == ["photos.example"]
+
+
+@pytest.mark.parametrize(
+    "addresses", [["127.0.0.1"], ["93.184.216.34", "10.0.0.1"], ["169.254.169.254"]]
+)
+def test_backend_refuses_hosts_resolving_to_private_addresses(dns, addresses):
+    answers, _ = dns
+    answers.append(addresses)
+    backend = FakeBackend()
+    with pytest.raises(ImageFetchError):
+        asyncio.run(
+            images._PublicAddressBackend(backend).connect_tcp("internal.example", 80)
+        )
+    assert backend.connected == []
+
+
+def test_client_keeps_host_header_while_connecting_to_pinned_address(dns, monkeypatch):
+    received = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            received.append(self.headers["Host"])
+            self.send_response(200)
+            self.send_header("content-length", "3")
+            self.end_headers()
+            self.wfile.write(b"img")
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    answers, lookups = dns
+    answers.append(["127.0.0.1"])
+    # 테스트 서버(루프백)만 공인 주소로 취급
+    monkeypatch.setattr(
+        images, "_is_public_address", lambda address: address == "127.0.0.1"
+    )
+    client = httpx.AsyncClient(
+        transport=images._public_only_transport(), follow_redirects=False
+    )
+    monkeypatch.setattr(images, "get_image_http_client", lambda: client)
+    try:
+        result = asyncio.run(
+            fetch_image(f"http://photos.example:{server.server_port}/room.jpg")
+        )
+    finally:
+        server.shutdown()
+    assert result == (200, b"img", None)
+    assert received == [f"photos.example:{server.server_port}"]
+    assert lookups == ["photos.example"]
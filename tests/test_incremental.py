@@ -0,0 +1,142 @@
+"""main.py 증분 재분석: 기준 세트가 있으면 추가 이미지만 관찰해 갱신하고, 없거나 갱신할 수 없으면 전체 분석으로 진행"""
+
+import asyncio
+import itertools
+
+import pytest
+
+import main
+from schemas import PensionAnalysis
+
+FULL = PensionAnalysis(
+    core_style=["모던"],
+    key_elements=["원목 가구"],
+    target_persona=["커플"],
+    recommended_activities=["바비큐"],
+    unsuitable_persona=["대가족"],
+    confidence_score=0.9,
+    pablo_memo="따뜻한 분위기",
+)
+UPDATED = FULL.model_copy(update={"core_style": ["모던", "자연주의"]})
+OBSERVATION = {"key_observations": ["통창 너머 숲 전망"]}
+
+_counter = itertools.count()
+
+
+@pytest.fixture
+def image_urls():
+    """테스트마다 겹치지 않는 이미지 URL (전역 캐시/증분 저장소 공유 방지)"""
+    n = next(_counter)
+    return [f"https://example.com/incremental/{n}/{i}.jpg" for i in range(4)]
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """전체 분석, 1단계 관찰, 갱신 호출을 가짜로 바꾸고 호출 기록을 돌려줍니다."""
+    recorded = {"full": [], "step1": [], "update": []}
+    update_responses = []
+
+    async def fake_full(image_urls, max_retries=1, output_mode=None, meta=None):
+        recorded["full"].append(list(image_urls))
+        meta["recovery_tier"] = "parser"
+        return FULL, FULL.model_dump_json()
+
+    async def fake_step1(image_urls, output_mode=None):
+        recorded["step1"].append(list(image_urls))
+        return OBSERVATION
+
+    async def fake_call_openai_api(prompt, image_urls, response_format=None):
+        recorded["update"].append(prompt)
+        return (
+            update_responses.pop(0) if update_responses else UPDATED.model_dump_json()
+        )
+
+    monkeypatch.setattr(main, "INCREMENTAL_ENABLED", True)
+    monkeypatch.setattr(main, "STEP_MEMO_ENABLED", True)
+    monkeypatch.setattr(main, "analyze_pension_style_with_retry_async", fake_full)
+    monkeypatch.setattr(main, "analyze_step1", fake_step1)
+    monkeypatch.setattr(main, "call_openai_api", fake_call_openai_api)
+    recorded["update_responses"] = update_responses
+    return recorded
+
+
+def run(image_urls):
+    return asyncio.run(main.run_analysis(image_urls))
+
+
+def test_without_base_runs_the_full_path(calls, image_urls):
+    result, _, meta = run(image_urls[:3])
+
+    assert result == FULL
+    assert meta["analysis_path"] == "full"
+    assert "incremental" not in meta
+    assert calls["full"] == [image_urls[:3]]
+
+
+def test_added_image_updates_an_analyze_only_base(calls, image_urls):
+    # /analyze 전체 분석만 거친 세트: 관찰 결과 없이 기준으로 저장됨
+    run(image_urls[:3])
+
+    result, _, meta = run(image_urls)
+
+    assert result == UPDATED
+    assert meta["analysis_path"] == "incremental"
+    assert meta["incremental"]["added"] == [image_urls[3]]
+    assert calls["step1"] == [[image_urls[3]]]
+    assert len(calls["full"]) == 1
+    assert len(calls["update"]) == 1
+
+
+def test_removed_image_without_base_observations_falls_back_to_full(calls, image_urls):
+    run(image_urls[:3])
+
+    result, _, meta = run(image_urls[:2])
+
+    assert result == FULL
+    assert meta["analysis_path"] == "full"
+    assert meta["incremental"]["fallback"] == "no_observations"
+    assert calls["update"] == []
+    assert calls["full"] == [image_urls[:3], image_urls[:2]]
+
+
+def test_step_pipeline_observations_are_persisted_and_used_for_removals(
+    calls, image_urls
+):
+    asyncio.run(
+        main.store_step_result("step1", image_urls[:3], None, None, OBSERVATION)
+    )
+    run(image_urls[:3])
+
+    result, _, meta = run(image_urls[:2])
+
+    assert result == UPDATED
+    assert meta["analysis_path"] == "incremental"
+    assert meta["incremental"]["removed"] == [image_urls[2]]
+    assert calls["step1"] == []
+    assert "통창 너머 숲 전망" in calls["update"][0]
+
+
+def test_fused_pipeline_observation_is_persisted(calls, image_urls):
+    fused = {
+        "observation": OBSERVATION,
+        "validation": {},
+        "analysis": FULL.model_dump(),
+    }
+    asyncio.run(main.store_step_result("fused", image_urls[:3], None, None, fused))
+    run(image_urls[:3])
+
+    _, _, meta = run(image_urls[:2])
+
+    assert meta["analysis_path"] == "incremental"
+
+
+def test_unparsable_update_falls_back_to_full(calls, image_urls):
+    run(image_urls[:3])
+    calls["update_responses"].append("not json")
+
+    result, _, meta = run(image_urls)
+
+    assert result == FULL
+    assert meta["analysis_path"] == "full"
+    assert meta["incremental"]["fallback"] == "update_failed"
+    assert len(calls["full"]) == 2
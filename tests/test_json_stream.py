@@ -0,0 +1,114 @@
+"""json_stream: 선형 시간 JSON 객체 스캐너와 증분 필드 파서"""
+
+import json
+
+import pytest
+
+from json_stream import (
+    JSONFieldStreamer,
+    JSONObjectScanner,
+    extract_first_json_object,
+    iter_json_objects,
+)
+
+PAYLOAD = {
+    "style": "모던",
+    "colors": ["white", "wood"],
+    "note": '괄호 { } 와 "따옴표"',
+    "nested": {"a": [1, {"b": 2}]},
+}
+TEXT = json.dumps(PAYLOAD, ensure_ascii=False)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        TEXT,
+        f"```json\n{TEXT}\n```",
+        f"분석 결과입니다:\n{TEXT}\n이상입니다.",
+        f"{TEXT} 추가 설명 {{참고}}",
+        f"예시 {{형식}} 뒤에 실제 결과 {TEXT}",
+        f"닫히지 않은 {{ 괄호 다음 {TEXT}",
+    ],
+    ids=[
+        "plain",
+        "fenced",
+        "prose",
+        "trailing_braces",
+        "invalid_candidate_first",
+        "unclosed_prefix",
+    ],
+)
+def test_extract_first_json_object(text):
+    assert extract_first_json_object(text) == PAYLOAD
+
+
+def test_extract_allows_raw_newlines_in_strings():
+    assert extract_first_json_object('{"note": "첫 줄\n둘째 줄"}') == {
+        "note": "첫 줄\n둘째 줄"
+    }
+
+
+@pytest.mark.parametrize("text", ["", "JSON 없음", '{"style": "모던"', "[1, 2, 3]"])
+def test_extract_returns_none_without_object(text):
+    assert extract_first_json_object(text) is None
+
+
+def test_scanner_ignores_braces_inside_strings_and_escapes():
+    text = r'{"a": "}{\"}", "b": "\\"} 뒤 {"c": 1}'
+    assert list(iter_json_objects(text)) == [r'{"a": "}{\"}", "b": "\\"}', '{"c": 1}']
+
+
+def test_scanner_feed_is_chunking_independent():
+    text = f"앞 {TEXT} 중간 {TEXT} 끝"
+    expected = JSONObjectScanner().feed(text)
+    for size in (1, 2, 3, 7, 64):
+        scanner = JSONObjectScanner()
+        completed = []
+        for i in range(0, len(text), size):
+            completed.extend(scanner.feed(text[i : i + size]))
+        assert completed == expected == [TEXT, TEXT]
+        assert scanner.candidate_start is None
+
+
+def test_scanner_reports_unclosed_candidate():
+    scanner = JSONObjectScanner()
+    assert scanner.feed('앞 {"a": {"b": 1}') == []
+    assert scanner.candidate_start == 2
+
+
+def _stream_fields(text, size):
+    streamer = JSONFieldStreamer()
+    fields = []
+    for i in range(0, len(text), size):
+        fields.extend(streamer.feed(text[i : i + size]))
+    return streamer, fields
+
+
+def test_field_streamer_emits_each_top_level_field():
+    streamer, fields = _stream_fields(f"```json\n{TEXT}\n```", len(TEXT) + 20)
+    assert fields == list(PAYLOAD.items())
+    assert streamer.done
+
+
+@pytest.mark.parametrize("size", [1, 2, 5, 13, 100])
+def test_field_streamer_is_chunking_independent(size):
+    _, fields = _stream_fields(f"결과: {TEXT} 끝", size)
+    assert fields == list(PAYLOAD.items())
+
+
+def test_field_streamer_emits_fields_before_object_closes():
+    streamer = JSONFieldStreamer()
+    assert streamer.feed('{"style": "모던", "colors": ["wh') == [("style", "모던")]
+    assert streamer.feed('ite"], "mood"') == [("colors", ["white"])]
+    assert streamer.feed(': "calm"}') == [("mood", "calm")]
+    assert streamer.done
+    assert streamer.feed('{"ignored": 1}') == []
+
+
+def test_field_streamer_long_value_across_many_chunks():
+    value = "가" * 50_000
+    _, fields = _stream_fields(
+        json.dumps({"long": value, "next": 1}, ensure_ascii=False), 7
+    )
+    assert fields == [("long", value), ("next", 1)]
@@ -0,0 +1,109 @@
+"""metrics: Prometheus 텍스트 형식 카운터/게이지/히스토그램과 HTTP 미들웨어"""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsMiddleware,
+    render_metrics,
+    stage_timer,
+)
+
+
+def _samples(text):
+    """render_metrics() 결과를 {샘플 이름+라벨: 값} 딕셔너리로 변환합니다."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_counter_and_gauge_render():
+    counter = Counter("test_calls_total", "Test calls", ("outcome",))
+    counter.inc(outcome="ok")
+    counter.inc(2, outcome="ok")
+    counter.inc(outcome='bad"quote')
+    gauge = Gauge("test_depth", "Test depth")
+    gauge.set_function(lambda: 7)
+
+    text = render_metrics()
+    assert "# HELP test_calls_total Test calls\n# TYPE test_calls_total counter" in text
+    assert "# TYPE test_depth gauge" in text
+    samples = _samples(text)
+    assert samples['test_calls_total{outcome="ok"}'] == 3
+    assert samples['test_calls_total{outcome="bad\\"quote"}'] == 1
+    assert samples["test_depth"] == 7
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(
+        "test_latency_seconds", "Test latency", ("stage",), buckets=(0.1, 1, 10)
+    )
+    for value in (0.05, 0.1, 0.5, 5, 50):
+        histogram.observe(value, stage="a")
+
+    samples = _samples(render_metrics())
+    assert samples['test_latency_seconds_bucket{stage="a",le="0.1"}'] == 2
+    assert samples['test_latency_seconds_bucket{stage="a",le="1.0"}'] == 3
+    assert samples['test_latency_seconds_bucket{stage="a",le="10.0"}'] == 4
+    assert samples['test_latency_seconds_bucket{stage="a",le="+Inf"}'] == 5
+    assert samples['test_latency_seconds_count{stage="a"}'] == 5
+    assert samples['test_latency_seconds_sum{stage="a"}'] == pytest.approx(55.65)
+
+
+def test_stage_timer_records_even_on_error():
+    try:
+        with stage_timer("test_stage"):
+            raise ValueError
+    except ValueError:
+        pass
+    assert (
+        _samples(render_metrics())[
+            'staypost_stage_duration_seconds_count{stage="test_stage"}'
+        ]
+        == 1
+    )
+
+
+def test_middleware_records_route_template_and_status():
+    app = FastAPI()
+
+    @app.get("/api/items/{item_id}")
+    async def item(item_id: str):
+        return {"id": item_id}
+
+    wrapped = MetricsMiddleware(app, service="test-service")
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=wrapped)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            await client.get("/api/items/1")
+            await client.get("/api/items/2")
+            await client.get("/missing")
+
+    asyncio.run(scenario())
+    samples = _samples(render_metrics())
+    labels = 'service="test-service",method="GET"'
+    assert (
+        samples[
+            f'staypost_http_request_duration_seconds_count{{{labels},route="/api/items/{{item_id}}",status="200"}}'
+        ]
+        == 2
+    )
+    assert (
+        samples[
+            f'staypost_http_request_duration_seconds_count{{{labels},route="unmatched",status="404"}}'
+        ]
+        == 1
+    )
+    assert samples['staypost_http_requests_in_flight{service="test-service"}'] == 0
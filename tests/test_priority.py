@@ -0,0 +1,133 @@
+"""priority: interactive/batch 분류와 가중 우선순위 대기열"""
+
+import asyncio
+
+import pytest
+
+import priority
+from admission import AdmissionController
+from priority import PriorityWaitQueue, classify_request, traffic_class
+
+
+def test_classify_request(monkeypatch):
+    monkeypatch.setattr(priority, "BATCH_API_KEYS", {"bulk-key"})
+    assert classify_request("/api/analyze-pension-style", {}) == "interactive"
+    assert classify_request("/api/analyze-pension-style-batch", {}) == "batch"
+    assert (
+        classify_request("/api/analyze-pension-style", {"x-traffic-class": "Batch"})
+        == "batch"
+    )
+    assert (
+        classify_request(
+            "/api/analyze-pension-style-batch", {"x-traffic-class": "interactive"}
+        )
+        == "interactive"
+    )
+    assert (
+        classify_request("/api/analyze-pension-style", {"x-traffic-class": "unknown"})
+        == "interactive"
+    )
+    # 배치용 API 키는 헤더보다 우선
+    assert (
+        classify_request(
+            "/api/x", {"x-api-key": "bulk-key", "x-traffic-class": "interactive"}
+        )
+        == "batch"
+    )
+
+
+def _grant_order(queue, waiters, count):
+    """grant_next()를 count번 호출하며 슬롯을 넘겨받은 클래스를 순서대로 반환합니다."""
+    pending = list(waiters)
+    order = []
+    for _ in range(count):
+        assert queue.grant_next()
+        granted = next(item for item in pending if item[1].done())
+        pending.remove(granted)
+        order.append(granted[0])
+    return order
+
+
+def test_interactive_first_with_batch_minimum_share(monkeypatch):
+    monkeypatch.setattr(priority, "PRIORITY_BATCH_MIN_SHARE", 0.2)
+
+    async def scenario():
+        queue = PriorityWaitQueue()
+        waiters = [
+            (name, queue.push(name)) for name in ["batch"] * 10 + ["interactive"] * 10
+        ]
+        return _grant_order(queue, waiters, 10), queue.stats()
+
+    order, stats = asyncio.run(scenario())
+    # 경합 중에는 배정된 슬롯의 20%를 batch에 보장하고 나머지는 interactive
+    assert order.count("batch") == 2
+    assert order.count("interactive") == 8
+    assert stats["interactive"]["contended_grants"] == 8
+    assert stats["batch"]["queued"] == 8
+
+
+def test_single_class_uses_all_slots(monkeypatch):
+    monkeypatch.setattr(priority, "PRIORITY_BATCH_MIN_SHARE", 0.0)
+
+    async def scenario():
+        queue = PriorityWaitQueue()
+        waiters = [(name, queue.push(name)) for name in ["batch"] * 3]
+        order = _grant_order(queue, waiters, 3)
+        return order, queue.grant_next()
+
+    order, granted = asyncio.run(scenario())
+    assert order == ["batch"] * 3
+    assert granted is False
+
+
+def test_cancelled_waiters_are_skipped():
+    async def scenario():
+        queue = PriorityWaitQueue()
+        cancelled = queue.push("interactive")
+        waiting = queue.push("interactive")
+        cancelled.cancel()
+        assert queue.depth() == 1
+        assert queue.grant_next()
+        return waiting.done()
+
+    assert asyncio.run(scenario())
+
+
+def test_admission_queue_admits_interactive_before_batch(monkeypatch):
+    monkeypatch.setattr(priority, "PRIORITY_BATCH_MIN_SHARE", 0.0)
+    controller = AdmissionController(max_active=1, max_queue=10, max_wait=1)
+    admitted = []
+
+    async def request(name):
+        traffic_class.set(name)
+        await controller.acquire()
+        admitted.append(name)
+        await asyncio.sleep(0.01)
+        controller.release()
+
+    async def scenario():
+        await controller.acquire()
+        tasks = [
+            asyncio.ensure_future(request(name))
+            for name in ("batch", "batch", "interactive", "interactive")
+        ]
+        await asyncio.sleep(0.01)
+        controller.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert admitted == ["interactive", "interactive", "batch", "batch"]
+
+
+@pytest.mark.parametrize("share, expected", [(0.5, 5), (1.0, 10)])
+def test_batch_share_is_configurable(monkeypatch, share, expected):
+    monkeypatch.setattr(priority, "PRIORITY_BATCH_MIN_SHARE", share)
+
+    async def scenario():
+        queue = PriorityWaitQueue()
+        waiters = [
+            (name, queue.push(name)) for name in ["interactive"] * 10 + ["batch"] * 10
+        ]
+        return _grant_order(queue, waiters, 10)
+
+    assert asyncio.run(scenario()).count("batch") == expected
@@ -0,0 +1,141 @@
+"""SingleFlight: 동시 동일 요청 합치기"""
+
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_requests_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"style": "모던"}
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", factory) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert results == [{"style": "모던"}] * 5
+    assert flight.stats() == {
+        "leaders": 1,
+        "coalesced": 4,
+        "abandoned": 0,
+        "in_flight": 0,
+    }
+
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight()
+
+    async def scenario():
+        return await asyncio.gather(
+            flight.do("a", lambda: asyncio.sleep(0.01, "a")),
+            flight.do("b", lambda: asyncio.sleep(0.01, "b")),
+        )
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+    assert flight.stats()["leaders"] == 2
+
+
+def test_exception_is_shared_by_all_waiters():
+    flight = SingleFlight()
+
+    async def factory():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream failed")
+
+    async def scenario():
+        return await asyncio.gather(
+            *(flight.do("key", factory) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.stats()["leaders"] == 1
+
+
+def test_call_continues_while_other_waiters_remain():
+    flight = SingleFlight()
+
+    async def scenario():
+        first = asyncio.ensure_future(
+            flight.do("key", lambda: asyncio.sleep(0.05, "done"))
+        )
+        second = asyncio.ensure_future(
+            flight.do("key", lambda: asyncio.sleep(0.05, "unused"))
+        )
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
+    assert flight.stats()["abandoned"] == 0
+
+
+def test_last_waiter_cancelled_cancels_upstream_call():
+    flight = SingleFlight()
+    cancelled = []
+
+    async def factory():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def scenario():
+        waiter = asyncio.ensure_future(flight.do("key", factory))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert cancelled == [True]
+    assert flight.stats() == {
+        "leaders": 1,
+        "coalesced": 0,
+        "abandoned": 1,
+        "in_flight": 0,
+    }
+
+
+def test_waiters_of_a_finished_call_do_not_affect_a_new_call_under_the_same_key():
+    flight = SingleFlight()
+    started = []
+
+    async def second():
+        await asyncio.sleep(0.05)
+        return "second"
+
+    async def first():
+        # 첫 호출이 끝나는 순간 같은 키로 새 호출을 시작 (첫 호출의 대기자가 아직 깨어나기 전)
+        loop = asyncio.get_running_loop()
+        loop.call_soon(
+            lambda: started.append(asyncio.ensure_future(flight.do("key", second)))
+        )
+        return "first"
+
+    async def scenario():
+        assert await flight.do("key", first) == "first"
+        leader = started[0]
+        await asyncio.sleep(0.01)
+        # 새 호출에 합류했다가 취소된 요청: 새 호출의 리더가 남아 있으므로 호출은 계속되어야 함
+        joiner = asyncio.ensure_future(flight.do("key", second))
+        await asyncio.sleep(0.01)
+        joiner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await joiner
+        return await leader
+
+    assert asyncio.run(scenario()) == "second"
+    assert flight.stats()["abandoned"] == 0
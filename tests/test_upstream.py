@@ -0,0 +1,219 @@
+"""upstream: AIMD 동시성 한도, 재시도 예산, 서킷 브레이커"""
+
+import asyncio
+import time
+
+import pytest
+
+import upstream
+from upstream import (
+    AIMDLimiter,
+    CircuitBreaker,
+    UpstreamGateway,
+    UpstreamUnavailable,
+    classify_error,
+)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(upstream, "UPSTREAM_BACKOFF_BASE", 0.0)
+
+
+def test_classify_error():
+    assert classify_error(StatusError(429)) == "overload"
+    assert classify_error(StatusError(503)) == "transient"
+    assert classify_error(StatusError(400)) is None
+    # LangChain 등이 감싼 예외는 원인을 따라가며 분류
+    try:
+        try:
+            raise StatusError(502)
+        except StatusError as e:
+            raise ValueError("wrapped") from e
+    except ValueError as wrapped:
+        assert classify_error(wrapped) == "transient"
+
+
+def test_aimd_additive_increase_and_multiplicative_decrease(monkeypatch):
+    monkeypatch.setattr(upstream, "UPSTREAM_INITIAL_LIMIT", 4.0)
+    limiter = AIMDLimiter()
+
+    async def call(latency, signal):
+        await limiter.acquire()
+        limiter.release(latency, signal)
+
+    asyncio.run(call(0.1, None))
+    assert limiter.limit == pytest.approx(4.25)
+    asyncio.run(call(0.1, "overload"))
+    assert limiter.limit == pytest.approx(2.125)
+    # 목표 지연 시간을 넘는 성공도 혼잡 신호
+    asyncio.run(call(upstream.UPSTREAM_LATENCY_TARGET + 1, None))
+    assert limiter.limit == pytest.approx(1.0625)
+    # 일시적 오류는 한도를 바꾸지 않음
+    asyncio.run(call(0.1, "transient"))
+    assert limiter.limit == pytest.approx(1.0625)
+    for _ in range(3):
+        asyncio.run(call(0.1, "overload"))
+    assert limiter.limit == upstream.UPSTREAM_MIN_LIMIT
+    assert limiter.in_flight == 0
+
+
+def test_aimd_limit_queues_extra_calls():
+    limiter = AIMDLimiter()
+    limiter.limit = 1
+
+    async def scenario():
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiter.done() and limiter.waiting == 1
+        limiter.release(0.1, None)
+        await waiter
+        return limiter.in_flight
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_gateway_retries_transient_errors():
+    gateway = UpstreamGateway()
+    attempts = []
+
+    async def factory():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise StatusError(503)
+        return "ok"
+
+    assert asyncio.run(gateway.call(factory)) == "ok"
+    assert len(attempts) == 3
+    assert gateway.stats()["retries"] == 2
+
+
+def test_gateway_does_not_retry_request_errors():
+    gateway = UpstreamGateway()
+    attempts = []
+
+    async def factory():
+        attempts.append(1)
+        raise StatusError(400)
+
+    with pytest.raises(StatusError):
+        asyncio.run(gateway.call(factory))
+    assert len(attempts) == 1
+
+
+def test_retry_budget_exhaustion_stops_retries(monkeypatch):
+    monkeypatch.setattr(upstream, "UPSTREAM_RETRY_BURST", 1.0)
+    monkeypatch.setattr(upstream, "UPSTREAM_BREAKER_FAILURES", 100)
+    gateway = UpstreamGateway()
+    attempts = []
+
+    async def factory():
+        attempts.append(1)
+        raise StatusError(503)
+
+    # 예산 1회: 첫 호출은 한 번 재시도하고, 두 번째 호출은 재시도 없이 실패
+    for _ in range(2):
+        with pytest.raises(StatusError):
+            asyncio.run(gateway.call(factory))
+    stats = gateway.stats()
+    assert stats["retries"] == 1
+    assert stats["retry_budget_exhausted"] == 2
+    assert len(attempts) == 3
+
+
+def test_breaker_opens_after_consecutive_failures(monkeypatch):
+    monkeypatch.setattr(upstream, "UPSTREAM_BREAKER_FAILURES", 3)
+    monkeypatch.setattr(upstream, "UPSTREAM_BREAKER_COOLDOWN", 30.0)
+    breaker = CircuitBreaker()
+    for _ in range(2):
+        breaker.record_failure()
+        breaker.check()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(UpstreamUnavailable) as excinfo:
+        breaker.check()
+    assert 29 < excinfo.value.retry_after <= 30
+
+
+def test_breaker_half_open_probe_closes_on_success(monkeypatch):
+    monkeypatch.setattr(upstream, "UPSTREAM_BREAKER_FAILURES", 1)
+    monkeypatch.setattr(upstream, "UPSTREAM_BREAKER_COOLDOWN", 0.0)
+    breaker = CircuitBreaker()
+    breaker.record_failure()
+    breaker.check()
+    assert breaker.state == "half_open"
+    # 시험 호출 중에는 다른 호출을 막음
+    with pytest.raises(UpstreamUnavailable):
+        breaker.check()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_open_breaker_skips_upstream_call(monkeypatch):
+    monkeypatch.setattr(upstream, "UPSTREAM_BREAKER_FAILURES", 2)
+    gateway = UpstreamGateway()
+    gateway.retry_budget = 0
+    attempts = []
+
+    async def factory():
+        attempts.append(1)
+        raise StatusError(500)
+
+    for _ in range(2):
+        with pytest.raises(StatusError):
+            asyncio.run(gateway.call(factory))
+    with pytest.raises(UpstreamUnavailable):
+        asyncio.run(gateway.call(factory))
+    assert len(attempts) == 2
+
+
+def test_open_breaker_returns_503_with_retry_after(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    monkeypatch.setattr(upstream, "UPSTREAM_BREAKER_FAILURES", 1)
+    breaker = CircuitBreaker()
+    breaker.record_failure()
+    monkeypatch.setattr(main.gateway, "breaker", breaker)
+
+    response = TestClient(main.app).post(
+        "/api/analyze-pension-style-pipeline",
+        json={"image_urls": ["https://example.com/a.jpg"]},
+    )
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 1
+    assert response.json()["error"] == "upstream_unavailable"
+
+
+def test_probe_released_when_queue_wait_hits_deadline(monkeypatch):
+    from deadline import DeadlineExceeded, RequestDeadline, run_with_deadline
+
+    monkeypatch.setattr(upstream, "UPSTREAM_BREAKER_FAILURES", 1)
+    monkeypatch.setattr(upstream, "UPSTREAM_BREAKER_COOLDOWN", 0.0)
+    gateway = UpstreamGateway()
+    gateway.breaker.record_failure()
+    gateway.limiter.limit = 1
+    gateway.limiter.in_flight = 1
+
+    async def probe():
+        async with gateway.slot():
+            pass
+
+    async def scenario():
+        # 한도가 찬 상태에서 시험 호출이 슬롯을 기다리다 요청 마감에 걸림
+        limit = RequestDeadline(time.monotonic() + 0.05)
+        with pytest.raises(DeadlineExceeded):
+            await asyncio.ensure_future(run_with_deadline(limit, probe))
+        gateway.limiter.in_flight = 0
+        await probe()
+
+    asyncio.run(scenario())
+    assert gateway.breaker.state == "closed"
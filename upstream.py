@@ -0,0 +1,391 @@
+"""
+OpenAI 업스트림 게이트웨이
+
+chain.py와 main.py의 모든 업스트림 호출이 거치는 공용 관문입니다.
+
+- AIMD 동시성 제한: 지연 시간이 목표 이내면 한도를 조금씩 늘리고(additive increase),
+  429/타임아웃이나 목표를 크게 넘는 지연이 오면 한도를 비율로 줄입니다(multiplicative decrease).
+- 재시도: 일시적 오류(429, 5xx, 타임아웃, 연결 오류)만 지터가 있는 지수 백오프로 재시도하며,
+  재시도는 첫 호출마다 쌓이는 프로세스 단위 예산을 소비합니다.
+- 우선순위: 한도가 찬 동안 대기하는 호출은 interactive가 먼저, batch는 최소 몫을 보장받고 슬롯을 얻습니다.
+- 마감 시간: 요청 예산(deadline.py)이 부족하면 호출/재시도를 시작하지 않고, 진행 중인 호출은 마감 시각에 취소합니다.
+- 서킷 브레이커: 연속 실패가 UPSTREAM_BREAKER_FAILURES번 이어지면 UPSTREAM_BREAKER_COOLDOWN초 동안
+  호출 없이 UpstreamUnavailable을 발생시키고(API에서는 503), 이후 한 번의 시험 호출로 복구를 확인합니다.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from deadline import (
+    DeadlineExceeded,
+    can_start_call,
+    check_budget,
+    record_cancelled_call,
+    record_skipped_call,
+    within_deadline,
+)
+from metrics import Counter, Gauge, observe_stage
+from priority import PriorityWaitQueue, current_traffic_class
+
+logger = logging.getLogger(__name__)
+
+# AIMD 동시성 한도
+UPSTREAM_INITIAL_LIMIT = float(os.getenv("UPSTREAM_INITIAL_LIMIT", "8"))
+UPSTREAM_MIN_LIMIT = float(os.getenv("UPSTREAM_MIN_LIMIT", "1"))
+UPSTREAM_MAX_LIMIT = float(os.getenv("UPSTREAM_MAX_LIMIT", "32"))
+# 이 지연 시간(초)을 넘는 성공 호출은 혼잡 신호로 간주
+UPSTREAM_LATENCY_TARGET = float(os.getenv("UPSTREAM_LATENCY_TARGET", "30"))
+# 429/타임아웃 시 한도에 곱하는 비율
+UPSTREAM_DECREASE_RATIO = float(os.getenv("UPSTREAM_DECREASE_RATIO", "0.5"))
+
+# 재시도 (호출당 최대 시도 횟수, 백오프, 재시도 예산)
+UPSTREAM_MAX_ATTEMPTS = int(os.getenv("UPSTREAM_MAX_ATTEMPTS", "3"))
+UPSTREAM_BACKOFF_BASE = float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.5"))
+UPSTREAM_BACKOFF_MAX = float(os.getenv("UPSTREAM_BACKOFF_MAX", "20"))
+# 첫 호출마다 쌓이는 재시도 예산 (0.2면 재시도가 전체 호출의 20%를 넘지 않음)
+UPSTREAM_RETRY_RATIO = float(os.getenv("UPSTREAM_RETRY_RATIO", "0.2"))
+UPSTREAM_RETRY_BURST = float(os.getenv("UPSTREAM_RETRY_BURST", "10"))
+
+# 서킷 브레이커
+UPSTREAM_BREAKER_FAILURES = int(os.getenv("UPSTREAM_BREAKER_FAILURES", "5"))
+UPSTREAM_BREAKER_COOLDOWN = float(os.getenv("UPSTREAM_BREAKER_COOLDOWN", "30"))
+
+
+class UpstreamUnavailable(Exception):
+    """업스트림이 비정상이라 호출하지 않고 바로 실패한 경우 (API에서는 503 + Retry-After)"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def classify_error(error: BaseException) -> Optional[str]:
+    """
+    업스트림 오류를 분류합니다. LangChain이 감싼 예외는 __cause__를 따라가며 확인합니다.
+
+    Returns:
+        "overload" (429/타임아웃), "transient" (5xx/연결 오류), 재시도 대상이 아니면 None
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        name = type(error).__name__
+        status = getattr(error, "status_code", None)
+        if status is None and getattr(error, "response", None) is not None:
+            status = getattr(error.response, "status_code", None)
+        if (
+            status == 429
+            or name in ("RateLimitError", "APITimeoutError")
+            or "Timeout" in name
+        ):
+            return "overload"
+        if (status is not None and status >= 500) or name in (
+            "APIConnectionError",
+            "ConnectError",
+            "RemoteProtocolError",
+        ):
+            return "transient"
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def _retry_after_header(error: BaseException) -> Optional[float]:
+    """오류 응답의 Retry-After 헤더(초)를 읽습니다."""
+    while error is not None:
+        response = getattr(error, "response", None)
+        value = (
+            getattr(response, "headers", {}).get("retry-after")
+            if response is not None
+            else None
+        )
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                return None
+        error = error.__cause__
+    return None
+
+
+class AIMDLimiter:
+    """
+    지연 시간과 429 신호로 조절되는 동시 호출 한도
+
+    한도가 찬 동안의 대기자는 트래픽 클래스별 대기열(priority.PriorityWaitQueue)에 들어가며,
+    슬롯이 나면 interactive를 먼저 처리하되 batch에도 최소 몫을 보장합니다.
+    """
+
+    def __init__(self):
+        self.limit = UPSTREAM_INITIAL_LIMIT
+        self.in_flight = 0
+        self.queue = PriorityWaitQueue()
+        self._counters = {"increases": 0, "decreases": 0}
+
+    @property
+    def waiting(self) -> int:
+        return self.queue.depth()
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < max(1, int(self.limit))
+
+    async def acquire(self) -> None:
+        name = current_traffic_class()
+        if self._has_capacity() and not self.queue.depth():
+            self.in_flight += 1
+            self.queue.record_immediate(name)
+            return
+        waiter = self.queue.push(name)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 슬롯을 넘겨받은 직후 취소되었으면 반납
+                self._release_slot()
+            else:
+                self.queue.discard(waiter)
+            raise
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        self._grant_waiters()
+
+    def _grant_waiters(self) -> None:
+        # 한도가 늘어났으면 여러 대기자에게 한꺼번에 슬롯을 넘김
+        while self._has_capacity() and self.queue.grant_next():
+            self.in_flight += 1
+
+    def release(self, latency: float, signal: Optional[str]) -> None:
+        """
+        Args:
+            latency: 호출 소요 시간(초)
+            signal: "overload"면 한도를 줄이고, 성공(None)이면 지연 시간에 따라 조절,
+                그 외("transient", "error", "cancelled")에는 한도를 바꾸지 않음
+        """
+        if signal == "overload" or (
+            signal is None and latency > UPSTREAM_LATENCY_TARGET
+        ):
+            self.limit = max(UPSTREAM_MIN_LIMIT, self.limit * UPSTREAM_DECREASE_RATIO)
+            self._counters["decreases"] += 1
+        elif signal is None:
+            self.limit = min(UPSTREAM_MAX_LIMIT, self.limit + 1 / self.limit)
+            self._counters["increases"] += 1
+        self._release_slot()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            **self._counters,
+            "classes": self.queue.stats(),
+        }
+
+
+class CircuitBreaker:
+    """연속 실패 기반 서킷 브레이커 (closed → open → half_open → closed)"""
+
+    def __init__(self):
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._counters = {"opened": 0, "rejected": 0}
+
+    def check(self) -> None:
+        """호출 가능 여부를 확인하고, 열려 있으면 UpstreamUnavailable을 발생시킵니다."""
+        if self.state == "closed":
+            return
+        remaining = self.opened_at + UPSTREAM_BREAKER_COOLDOWN - time.monotonic()
+        if remaining <= 0 and not self._probe_in_flight:
+            # 쿨다운이 끝나면 시험 호출 하나만 통과
+            self.state = "half_open"
+            self._probe_in_flight = True
+            return
+        self._counters["rejected"] += 1
+        raise UpstreamUnavailable(
+            "OpenAI 업스트림이 일시적으로 불안정합니다.",
+            retry_after=max(1.0, remaining),
+        )
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logger.info("서킷 브레이커 닫힘 (업스트림 복구)")
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= UPSTREAM_BREAKER_FAILURES:
+            if self.state != "open":
+                self._counters["opened"] += 1
+                logger.warning(
+                    f"서킷 브레이커 열림: 연속 실패 {self.failures}회, {UPSTREAM_BREAKER_COOLDOWN:.0f}초 동안 호출 차단"
+                )
+            self.state = "open"
+            self.opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """시험 호출이 성공/실패 판정 없이 끝난 경우 (파싱 오류 등) 다음 시험 호출을 허용"""
+        self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            **self._counters,
+        }
+
+
+class UpstreamGateway:
+    """AIMD 한도, 재시도 예산, 서킷 브레이커를 묶은 업스트림 호출 관문"""
+
+    def __init__(self):
+        self.limiter = AIMDLimiter()
+        self.breaker = CircuitBreaker()
+        self.retry_budget = UPSTREAM_RETRY_BURST
+        self._counters = {
+            "calls": 0,
+            "errors": 0,
+            "overloads": 0,
+            "retries": 0,
+            "retry_budget_exhausted": 0,
+        }
+
+    def check(self) -> None:
+        """스트림 시작 전 등에서 업스트림 상태만 미리 확인합니다."""
+        if self.breaker.state == "open":
+            self.breaker.check()
+            # 쿨다운이 끝나 시험 호출 자격을 얻었으면 실제 호출에 넘김
+            self.breaker.release_probe()
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        업스트림 호출 한 번을 감쌉니다 (재시도 없음, 스트리밍 호출용).
+        브레이커 확인 → 동시성 한도 획득 → 결과에 따라 한도/브레이커 갱신.
+        """
+        self.breaker.check()
+        try:
+            await within_deadline(self.limiter.acquire(), "upstream_queue")
+        except BaseException:
+            # 시험 호출이 슬롯을 얻기 전에 마감/취소되면 다음 시험 호출을 허용 (브레이커가 열린 채 멈추지 않도록)
+            self.breaker.release_probe()
+            raise
+        self._counters["calls"] += 1
+        started = time.monotonic()
+        signal = None
+        try:
+            yield
+        except DeadlineExceeded:
+            signal = "cancelled"
+            record_cancelled_call(time.monotonic() - started)
+            self.breaker.release_probe()
+            raise
+        except Exception as e:
+            signal = classify_error(e)
+            if signal is not None:
+                self._counters["errors"] += 1
+                if signal == "overload":
+                    self._counters["overloads"] += 1
+                self.breaker.record_failure()
+            else:
+                # 요청 자체의 문제(400 등)는 업스트림 상태와 무관
+                signal = "error"
+                self.breaker.release_probe()
+            raise
+        except BaseException:
+            signal = "cancelled"
+            record_cancelled_call(time.monotonic() - started)
+            self.breaker.release_probe()
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            elapsed = time.monotonic() - started
+            self.limiter.release(elapsed, signal)
+            observe_stage("upstream", elapsed)
+            _upstream_calls_total.inc(outcome=signal or "ok")
+
+    async def call(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        factory()로 업스트림을 호출하고, 일시적 오류는 예산 안에서 백오프 후 재시도합니다.
+
+        Raises:
+            UpstreamUnavailable: 서킷 브레이커가 열려 있는 경우
+            DeadlineExceeded: 요청 예산이 부족해 호출을 시작하지 못했거나 마감 시각에 취소된 경우
+            Exception: 재시도 대상이 아니거나 재시도를 모두 소진한 마지막 오류
+        """
+        check_budget("upstream")
+        self.retry_budget = min(
+            UPSTREAM_RETRY_BURST, self.retry_budget + UPSTREAM_RETRY_RATIO
+        )
+        for attempt in range(UPSTREAM_MAX_ATTEMPTS):
+            try:
+                async with self.slot():
+                    return await within_deadline(factory(), "upstream")
+            except (UpstreamUnavailable, DeadlineExceeded):
+                raise
+            except Exception as e:
+                if classify_error(e) is None or attempt == UPSTREAM_MAX_ATTEMPTS - 1:
+                    raise
+                if self.retry_budget < 1:
+                    self._counters["retry_budget_exhausted"] += 1
+                    raise
+                self.retry_budget -= 1
+                self._counters["retries"] += 1
+                # full jitter 지수 백오프 (서버가 Retry-After를 주면 그 이상 대기)
+                delay = random.uniform(
+                    0, min(UPSTREAM_BACKOFF_MAX, UPSTREAM_BACKOFF_BASE * 2**attempt)
+                )
+                delay = max(delay, _retry_after_header(e) or 0)
+                if not can_start_call(delay):
+                    # 백오프 후 재시도해도 요청 마감 안에 끝낼 수 없음
+                    record_skipped_call("upstream_retry")
+                    raise
+                logger.warning(
+                    f"업스트림 일시 오류, {delay:.1f}초 후 재시도 ({attempt + 1}/{UPSTREAM_MAX_ATTEMPTS}): {type(e).__name__}"
+                )
+                await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._counters,
+            "retry_budget": round(self.retry_budget, 2),
+            "limiter": self.limiter.stats(),
+            "breaker": self.breaker.stats(),
+        }
+
+
+gateway = UpstreamGateway()
+
+_upstream_calls_total = Counter(
+    "staypost_upstream_calls_total",
+    "Upstream OpenAI calls by outcome (ok, overload, transient, error, cancelled)",
+    ("outcome",),
+)
+Gauge("staypost_upstream_in_flight", "Upstream OpenAI calls in flight").set_function(
+    lambda: gateway.limiter.in_flight
+)
+Gauge(
+    "staypost_upstream_waiting", "Upstream OpenAI calls waiting for a concurrency slot"
+).set_function(lambda: gateway.limiter.waiting)
+Gauge(
+    "staypost_upstream_concurrency_limit", "Current AIMD upstream concurrency limit"
+).set_function(lambda: gateway.limiter.limit)
+
+
+async def call_upstream(factory: Callable[[], Awaitable[Any]]) -> Any:
+    """공용 게이트웨이로 업스트림을 호출합니다."""
+    return await gateway.call(factory)
+
+
+def get_upstream_stats() -> Dict[str, Any]:
+    """동시성 한도, 재시도 예산, 서킷 브레이커 상태를 반환합니다."""
+    return gateway.stats()